@@ -0,0 +1,181 @@
+"""
+Load balancing of consultations across Medical Advisor agents
+Advisors are picked by fewest outstanding requests (or the better of two
+random choices), and slow or failing advisors are ejected for a while
+"""
+
+import asyncio
+import logging
+import random
+import re
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from .consultation_rpc import ConsultationClient, ConsultationUnavailable
+
+logger = logging.getLogger(__name__)
+
+BALANCING_STRATEGIES = ("least_outstanding", "p2c")
+
+_AGENT_ADDRESS_RE = re.compile(r"\bagent1[0-9a-z]+\b")
+
+
+def load_advisor_addresses(path: str) -> List[str]:
+    """Advisor addresses listed in an AGENT_ADDRESSES.txt-style file (under an "Advisor" heading or label)"""
+    addresses: Dict[str, None] = {}
+    section = ""
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        if line.startswith("#"):
+            section = line.lower()
+            continue
+        for address in _AGENT_ADDRESS_RE.findall(line):
+            if "advisor" in section or "advisor" in line.lower():
+                addresses[address] = None
+    return list(addresses)
+
+
+def configured_advisor_addresses(addresses: str = "", address_file: str = "") -> List[str]:
+    """Comma-separated ``addresses`` plus those in ``address_file``, without duplicates"""
+    found = dict.fromkeys(a.strip() for a in addresses.split(",") if a.strip())
+    if address_file:
+        try:
+            found.update(dict.fromkeys(load_advisor_addresses(address_file)))
+        except OSError as e:
+            logger.warning(f"Could not read advisor addresses from {address_file}: {e}")
+    return list(found)
+
+
+class AdvisorState:
+    __slots__ = ("address", "outstanding", "failures", "latency_ms", "ejected_until",
+                 "answered", "failed", "ejections")
+
+    def __init__(self, address: str):
+        self.address = address
+        self.outstanding = 0
+        self.failures = 0
+        # Moving average of response latency; None until the first answer
+        self.latency_ms: Optional[float] = None
+        self.ejected_until = 0.0
+        self.answered = 0
+        self.failed = 0
+        self.ejections = 0
+
+
+class AdvisorPool:
+    """
+    Medical Advisor addresses with per-advisor load and health
+
+    An advisor is ejected for ``eject_seconds`` after ``max_failures``
+    consecutive timeouts or busy replies, or when its average latency exceeds
+    ``slow_ms``; it then rejoins with a clean record. Use from a single event
+    loop.
+    """
+
+    def __init__(self, addresses: Iterable[str] = (), strategy: str = "least_outstanding",
+                 max_failures: int = 3, eject_seconds: float = 30.0, slow_ms: float = 2000.0,
+                 clock: Callable[[], float] = time.monotonic, rng: Optional[random.Random] = None):
+        if strategy not in BALANCING_STRATEGIES:
+            raise ValueError(f"Unknown advisor balancing strategy: {strategy!r}")
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.slow_ms = slow_ms
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._advisors: Dict[str, AdvisorState] = {}
+        for address in addresses:
+            self.add(address)
+
+    def __len__(self) -> int:
+        return len(self._advisors)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._advisors
+
+    def add(self, address: str) -> bool:
+        """Add an advisor; False if it was already in the pool"""
+        if address in self._advisors:
+            return False
+        self._advisors[address] = AdvisorState(address)
+        return True
+
+    def healthy(self) -> List[AdvisorState]:
+        now = self._clock()
+        return [advisor for advisor in self._advisors.values() if advisor.ejected_until <= now]
+
+    @staticmethod
+    def _load(advisor: AdvisorState):
+        return advisor.outstanding, advisor.latency_ms or 0.0
+
+    def pick(self) -> Optional[str]:
+        """The advisor to send the next consultation to, or None if all are ejected"""
+        candidates = self.healthy()
+        if not candidates:
+            return None
+        if self.strategy == "p2c" and len(candidates) > 2:
+            candidates = self._rng.sample(candidates, 2)
+        return min(candidates, key=self._load).address
+
+    async def call(self, client: ConsultationClient, send: Callable[[str, Any], Awaitable[Any]],
+                   message: Any) -> Any:
+        """``client.call`` to a picked advisor, recording how it went"""
+        address = self.pick()
+        if address is None:
+            raise ConsultationUnavailable("No healthy Medical Advisor")
+        advisor = self._advisors[address]
+        advisor.outstanding += 1
+        started = self._clock()
+        try:
+            response = await client.call(send, address, message)
+        except asyncio.TimeoutError:
+            self._failed(advisor)
+            raise
+        finally:
+            advisor.outstanding -= 1
+
+        if getattr(response, "status", None) == "busy":
+            self._failed(advisor)
+        else:
+            self._answered(advisor, (self._clock() - started) * 1000)
+        return response
+
+    def _answered(self, advisor: AdvisorState, latency_ms: float) -> None:
+        advisor.answered += 1
+        advisor.failures = 0
+        if advisor.latency_ms is None:
+            advisor.latency_ms = latency_ms
+        else:
+            advisor.latency_ms = 0.8 * advisor.latency_ms + 0.2 * latency_ms
+        if advisor.latency_ms > self.slow_ms:
+            self._eject(advisor, f"average latency {advisor.latency_ms:.0f} ms")
+
+    def _failed(self, advisor: AdvisorState) -> None:
+        advisor.failed += 1
+        advisor.failures += 1
+        if advisor.failures >= self.max_failures:
+            self._eject(advisor, f"{advisor.failures} failed consultations in a row")
+
+    def _eject(self, advisor: AdvisorState, reason: str) -> None:
+        logger.warning(f"Ejecting Medical Advisor {advisor.address} for {self.eject_seconds:.0f}s: {reason}")
+        advisor.ejected_until = self._clock() + self.eject_seconds
+        advisor.ejections += 1
+        advisor.failures = 0
+        advisor.latency_ms = None
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        return {
+            "strategy": self.strategy,
+            "advisors": {
+                advisor.address: {
+                    "healthy": advisor.ejected_until <= now,
+                    "outstanding": advisor.outstanding,
+                    "latency_ms": round(advisor.latency_ms, 3) if advisor.latency_ms is not None else None,
+                    "answered": advisor.answered,
+                    "failed": advisor.failed,
+                    "ejections": advisor.ejections,
+                }
+                for advisor in self._advisors.values()
+            },
+        }
@@ -4,6 +4,8 @@ Manages patient appointment requests, schedules, and coordinates with Medical Ad
 """
 
 import os
+import re
+import asyncio
 import logging
 from datetime import datetime
 from uuid import uuid4
@@ -24,27 +26,65 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Import MeTTa interface
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from metta.metta_interface import LoadShedError, extract_symptoms, query_metta_async
+from agents.appointment_store import create_appointment_store
+from agents.advisor_pool import AdvisorPool, configured_advisor_addresses
+from agents.consultation_protocol import (
+    CONSULTATION_PROTOCOL, CONSULTING_AGENT_OPTIONS, AdvisorHeartbeat, ConsultationRequest, ConsultationResponse
+)
+from agents.consultation_rpc import ConsultationClient, ConsultationUnavailable
+from agents.slot_scheduler import WAITLISTED, create_slot_scheduler, format_slot
+from metta.metrics import stage, start_metrics_server
+
 # Agent configuration
 AGENT_NAME = "appointment-coordinator"
 AGENT_SEED = os.getenv("COORDINATOR_SEED", "coordinator_demo_seed_phrase_12345")
 AGENT_PORT = 8000
+# Serve Prometheus metrics on this port (0 disables)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
 AGENT_ENDPOINT = [f"http://localhost:{AGENT_PORT}/submit"]
 
+# Medical Advisor agents (comma-separated, and/or listed in an AGENT_ADDRESSES.txt-style
+# file); advisors announcing themselves with heartbeats join too. With none,
+# consultations run locally
+ADVISOR_ADDRESSES = configured_advisor_addresses(
+    ",".join([os.getenv("ADVISOR_ADDRESSES", ""), os.getenv("ADVISOR_ADDRESS", "")]),
+    os.getenv("ADVISOR_ADDRESSES_FILE", ""),
+)
+
 # Initialize agent
 agent = Agent(
     name=AGENT_NAME,
     seed=AGENT_SEED,
     port=AGENT_PORT,
     endpoint=AGENT_ENDPOINT,
+    **CONSULTING_AGENT_OPTIONS,
 )
 
 # Fund agent if low on balance
 fund_agent_if_low(agent.wallet.address())
 
-# In-memory storage for appointments and sessions
-appointment_storage: Dict[str, Dict] = {}
+# Appointments indexed by patient, specialist and status; sessions in memory
+appointment_storage = create_appointment_store()
+slot_scheduler = create_slot_scheduler(appointment_storage)
 active_sessions: Dict[str, Dict] = {}
 
+# Consultations awaiting the Medical Advisor's reply, matched by request_id
+advisor_client = ConsultationClient(
+    timeout=float(os.getenv("ADVISOR_TIMEOUT", "5")),
+    max_in_flight=int(os.getenv("ADVISOR_MAX_IN_FLIGHT", "64")),
+)
+advisor_pool = AdvisorPool(
+    ADVISOR_ADDRESSES,
+    strategy=os.getenv("ADVISOR_BALANCING", "least_outstanding"),
+    max_failures=int(os.getenv("ADVISOR_MAX_FAILURES", "3")),
+    eject_seconds=float(os.getenv("ADVISOR_EJECT_SECONDS", "30")),
+    slow_ms=float(os.getenv("ADVISOR_SLOW_MS", "2000")),
+)
+
 logger.info(f"Appointment Coordinator Agent initialized")
 logger.info(f"Agent name: {agent.name}")
 logger.info(f"Agent address: {agent.address}")
@@ -53,6 +93,9 @@ logger.info(f"Agent address: {agent.address}")
 # Chat Protocol Implementation
 chat_proto = Protocol(name="chat", version="1.0.0")
 
+# Inter-agent protocol for consultations with the Medical Advisor
+consultation_proto = Protocol(name=CONSULTATION_PROTOCOL)
+
 
 # Define message models
 class ChatRequest(Model):
@@ -63,6 +106,10 @@ class ChatResponse(Model):
     appointment_id: Optional[str] = None
 
 
+# Appointment IDs are the first 8 hex digits of a uuid4
+APPOINTMENT_ID_RE = re.compile(r"\b[0-9a-f]{8}\b")
+
+
 def parse_appointment_request(text: str) -> Dict:
     """Parse natural language appointment request"""
     text_lower = text.lower()
@@ -72,23 +119,23 @@ def parse_appointment_request(text: str) -> Dict:
         "symptoms": [],
         "urgency": "normal",
         "preferred_time": None,
+        "appointment_id": None,
         "raw_text": text
     }
     
-    # Extract request type
-    if any(word in text_lower for word in ["appointment", "schedule", "book", "see a doctor"]):
-        request_data["type"] = "appointment_request"
-    elif any(word in text_lower for word in ["cancel", "reschedule"]):
+    # Extract request type ("reschedule my appointment" is a modification, not a booking)
+    if any(word in text_lower for word in ["cancel", "reschedule"]):
         request_data["type"] = "modification"
+        appointment_id = APPOINTMENT_ID_RE.search(text_lower)
+        if appointment_id:
+            request_data["appointment_id"] = appointment_id.group()
+    elif any(word in text_lower for word in ["appointment", "schedule", "book", "see a doctor"]):
+        request_data["type"] = "appointment_request"
     elif any(word in text_lower for word in ["status", "check", "confirm"]):
         request_data["type"] = "status_inquiry"
     
-    # Extract symptoms
-    symptom_keywords = ["fever", "cough", "pain", "headache", "nausea", "dizzy", 
-                       "chest pain", "shortness of breath", "fatigue"]
-    for symptom in symptom_keywords:
-        if symptom in text_lower:
-            request_data["symptoms"].append(symptom)
+    # Extract symptoms with the shared knowledge-graph phrase matcher
+    request_data["symptoms"] = extract_symptoms(text)
     
     # Extract urgency
     if any(word in text_lower for word in ["urgent", "emergency", "severe", "immediately"]):
@@ -138,11 +185,7 @@ async def handle_chat_message(ctx: Context, sender: str, msg: ChatRequest):
     elif request_data["type"] == "status_inquiry":
         await handle_status_inquiry(ctx, sender)
     elif request_data["type"] == "modification":
-        response_msg = (
-            "I can help you modify your appointment. "
-            "Please provide your appointment ID or patient name."
-        )
-        await ctx.send(sender, ChatResponse(response=response_msg))
+        await handle_modification(ctx, sender, request_data)
     else:
         # General inquiry
         if request_data["symptoms"]:
@@ -179,11 +222,6 @@ async def handle_appointment_request(ctx: Context, sender: str, request_data: Di
     await ctx.send(sender, ChatResponse(response=initial_msg))
     
     # Step 2: Request medical analysis from Medical Advisor agent
-    # In a real deployment, this would be an inter-agent message
-    # For demo, we'll simulate the coordination
-    
-    advisor_address = os.getenv("ADVISOR_ADDRESS", "advisor_agent_simulated")
-    
     # Create inter-agent consultation request
     consultation_request = {
         "patient_id": sender,
@@ -194,9 +232,17 @@ async def handle_appointment_request(ctx: Context, sender: str, request_data: Di
     
     logger.info(f"🤝 Coordinating with Medical Advisor: {consultation_request}")
     
-    # Simulate advisor response (in production, this is an actual agent message)
-    # The Medical Advisor agent would analyze using MeTTa and respond
-    advisor_response = await simulate_advisor_consultation(consultation_request)
+    # The Medical Advisor agent analyzes using MeTTa and responds; if it is
+    # slow or unavailable the coordinator runs the same analysis locally
+    try:
+        advisor_response = await consult_advisor(ctx, consultation_request)
+    except LoadShedError:
+        logger.warning(f"⏳ Triage queue full, shed request from {sender}")
+        await ctx.send(sender, ChatResponse(response=(
+            "⏳ We're handling many requests right now. Please try again in a moment.\n\n"
+            "🚨 If this is an emergency, call emergency services immediately."
+        )))
+        return
     
     # Step 3: Create appointment based on advisor recommendation
     appointment_id = str(uuid4())[:8]
@@ -207,13 +253,14 @@ async def handle_appointment_request(ctx: Context, sender: str, request_data: Di
         "recommended_specialist": advisor_response["specialist"],
         "urgency": advisor_response["urgency"],
         "conditions": advisor_response["conditions"],
-        "scheduled_time": generate_appointment_time(request_data["preferred_time"], 
+        "scheduled_time": generate_appointment_time(advisor_response["specialist"],
+                                                     request_data["preferred_time"],
                                                      advisor_response["urgency"]),
         "status": "confirmed",
         "created_at": datetime.utcnow().isoformat()
     }
     
-    appointment_storage[appointment_id] = appointment
+    appointment_storage.add(appointment)
     
     # Step 4: Send confirmation to patient
     confirmation_msg = format_appointment_confirmation(appointment, advisor_response)
@@ -222,18 +269,47 @@ async def handle_appointment_request(ctx: Context, sender: str, request_data: Di
     logger.info(f"✅ Appointment {appointment_id} created for {sender}")
 
 
-async def simulate_advisor_consultation(request: Dict) -> Dict:
-    """
-    Simulate Medical Advisor agent response
-    In production, this is an actual inter-agent Chat Protocol message
-    """
-    # Import MeTTa interface
-    import sys
-    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-    from metta.metta_interface import query_metta
+async def consult_advisor(ctx: Context, request: Dict) -> Dict:
+    """Ask the Medical Advisor agent, falling back to local MeTTa inference"""
+    if len(advisor_pool):
+        message = ConsultationRequest(request_id=uuid4().hex, **request)
+        try:
+            response = await advisor_pool.call(advisor_client, ctx.send, message)
+            if response.status != "busy":
+                return {
+                    "specialist": response.specialist,
+                    "urgency": response.urgency,
+                    "conditions": response.conditions,
+                    "confidence": response.confidence,
+                    "analysis": response.analysis
+                }
+            logger.warning("⏳ Medical Advisor is busy; using local MeTTa inference")
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ Medical Advisor did not answer {message.request_id} in time; using local MeTTa inference")
+        except ConsultationUnavailable as e:
+            logger.warning(f"⏳ {e}; using local MeTTa inference")
     
-    # Use MeTTa to analyze symptoms
-    metta_result = query_metta(" ".join(request["symptoms"]))
+    return await local_advisor_consultation(request)
+
+
+@consultation_proto.on_message(model=ConsultationResponse)
+async def handle_consultation_response(ctx: Context, sender: str, msg: ConsultationResponse):
+    """Hand a Medical Advisor response to the consultation waiting for it"""
+    if not advisor_client.resolve(msg.request_id, msg):
+        logger.info(f"Dropped late consultation response {msg.request_id} from {sender}")
+
+
+@consultation_proto.on_message(model=AdvisorHeartbeat)
+async def handle_advisor_heartbeat(ctx: Context, sender: str, msg: AdvisorHeartbeat):
+    """Add Medical Advisor agents to the pool as they announce themselves"""
+    if advisor_pool.add(sender):
+        logger.info(f"🩺 Medical Advisor {sender} joined the pool ({len(advisor_pool)} advisors)")
+
+
+async def local_advisor_consultation(request: Dict) -> Dict:
+    """Run the Medical Advisor's MeTTa analysis in this process"""
+    # Use MeTTa to analyze symptoms, admitted by urgency under load
+    metta_result = await query_metta_async(" ".join(request["symptoms"]), triage=True)
     
     if metta_result["status"] == "success" and metta_result["possible_conditions"]:
         top_condition = metta_result["possible_conditions"][0]
@@ -255,30 +331,16 @@ async def simulate_advisor_consultation(request: Dict) -> Dict:
         }
 
 
-def generate_appointment_time(preferred: Optional[str], urgency: str) -> str:
-    """Generate appointment time based on preferences and urgency"""
-    from datetime import timedelta
-    
-    now = datetime.utcnow()
-    
+def generate_appointment_time(specialist: str, preferred: Optional[str], urgency: str) -> str:
+    """Book the specialist's earliest free slot allowed by urgency and preference"""
     if urgency == "emergency":
         return "IMMEDIATE - Please visit Emergency Room"
-    elif urgency == "high":
-        return (now + timedelta(hours=4)).strftime("%Y-%m-%d %H:%M UTC")
-    elif urgency == "moderate":
-        if preferred == "today":
-            return (now + timedelta(hours=8)).strftime("%Y-%m-%d %H:%M UTC")
-        elif preferred == "tomorrow":
-            return (now + timedelta(days=1)).strftime("%Y-%m-%d 09:00 UTC")
-        else:
-            return (now + timedelta(days=2)).strftime("%Y-%m-%d 10:00 UTC")
-    else:  # low urgency
-        if preferred == "next_week":
-            return (now + timedelta(days=7)).strftime("%Y-%m-%d 10:00 UTC")
-        else:
-            return (now + timedelta(days=3)).strftime("%Y-%m-%d 14:00 UTC")
+    
+    slot = slot_scheduler.book(specialist, urgency, preferred)
+    return format_slot(slot) if slot else WAITLISTED
 
 
+@stage("response_formatting").time()
 def format_appointment_confirmation(appointment: Dict, advisor_response: Dict) -> str:
     """Format appointment confirmation message"""
     msg = "✅ Appointment Confirmed!\n\n"
@@ -303,9 +365,8 @@ def format_appointment_confirmation(appointment: Dict, advisor_response: Dict) -
 
 async def handle_status_inquiry(ctx: Context, sender: str):
     """Handle appointment status inquiry"""
-    # Find appointments for this sender
-    user_appointments = [apt for apt in appointment_storage.values() 
-                        if apt["patient"] == sender]
+    # Find appointments for this sender through the patient index
+    user_appointments = appointment_storage.by_patient(sender)
     
     if not user_appointments:
         response_msg = (
@@ -323,6 +384,42 @@ async def handle_status_inquiry(ctx: Context, sender: str):
     await ctx.send(sender, ChatResponse(response=response_msg))
 
 
+async def handle_modification(ctx: Context, sender: str, request_data: Dict):
+    """Cancel or reschedule one of the sender's appointments, releasing its slot"""
+    active = [apt for apt in appointment_storage.by_patient(sender) if apt["status"] != "cancelled"]
+    if request_data["appointment_id"]:
+        active = [apt for apt in active if apt["id"] == request_data["appointment_id"]]
+    if len(active) != 1:
+        response_msg = "I can help you modify your appointment. Please provide your appointment ID"
+        if active:
+            response_msg += f" ({', '.join(apt['id'] for apt in active)})"
+        await ctx.send(sender, ChatResponse(response=response_msg + "."))
+        return
+    
+    appointment = dict(active[0])
+    if "reschedule" in request_data["raw_text"].lower():
+        # Book the new time before freeing the old one so it cannot be offered again
+        scheduled_time = generate_appointment_time(appointment["recommended_specialist"],
+                                                   request_data["preferred_time"], appointment["urgency"])
+        if scheduled_time == WAITLISTED:
+            await ctx.send(sender, ChatResponse(response=(
+                f"There is no other free time for appointment {appointment['id']}; "
+                f"it stays at {appointment['scheduled_time']}."
+            )))
+            return
+        slot_scheduler.release_appointment(appointment)
+        appointment["scheduled_time"] = scheduled_time
+        response_msg = f"🔄 Appointment {appointment['id']} rescheduled to {scheduled_time}."
+    else:
+        slot_scheduler.release_appointment(appointment)
+        appointment["status"] = "cancelled"
+        response_msg = f"❌ Appointment {appointment['id']} cancelled."
+    
+    appointment_storage[appointment["id"]] = appointment
+    await ctx.send(sender, ChatResponse(response=response_msg, appointment_id=appointment["id"]))
+    logger.info(f"✅ Appointment {appointment['id']} {appointment['status']} for {sender}")
+
+
 # Simple message handler for testing
 @agent.on_message(model=ChatRequest)
 async def message_handler(ctx: Context, sender: str, msg: ChatRequest):
@@ -330,8 +427,9 @@ async def message_handler(ctx: Context, sender: str, msg: ChatRequest):
     await handle_chat_message(ctx, sender, msg)
 
 
-# Include chat protocol
+# Include chat and consultation protocols
 agent.include(chat_proto)
+agent.include(consultation_proto)
 
 
 @agent.on_event("startup")
@@ -344,13 +442,19 @@ async def startup(ctx: Context):
     logger.info(f"Agent Address: {ctx.agent.address}")
     logger.info(f"Agent Port: {AGENT_PORT}")
     logger.info(f"Chat Protocol: ENABLED")
+    logger.info(f"Medical Advisors: {len(advisor_pool) or 'none yet, local MeTTa inference'}")
     logger.info(f"Manifest Publishing: ENABLED")
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+        logger.info(f"Metrics: http://0.0.0.0:{METRICS_PORT}/metrics")
     logger.info("=" * 60)
 
 
 @agent.on_event("shutdown")
 async def shutdown(ctx: Context):
     """Agent shutdown event"""
+    logger.info(f"Advisor consultations: {advisor_client.stats()}")
+    logger.info(f"Advisor pool: {advisor_pool.stats()}")
     logger.info("👋 Appointment Coordinator Agent shutting down...")
 
 
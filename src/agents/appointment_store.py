@@ -0,0 +1,310 @@
+"""
+Appointment storage shared by the coordinator agents and the web UI
+Appointments are kept by id with secondary indexes by patient, specialist and
+status, and can be iterated in scheduled-time order
+"""
+
+import abc
+import json
+import sqlite3
+import threading
+from bisect import bisect_left, insort
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from ..config import Config
+except ImportError:
+    from config import Config
+
+STORE_BACKENDS = ("memory", "sqlite")
+INDEXED_FIELDS = ("patient", "specialist", "status")
+# Free-text patient input, only written to disk when STORE_PHI is enabled
+PHI_FIELDS = ("symptoms",)
+
+
+def index_values(appointment: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """The indexed fields of an appointment (the coordinator agent calls its specialist ``recommended_specialist``)"""
+    return {
+        "patient": appointment.get("patient"),
+        "specialist": appointment.get("specialist") or appointment.get("recommended_specialist"),
+        "status": appointment.get("status"),
+    }
+
+
+def time_key(appointment: Dict[str, Any]) -> str:
+    """
+    Sort key for the scheduled time
+
+    Scheduled times are "YYYY-MM-DD HH:MM UTC" strings, which sort correctly as
+    text; immediate (emergency) appointments have no date and sort first.
+    """
+    scheduled = str(appointment.get("scheduled_time") or "")
+    return scheduled if scheduled[:1].isdigit() else ""
+
+
+class AppointmentStore(MutableMapping):
+    """
+    Appointments by id, usable wherever a plain dict of appointments was
+
+    Indexes are maintained on assignment and deletion, so an appointment that
+    changes (e.g. its status) must be assigned back to the store rather than
+    mutated in place. Backends implement the mapping methods plus ``find`` and
+    ``in_time_order`` (MutableMapping is already an ``abc.ABC``).
+    """
+
+    def add(self, appointment: Dict[str, Any]) -> str:
+        self[appointment["id"]] = appointment
+        return appointment["id"]
+
+    def add_many(self, appointments: Iterable[Dict[str, Any]]) -> int:
+        count = 0
+        for appointment in appointments:
+            self.add(appointment)
+            count += 1
+        return count
+
+    @abc.abstractmethod
+    def find(self, field: str, value: str) -> List[Dict[str, Any]]:
+        """Appointments whose indexed ``field`` equals ``value``, in the order they were stored"""
+
+    def by_patient(self, patient: str) -> List[Dict[str, Any]]:
+        return self.find("patient", patient)
+
+    def by_specialist(self, specialist: str) -> List[Dict[str, Any]]:
+        return self.find("specialist", specialist)
+
+    def by_status(self, status: str) -> List[Dict[str, Any]]:
+        return self.find("status", status)
+
+    @abc.abstractmethod
+    def in_time_order(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Appointments by scheduled time, optionally limited to ``start <= time < end``"""
+
+    def claim_slot(self, specialist: str, scheduled_time: str, capacity: int) -> bool:
+        """
+        Take one of the ``capacity`` places in a specialist's slot, or False if none is left
+
+        A store private to one process has nothing to coordinate: the
+        scheduler's own calendar is authoritative, so every claim succeeds.
+        """
+        return True
+
+    def release_slot(self, specialist: str, scheduled_time: str) -> None:
+        """Give back a place taken with ``claim_slot``"""
+
+
+class InMemoryAppointmentStore(AppointmentStore):
+    """Dict-backed store with hash indexes and a sorted scheduled-time list"""
+
+    def __init__(self):
+        self._appointments: Dict[str, Dict[str, Any]] = {}
+        # field -> value -> ids (dicts keep insertion order and delete in O(1))
+        self._indexes: Dict[str, Dict[str, Dict[str, None]]] = {field: {} for field in INDEXED_FIELDS}
+        # Sorted (time key, sequence, id); the sequence keeps equal times in insertion order
+        self._timeline: List[Tuple[str, int, str]] = []
+        self._positions: Dict[str, Tuple[str, int, str]] = {}
+        self._sequence = 0
+
+    def __getitem__(self, appointment_id: str) -> Dict[str, Any]:
+        return self._appointments[appointment_id]
+
+    def __setitem__(self, appointment_id: str, appointment: Dict[str, Any]) -> None:
+        if appointment_id in self._appointments:
+            # Re-assignment moves the appointment to the end, as REPLACE does in SQLite
+            self._unindex(appointment_id)
+            del self._appointments[appointment_id]
+        self._appointments[appointment_id] = appointment
+        for field, value in index_values(appointment).items():
+            if value is not None:
+                self._indexes[field].setdefault(value, {})[appointment_id] = None
+        self._sequence += 1
+        entry = (time_key(appointment), self._sequence, appointment_id)
+        insort(self._timeline, entry)
+        self._positions[appointment_id] = entry
+
+    def __delitem__(self, appointment_id: str) -> None:
+        self._unindex(appointment_id)
+        del self._appointments[appointment_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._appointments)
+
+    def __len__(self) -> int:
+        return len(self._appointments)
+
+    def __contains__(self, appointment_id: object) -> bool:
+        return appointment_id in self._appointments
+
+    def _unindex(self, appointment_id: str) -> None:
+        for field, value in index_values(self._appointments[appointment_id]).items():
+            ids = self._indexes[field].get(value)
+            if ids is not None:
+                ids.pop(appointment_id, None)
+                if not ids:
+                    del self._indexes[field][value]
+        entry = self._positions.pop(appointment_id)
+        del self._timeline[bisect_left(self._timeline, entry)]
+
+    def find(self, field: str, value: str) -> List[Dict[str, Any]]:
+        if field not in self._indexes:
+            raise ValueError(f"Unknown appointment index: {field!r}")
+        return [self._appointments[i] for i in self._indexes[field].get(value, ())]
+
+    def in_time_order(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        timeline = self._timeline
+        first = bisect_left(timeline, (start,)) if start is not None else 0
+        last = bisect_left(timeline, (end,)) if end is not None else len(timeline)
+        # Iterate over a copy of the slice so the store can change meanwhile
+        for _scheduled, _sequence, appointment_id in timeline[first:last]:
+            appointment = self._appointments.get(appointment_id)
+            if appointment is not None:
+                yield appointment
+
+
+class SQLiteAppointmentStore(AppointmentStore):
+    """
+    Durable store on a SQLite file, shared by every process that opens it
+
+    The database runs in WAL mode so readers never block the writer, each
+    thread gets its own connection, and ``add_many`` inserts a batch in one
+    transaction. Fields in ``PHI_FIELDS`` are not persisted unless
+    ``store_phi`` is set. Slot claims live in their own table, keyed by
+    specialist, time and place, so two processes never book the same place.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS appointments ("
+        "id TEXT PRIMARY KEY, patient TEXT, specialist TEXT, status TEXT, "
+        "scheduled TEXT NOT NULL, data TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS appointments_patient ON appointments (patient)",
+        "CREATE INDEX IF NOT EXISTS appointments_specialist ON appointments (specialist)",
+        "CREATE INDEX IF NOT EXISTS appointments_status ON appointments (status)",
+        "CREATE INDEX IF NOT EXISTS appointments_scheduled ON appointments (scheduled)",
+        # One row per booked place in a slot, so processes cannot book the same place
+        "CREATE TABLE IF NOT EXISTS slot_claims ("
+        "specialist TEXT NOT NULL, scheduled TEXT NOT NULL, seat INTEGER NOT NULL, "
+        "PRIMARY KEY (specialist, scheduled, seat))",
+    )
+    # REPLACE gives a re-assigned appointment a new rowid, so rowid order is
+    # the order appointments were stored, as in the in-memory store
+    INSERT = ("INSERT OR REPLACE INTO appointments (id, patient, specialist, status, scheduled, data) "
+              "VALUES (?, ?, ?, ?, ?, ?)")
+
+    def __init__(self, path: str, store_phi: bool = Config.STORE_PHI, timeout: float = 5.0):
+        self.path = str(path)
+        self.store_phi = store_phi
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as connection:
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Durable at checkpoints rather than every commit; safe with WAL
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _row(self, appointment: Dict[str, Any]) -> Tuple[Any, ...]:
+        values = index_values(appointment)
+        if not self.store_phi:
+            appointment = {k: v for k, v in appointment.items() if k not in PHI_FIELDS}
+        return (appointment["id"], values["patient"], values["specialist"], values["status"],
+                time_key(appointment), json.dumps(appointment, default=str))
+
+    def __getitem__(self, appointment_id: str) -> Dict[str, Any]:
+        row = self._connection().execute(
+            "SELECT data FROM appointments WHERE id = ?", (appointment_id,)).fetchone()
+        if row is None:
+            raise KeyError(appointment_id)
+        return json.loads(row[0])
+
+    def __setitem__(self, appointment_id: str, appointment: Dict[str, Any]) -> None:
+        if appointment.get("id") != appointment_id:
+            appointment = dict(appointment, id=appointment_id)
+        with self._connection() as connection:
+            connection.execute(self.INSERT, self._row(appointment))
+
+    def add_many(self, appointments: Iterable[Dict[str, Any]]) -> int:
+        rows = [self._row(appointment) for appointment in appointments]
+        with self._connection() as connection:
+            connection.executemany(self.INSERT, rows)
+        return len(rows)
+
+    def __delitem__(self, appointment_id: str) -> None:
+        with self._connection() as connection:
+            deleted = connection.execute("DELETE FROM appointments WHERE id = ?", (appointment_id,)).rowcount
+        if not deleted:
+            raise KeyError(appointment_id)
+
+    def __iter__(self) -> Iterator[str]:
+        for (appointment_id,) in self._connection().execute("SELECT id FROM appointments ORDER BY rowid"):
+            yield appointment_id
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM appointments").fetchone()[0]
+
+    def __contains__(self, appointment_id: object) -> bool:
+        return self._connection().execute(
+            "SELECT 1 FROM appointments WHERE id = ?", (appointment_id,)).fetchone() is not None
+
+    def find(self, field: str, value: str) -> List[Dict[str, Any]]:
+        if field not in INDEXED_FIELDS:
+            raise ValueError(f"Unknown appointment index: {field!r}")
+        rows = self._connection().execute(
+            f"SELECT data FROM appointments WHERE {field} = ? ORDER BY rowid", (value,))
+        return [json.loads(data) for (data,) in rows]
+
+    def in_time_order(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        query = "SELECT data FROM appointments WHERE scheduled >= ?"
+        params: List[str] = [start or ""]
+        if end is not None:
+            query += " AND scheduled < ?"
+            params.append(end)
+        for (data,) in self._connection().execute(query + " ORDER BY scheduled, rowid", params):
+            yield json.loads(data)
+
+    def claim_slot(self, specialist: str, scheduled_time: str, capacity: int) -> bool:
+        with self._connection() as connection:
+            for seat in range(capacity):
+                if connection.execute(
+                        "INSERT OR IGNORE INTO slot_claims (specialist, scheduled, seat) VALUES (?, ?, ?)",
+                        (specialist, scheduled_time, seat)).rowcount:
+                    return True
+        return False
+
+    def release_slot(self, specialist: str, scheduled_time: str) -> None:
+        with self._connection() as connection:
+            connection.execute(
+                "DELETE FROM slot_claims WHERE rowid = (SELECT rowid FROM slot_claims "
+                "WHERE specialist = ? AND scheduled = ? ORDER BY seat DESC LIMIT 1)",
+                (specialist, scheduled_time))
+
+    def close(self) -> None:
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def create_appointment_store(backend: str = Config.APPOINTMENT_STORE,
+                             path: str = Config.APPOINTMENT_DB_PATH) -> AppointmentStore:
+    """The appointment store selected by ``APPOINTMENT_STORE`` ("memory" or "sqlite")"""
+    if backend == "memory":
+        return InMemoryAppointmentStore()
+    if backend == "sqlite":
+        resolved = Path(path)
+        return SQLiteAppointmentStore(resolved if resolved.is_absolute() else Config.BASE_DIR / resolved)
+    raise ValueError(f"Unknown appointment store backend: {backend!r} (expected one of {STORE_BACKENDS})")
@@ -0,0 +1,130 @@
+"""
+Incremental parsing of batch uploads for /analyze/batch
+A JSON array or NDJSON body is decoded item by item as it arrives, so memory
+stays bounded by the largest item rather than the upload
+"""
+
+import codecs
+import json
+from typing import Any, AsyncIterator, Optional, Tuple
+
+_WHITESPACE = " \t\r\n"
+
+
+class BatchInputError(ValueError):
+    """The upload cannot be parsed any further"""
+
+
+class BadItem:
+    """An NDJSON line that is not valid JSON; the rest of the upload is still read"""
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+def item_fields(item: Any) -> Tuple[Optional[str], Any]:
+    """``(symptoms text, client id)`` of an item: a string or ``{"symptoms": ..., "id": ...}``"""
+    if isinstance(item, str):
+        return item, None
+    if isinstance(item, dict) and isinstance(item.get("symptoms"), str):
+        return item["symptoms"], item.get("id")
+    return None, item.get("id") if isinstance(item, dict) else None
+
+
+async def _text_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes], max_item_bytes: int = 65536) -> AsyncIterator[Any]:
+    """Items of an NDJSON body, with ``BadItem`` in place of unparseable lines"""
+    buffer = ""
+    async for text in _text_chunks(chunks):
+        buffer += text
+        *lines, buffer = buffer.split("\n")
+        if len(buffer) > max_item_bytes:
+            raise BatchInputError(f"Line longer than {max_item_bytes} bytes")
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+    if buffer.strip():
+        yield _parse_line(buffer)
+
+
+def _parse_line(line: str) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return BadItem(f"Invalid JSON: {e}")
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes], max_item_bytes: int = 65536) -> AsyncIterator[Any]:
+    """Items of a JSON array body, parsed one at a time"""
+    decoder = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+    texts = _text_chunks(chunks)
+
+    async def more() -> bool:
+        nonlocal buffer, position, eof
+        if eof:
+            return False
+        try:
+            text = await texts.__anext__()
+        except StopAsyncIteration:
+            eof = True
+            return False
+        buffer = buffer[position:] + text
+        position = 0
+        return True
+
+    def skip_whitespace() -> None:
+        nonlocal position
+        while position < len(buffer) and buffer[position] in _WHITESPACE:
+            position += 1
+
+    # Expecting "[", a value or "]", a value, or "," / "]"
+    state = "open"
+    while True:
+        skip_whitespace()
+        if position == len(buffer):
+            if await more():
+                continue
+            raise BatchInputError("Unexpected end of JSON array")
+
+        char = buffer[position]
+        if state == "open":
+            if char != "[":
+                raise BatchInputError("Expected a JSON array")
+            position, state = position + 1, "first"
+            continue
+        if state == "separator":
+            position += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise BatchInputError(f"Expected ',' or ']' in JSON array, found {char!r}")
+            state = "value"
+            continue
+        if state == "first" and char == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            item, end = None, -1
+        # A value running up to the end of the buffer may be cut short ("12" of "123")
+        if end < 0 or (end == len(buffer) and not eof):
+            if len(buffer) - position > max_item_bytes:
+                raise BatchInputError(f"Item longer than {max_item_bytes} bytes")
+            if await more():
+                continue
+            if end < 0:
+                raise BatchInputError("Invalid JSON in array")
+        position, state = end, "separator"
+        yield item
@@ -0,0 +1,81 @@
+"""
+Medical Advisor side of the consultation protocol
+Answers the Appointment Coordinator's ConsultationRequests from a MeTTa query
+"""
+
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Tuple, Type
+
+from uagents import Context, Protocol
+
+from .consultation_protocol import CONSULTATION_PROTOCOL, ConsultationRequest, ConsultationResponse
+
+logger = logging.getLogger(__name__)
+
+
+def create_consultation_protocol(
+    query: Callable[..., Awaitable[Dict[str, Any]]],
+    format_analysis: Callable[[List[str], List[Dict], Dict], str],
+    shed_errors: Tuple[Type[BaseException], ...] = (),
+) -> Protocol:
+    """
+    Protocol answering each ConsultationRequest with ``query(symptom_text, triage=True)``
+
+    The response echoes the request_id so the coordinator can match it up.
+    Requests rejected with one of ``shed_errors`` are answered "busy". Include
+    it in an agent created with ``CONSULTING_AGENT_OPTIONS``: handled one at a
+    time, concurrent requests could never share a computation or be reordered
+    by urgency while they wait for the triage dispatcher.
+    """
+    protocol = Protocol(name=CONSULTATION_PROTOCOL)
+
+    @protocol.on_message(model=ConsultationRequest, replies={ConsultationResponse})
+    async def handle_consultation_request(ctx: Context, sender: str, msg: ConsultationRequest):
+        logger.info(f"🤝 Received consultation request {msg.request_id} from {sender}")
+
+        # Analyze using MeTTa
+        symptom_text = " ".join(msg.symptoms)
+        try:
+            metta_result = await query(symptom_text, triage=True)
+        except shed_errors:
+            logger.warning(f"⏳ Triage queue full, shed consultation from {sender}")
+            await ctx.send(sender, ConsultationResponse(
+                request_id=msg.request_id, status="busy", patient_id=msg.patient_id, urgency=msg.urgency
+            ))
+            return
+
+        # Prepare response
+        if metta_result["status"] == "success" and metta_result["possible_conditions"]:
+            top_condition = metta_result["possible_conditions"][0]
+
+            response = ConsultationResponse(
+                request_id=msg.request_id,
+                status="success",
+                patient_id=msg.patient_id,
+                specialist=top_condition["specialist"],
+                urgency=top_condition["urgency"],
+                conditions=[c["condition"] for c in metta_result["possible_conditions"][:3]],
+                confidence=top_condition["confidence"],
+                analysis=format_analysis(
+                    metta_result["identified_symptoms"],
+                    metta_result["possible_conditions"],
+                    metta_result
+                )
+            )
+        else:
+            response = ConsultationResponse(
+                request_id=msg.request_id,
+                status="clarification_needed",
+                patient_id=msg.patient_id,
+                specialist="general_practitioner",
+                urgency="moderate",
+                conditions=["general_consultation"],
+                confidence=0.5,
+                analysis="Unable to provide specific diagnosis. Recommend general practitioner."
+            )
+
+        # Send response back to coordinator
+        await ctx.send(sender, response)
+        logger.info(f"✅ Sent consultation response {msg.request_id} to {sender}")
+
+    return protocol
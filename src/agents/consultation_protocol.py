@@ -0,0 +1,38 @@
+"""
+Messages exchanged between the Appointment Coordinator and Medical Advisor agents
+"""
+
+from typing import List, Optional
+
+from uagents import Model
+
+CONSULTATION_PROTOCOL = "medical_consultation"
+
+# Agent settings for both ends of a consultation. Coordinators await replies
+# inside a message handler, so with sequential dispatch the reply would queue
+# behind that handler until the call timed out; advisors need several requests
+# in flight to coalesce identical queries and to triage them by urgency
+CONSULTING_AGENT_OPTIONS = {"handle_messages_concurrently": True}
+
+
+class ConsultationRequest(Model):
+    request_id: str
+    patient_id: str
+    symptoms: List[str]
+    urgency: str
+    request_time: str
+
+
+class AdvisorHeartbeat(Model):
+    """Sent periodically by a Medical Advisor so coordinators add it to their pool"""
+
+
+class ConsultationResponse(Model):
+    request_id: str
+    status: str  # success, clarification_needed or busy
+    patient_id: str
+    specialist: Optional[str] = None
+    urgency: Optional[str] = None
+    conditions: List[str] = []
+    confidence: Optional[float] = None
+    analysis: Optional[str] = None
@@ -0,0 +1,89 @@
+"""
+Request/response calls over one-way agent messages
+Each request carries a correlation id; the caller awaits a future that the
+response handler resolves, with a timeout and a cap on calls in flight
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+
+class ConsultationUnavailable(RuntimeError):
+    """Too many consultations are already in flight"""
+
+
+class ConsultationClient:
+    """
+    Pending consultations keyed by ``request_id``
+
+    ``call`` sends a message whose ``request_id`` is unique and waits up to
+    ``timeout`` seconds for ``resolve`` to be called with the same id (from the
+    agent's response handler). Responses arriving after their caller timed out
+    are counted as late and dropped. Use from a single event loop.
+    """
+
+    def __init__(self, timeout: float = 5.0, max_in_flight: int = 64,
+                 clock: Callable[[], float] = time.perf_counter):
+        if max_in_flight <= 0:
+            raise ValueError("max_in_flight must be positive")
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self._clock = clock
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.answered = 0
+        self.timed_out = 0
+        self.rejected = 0
+        self.late = 0
+        self._rtt_total = 0.0
+        self._rtt_max = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+    async def call(self, send: Callable[[str, Any], Awaitable[Any]], address: str, message: Any,
+                   timeout: float = None) -> Any:
+        """Send ``message`` to ``address`` and return its response, or raise ``asyncio.TimeoutError``"""
+        if len(self._pending) >= self.max_in_flight:
+            self.rejected += 1
+            raise ConsultationUnavailable(f"{self.max_in_flight} consultations already in flight")
+
+        request_id = message.request_id
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+        started = self._clock()
+        try:
+            await send(address, message)
+            response = await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
+        rtt = self._clock() - started
+        self.answered += 1
+        self._rtt_total += rtt
+        self._rtt_max = max(self._rtt_max, rtt)
+        return response
+
+    def resolve(self, request_id: str, response: Any) -> bool:
+        """Complete the pending call for ``request_id``; False if nobody is waiting for it"""
+        future = self._pending.get(request_id)
+        if future is None or future.done():
+            self.late += 1
+            return False
+        future.set_result(response)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._pending),
+            "max_in_flight": self.max_in_flight,
+            "answered": self.answered,
+            "timed_out": self.timed_out,
+            "rejected": self.rejected,
+            "late": self.late,
+            "mean_rtt_ms": round(self._rtt_total / self.answered * 1000, 3) if self.answered else 0.0,
+            "max_rtt_ms": round(self._rtt_max * 1000, 3),
+        }
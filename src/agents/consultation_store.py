@@ -0,0 +1,123 @@
+"""
+Bounded consultation history for the Medical Advisor agent
+Keeps a few compact records per sender, evicts the least recently active
+senders beyond a global cap, and expires idle senders after a TTL
+"""
+
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+
+class ConsultationRecord(NamedTuple):
+    """One consultation: when it happened, what was reported and the top finding"""
+    timestamp: float
+    symptom_ids: Tuple[int, ...]
+    condition: Optional[str]
+    specialist: Optional[str]
+    urgency: Optional[str]
+    confidence: Optional[float]
+
+
+class ConsultationStore:
+    """
+    Per-sender consultation history with a per-sender cap, an LRU over
+    senders and TTL expiry
+
+    Records keep the top condition and interned symptom ids rather than the
+    whole MeTTa result. Call ``expire`` periodically (the agent does so from
+    an interval handler) to drop senders idle for longer than ``ttl_seconds``.
+    """
+
+    def __init__(self, max_per_sender: int = 20, max_senders: int = 1000,
+                 ttl_seconds: float = 3600, clock: Callable[[], float] = time.time):
+        self.max_per_sender = max_per_sender
+        self.max_senders = max_senders
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        # sender -> (last activity, records); least recently active first
+        self._senders: "OrderedDict[str, Tuple[float, Deque[ConsultationRecord]]]" = OrderedDict()
+        self._symptom_ids: Dict[str, int] = {}
+        self._symptom_names: List[str] = []
+        self.evicted_senders = 0
+        self.expired_senders = 0
+
+    def __contains__(self, sender: str) -> bool:
+        return sender in self._senders
+
+    def __len__(self) -> int:
+        return len(self._senders)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._senders)
+
+    def _touch(self, sender: str) -> Deque[ConsultationRecord]:
+        entry = self._senders.pop(sender, None)
+        records = entry[1] if entry else deque(maxlen=self.max_per_sender)
+        self._senders[sender] = (self._clock(), records)
+        while len(self._senders) > self.max_senders:
+            self._senders.popitem(last=False)
+            self.evicted_senders += 1
+        return records
+
+    def start_session(self, sender: str) -> None:
+        """Mark a sender active, creating an empty history if needed"""
+        self._touch(sender)
+
+    def record(self, sender: str, metta_result: Dict) -> ConsultationRecord:
+        """Store the compact form of a ``query_metta`` result for ``sender``"""
+        conditions = metta_result.get("possible_conditions") or []
+        top = conditions[0] if conditions else {}
+        record = ConsultationRecord(
+            timestamp=self._clock(),
+            symptom_ids=tuple(self._symptom_id(s) for s in metta_result.get("identified_symptoms", [])),
+            condition=top.get("condition"),
+            specialist=top.get("specialist"),
+            urgency=top.get("urgency"),
+            confidence=top.get("confidence"),
+        )
+        self._touch(sender).append(record)
+        return record
+
+    def get(self, sender: str) -> List[ConsultationRecord]:
+        """A sender's records, oldest first (empty if unknown or expired)"""
+        entry = self._senders.get(sender)
+        return list(entry[1]) if entry else []
+
+    def symptoms(self, record: ConsultationRecord) -> List[str]:
+        return [self._symptom_names[i] for i in record.symptom_ids]
+
+    @staticmethod
+    def isoformat(record: ConsultationRecord) -> str:
+        return datetime.utcfromtimestamp(record.timestamp).isoformat()
+
+    def expire(self) -> int:
+        """Drop senders idle for longer than the TTL; returns how many were dropped"""
+        cutoff = self._clock() - self.ttl_seconds
+        expired = 0
+        # Senders are ordered by last activity, so stop at the first recent one
+        while self._senders:
+            sender, (last_seen, _records) = next(iter(self._senders.items()))
+            if last_seen > cutoff:
+                break
+            del self._senders[sender]
+            expired += 1
+        self.expired_senders += expired
+        return expired
+
+    def _symptom_id(self, symptom: str) -> int:
+        symptom_id = self._symptom_ids.get(symptom)
+        if symptom_id is None:
+            symptom_id = self._symptom_ids[symptom] = len(self._symptom_names)
+            self._symptom_names.append(symptom)
+        return symptom_id
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "senders": len(self._senders),
+            "records": sum(len(records) for _last_seen, records in self._senders.values()),
+            "symptom_vocabulary": len(self._symptom_names),
+            "evicted_senders": self.evicted_senders,
+            "expired_senders": self.expired_senders,
+        }
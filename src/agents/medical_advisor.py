@@ -5,6 +5,7 @@ and specialist recommendations
 """
 
 import os
+import socket
 import logging
 from datetime import datetime
 from uuid import uuid4
@@ -36,27 +37,48 @@ logger = logging.getLogger(__name__)
 # Import MeTTa interface
 import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from metta.metta_interface import query_metta, get_metta_knowledge_graph
+from metta.metta_interface import LoadShedError, query_metta_async, get_metta_knowledge_graph
+from metta.metrics import stage, start_metrics_server
+from agents.consultation_handler import create_consultation_protocol
+from agents.consultation_protocol import AdvisorHeartbeat, CONSULTING_AGENT_OPTIONS
+from agents.consultation_store import ConsultationStore
 
 # Agent configuration
 AGENT_NAME = "medical-advisor"
 AGENT_SEED = os.getenv("ADVISOR_SEED", "advisor_demo_seed_phrase_67890")
 AGENT_PORT = 8001
-AGENT_ENDPOINT = [f"http://localhost:{AGENT_PORT}/submit"]
-
-# Initialize agent
+# Serve Prometheus metrics on this port (0 disables)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+AGENT_HOST = "localhost"
+# Replicas (e.g. docker compose --scale advisor=N) each derive their own
+# address and endpoint from the host name
+if os.getenv("ADVISOR_SEED_PER_REPLICA", "False").lower() == "true":
+    AGENT_HOST = socket.gethostname()
+    AGENT_SEED = f"{AGENT_SEED}-{AGENT_HOST}"
+AGENT_ENDPOINT = [f"http://{AGENT_HOST}:{AGENT_PORT}/submit"]
+
+# Coordinator to announce this advisor to, so it joins the coordinator's pool
+COORDINATOR_ADDRESS = os.getenv("COORDINATOR_ADDRESS", "")
+
+# Initialize agent; consultations are handled concurrently so identical
+# queries share one computation and the triage dispatcher can order them
 agent = Agent(
     name=AGENT_NAME,
     seed=AGENT_SEED,
     port=AGENT_PORT,
     endpoint=AGENT_ENDPOINT,
+    **CONSULTING_AGENT_OPTIONS,
 )
 
 # Fund agent if low on balance
 fund_agent_if_low(agent.wallet.address())
 
-# In-memory storage for consultations
-consultation_history: Dict[str, List[Dict]] = {}
+# Bounded in-memory storage for consultations
+consultation_history = ConsultationStore(
+    max_per_sender=int(os.getenv("CONSULTATION_HISTORY_PER_SENDER", "20")),
+    max_senders=int(os.getenv("CONSULTATION_HISTORY_MAX_SENDERS", "1000")),
+    ttl_seconds=float(os.getenv("CONSULTATION_HISTORY_TTL", "3600")),
+)
 
 logger.info(f"Medical Advisor Agent initialized")
 logger.info(f"Agent name: {agent.name}")
@@ -100,8 +122,7 @@ async def handle_chat_message(ctx: Context, sender: str, msg: ChatMessage):
         if isinstance(item, StartSessionContent):
             logger.info(f"🔬 Medical consultation session started with {sender}")
             
-            if sender not in consultation_history:
-                consultation_history[sender] = []
+            consultation_history.start_session(sender)
             
             welcome_msg = (
                 "Hello! I'm the Medical Advisor Agent 🩺\n\n"
@@ -124,7 +145,7 @@ async def handle_chat_message(ctx: Context, sender: str, msg: ChatMessage):
             logger.info(f"👋 Medical consultation ended with {sender}")
             
             # Provide summary
-            if sender in consultation_history and consultation_history[sender]:
+            if consultation_history.get(sender):
                 summary = create_consultation_summary(sender)
                 await ctx.send(sender, create_text_chat(summary, end_session=True))
         
@@ -140,18 +161,18 @@ async def analyze_symptoms(ctx: Context, sender: str, symptom_text: str):
     
     # Step 1: Query MeTTa knowledge graph
     logger.info(f"🧠 Querying MeTTa knowledge graph for: {symptom_text}")
-    metta_result = query_metta(symptom_text)
-    
-    # Record consultation
-    consultation_record = {
-        "timestamp": datetime.utcnow().isoformat(),
-        "symptoms_text": symptom_text,
-        "metta_result": metta_result
-    }
+    try:
+        metta_result = await query_metta_async(symptom_text, triage=True)
+    except LoadShedError:
+        logger.warning(f"⏳ Triage queue full, shed request from {sender}")
+        await ctx.send(sender, create_text_chat(
+            "⏳ I'm handling many consultations right now. Please try again in a moment.\n\n"
+            "🚨 If this is an emergency, call emergency services immediately."
+        ))
+        return
     
-    if sender not in consultation_history:
-        consultation_history[sender] = []
-    consultation_history[sender].append(consultation_record)
+    # Record consultation (top finding and symptom ids only)
+    consultation_history.record(sender, metta_result)
     
     # Step 2: Process MeTTa results and respond
     if metta_result["status"] == "clarification_needed":
@@ -193,15 +214,20 @@ async def analyze_symptoms(ctx: Context, sender: str, symptom_text: str):
         traversal_result = metta_kg.traverse_knowledge_graph(traversal_query, depth=2)
         
         # Send additional insights
+        related = [r["condition"] for r in traversal_result["final_results"]
+                   if r["condition"] != top_condition["condition"]][:3]
         additional_msg = (
             f"\n🔍 Deep Analysis (Multi-hop MeTTa Reasoning):\n"
-            f"Performed {traversal_result['hops_executed']} reasoning hops.\n\n"
-            f"⚠️ Given the urgency, I recommend immediate medical attention."
+            f"Performed {traversal_result['hops_executed']} reasoning hops.\n"
         )
+        if related:
+            additional_msg += f"Related urgent conditions to rule out: {', '.join(related)}\n"
+        additional_msg += "\n⚠️ Given the urgency, I recommend immediate medical attention."
         
         await ctx.send(sender, create_text_chat(additional_msg))
 
 
+@stage("response_formatting").time()
 def format_medical_analysis(symptoms: List[str], conditions: List[Dict], metta_result: Dict) -> str:
     """Format comprehensive medical analysis response"""
     
@@ -267,24 +293,22 @@ def format_medical_analysis(symptoms: List[str], conditions: List[Dict], metta_r
 def create_consultation_summary(patient_id: str) -> str:
     """Create summary of consultation session"""
     
-    if patient_id not in consultation_history or not consultation_history[patient_id]:
+    consultations = consultation_history.get(patient_id)
+    if not consultations:
         return "No consultation history available."
     
-    consultations = consultation_history[patient_id]
-    
     msg = "📋 Consultation Summary\n"
     msg += "=" * 40 + "\n\n"
     msg += f"Total consultations: {len(consultations)}\n\n"
     
     for i, consult in enumerate(consultations, 1):
         msg += f"Consultation {i}:\n"
-        msg += f"Time: {consult['timestamp']}\n"
-        msg += f"Symptoms: {consult['symptoms_text'][:100]}...\n"
+        msg += f"Time: {consultation_history.isoformat(consult)}\n"
+        msg += f"Symptoms: {', '.join(consultation_history.symptoms(consult)) or 'not identified'}\n"
         
-        if consult['metta_result'].get('possible_conditions'):
-            top = consult['metta_result']['possible_conditions'][0]
-            msg += f"Diagnosis: {top['condition']}\n"
-            msg += f"Specialist: {top['specialist']}\n"
+        if consult.condition:
+            msg += f"Diagnosis: {consult.condition}\n"
+            msg += f"Specialist: {consult.specialist}\n"
         
         msg += "\n"
     
@@ -301,56 +325,7 @@ async def handle_ack(ctx: Context, sender: str, msg: ChatAcknowledgement):
 
 
 # Inter-agent protocol for coordination with Appointment Coordinator
-inter_agent_proto = Protocol(name="medical_consultation")
-
-
-@inter_agent_proto.on_message(model=dict)
-async def handle_consultation_request(ctx: Context, sender: str, msg: dict):
-    """
-    Handle consultation requests from Appointment Coordinator agent
-    This enables inter-agent coordination
-    """
-    logger.info(f"🤝 Received consultation request from {sender}")
-    logger.info(f"Request: {msg}")
-    
-    # Extract symptoms from request
-    symptoms = msg.get("symptoms", [])
-    patient_id = msg.get("patient_id", "unknown")
-    urgency = msg.get("urgency", "normal")
-    
-    # Analyze using MeTTa
-    symptom_text = " ".join(symptoms)
-    metta_result = query_metta(symptom_text)
-    
-    # Prepare response
-    if metta_result["status"] == "success" and metta_result["possible_conditions"]:
-        top_condition = metta_result["possible_conditions"][0]
-        
-        response = {
-            "status": "success",
-            "patient_id": patient_id,
-            "specialist": top_condition["specialist"],
-            "urgency": top_condition["urgency"],
-            "conditions": [c["condition"] for c in metta_result["possible_conditions"][:3]],
-            "confidence": top_condition["confidence"],
-            "analysis": format_medical_analysis(
-                metta_result["identified_symptoms"],
-                metta_result["possible_conditions"],
-                metta_result
-            )
-        }
-    else:
-        response = {
-            "status": "clarification_needed",
-            "patient_id": patient_id,
-            "message": "Unable to provide specific diagnosis. Recommend general practitioner.",
-            "specialist": "general_practitioner",
-            "urgency": urgency
-        }
-    
-    # Send response back to coordinator
-    await ctx.send(sender, response)
-    logger.info(f"✅ Sent consultation response to {sender}")
+inter_agent_proto = create_consultation_protocol(query_metta_async, format_medical_analysis, (LoadShedError,))
 
 
 # Include protocols
@@ -371,9 +346,27 @@ async def startup(ctx: Context):
     logger.info(f"Inter-Agent Protocol: ENABLED")
     logger.info(f"Manifest Publishing: ENABLED")
     logger.info(f"MeTTa Knowledge Graph: LOADED")
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+        logger.info(f"Metrics: http://0.0.0.0:{METRICS_PORT}/metrics")
     logger.info("=" * 60)
 
 
+@agent.on_interval(period=float(os.getenv("CONSULTATION_SWEEP_INTERVAL", "300")))
+async def expire_consultations(ctx: Context):
+    """Drop consultation history of senders idle for longer than the TTL"""
+    expired = consultation_history.expire()
+    if expired:
+        logger.info(f"🧹 Expired consultation history for {expired} idle senders")
+
+
+@agent.on_interval(period=float(os.getenv("ADVISOR_HEARTBEAT_INTERVAL", "10")))
+async def announce_to_coordinator(ctx: Context):
+    """Let the coordinator know this advisor is up"""
+    if COORDINATOR_ADDRESS:
+        await ctx.send(COORDINATOR_ADDRESS, AdvisorHeartbeat())
+
+
 @agent.on_event("shutdown")
 async def shutdown(ctx: Context):
     """Agent shutdown event"""
@@ -0,0 +1,241 @@
+"""
+Per-client rate limiting for the web API (GCRA, an exact token bucket)
+Each client costs one stored timestamp, checked and updated in O(1) per
+request, in a bounded in-memory table or a SQLite file shared by workers
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Collection, List, Optional
+
+try:
+    from ..config import Config
+except ImportError:
+    from config import Config
+
+RATE_LIMIT_BACKENDS = ("memory", "sqlite")
+
+
+def client_key(api_key: Optional[str], client_ip: Optional[str], api_keys: Collection[str] = ()) -> str:
+    """
+    Bucket key for a request: its API key when it is one of ``api_keys``
+    (hashed, never stored as is), else its IP
+
+    Any other key is ignored, so sending a new one each time neither escapes
+    the limit nor pushes other clients out of the table.
+    """
+    if api_key and any(hmac.compare_digest(api_key, known) for known in api_keys):
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:32]
+    return f"ip:{client_ip or 'unknown'}"
+
+
+class MemoryRateLimitBackend:
+    """
+    Theoretical arrival times in an LRU table of at most ``max_keys`` clients
+
+    Evicting a client only forgets its history, which errs towards allowing
+    it. Per process, so with several workers each enforces its own limit.
+    """
+
+    blocking = False
+
+    def __init__(self, max_keys: int = 10000):
+        if max_keys <= 0:
+            raise ValueError("max_keys must be positive")
+        self.max_keys = max_keys
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def acquire(self, key: str, now: float, interval: float, limit: float) -> float:
+        """Take one request from ``key``'s bucket; seconds until it is allowed, 0.0 if it is"""
+        with self._lock:
+            tat = max(self._tats.get(key, now), now) + interval
+            if tat - now > limit:
+                return tat - now - limit
+            self._tats[key] = tat
+            self._tats.move_to_end(key)
+            if len(self._tats) > self.max_keys:
+                self._tats.popitem(last=False)
+            return 0.0
+
+
+class SQLiteRateLimitBackend:
+    """
+    Theoretical arrival times in a SQLite file, so limits hold across processes
+
+    Each request is a single atomic upsert that only advances the client's
+    timestamp when the request is allowed. Put the file on a tmpfs such as
+    ``/dev/shm`` to share the table in memory. Expired rows are pruned every
+    ``prune_every`` requests. Calls can wait up to ``timeout`` seconds on a
+    locked database, so ``RateLimiter.check_async`` runs them in a thread.
+    """
+
+    blocking = True
+
+    SCHEMA = "CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL)"
+    ACQUIRE = ("INSERT INTO rate_limits (key, tat) VALUES (:key, :now + :interval) "
+               "ON CONFLICT (key) DO UPDATE SET tat = max(tat, :now) + :interval "
+               "WHERE max(tat, :now) + :interval - :now <= :limit")
+
+    def __init__(self, path: str, timeout: float = 5.0, prune_every: int = 10000):
+        self.path = str(path)
+        self.timeout = timeout
+        self.prune_every = prune_every
+        self._requests = 0
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection().execute(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit: every statement is its own transaction. Each thread
+            # uses its own connection; close() may run on another thread
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Losing the last moments of rate-limit state on power loss is harmless
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+    def acquire(self, key: str, now: float, interval: float, limit: float) -> float:
+        """Take one request from ``key``'s bucket; seconds until it is allowed, 0.0 if it is"""
+        connection = self._connection()
+        self._requests += 1
+        if self._requests % self.prune_every == 0:
+            connection.execute("DELETE FROM rate_limits WHERE tat < ?", (now,))
+
+        cursor = connection.execute(self.ACQUIRE, {"key": key, "now": now, "interval": interval, "limit": limit})
+        if cursor.rowcount:
+            return 0.0
+        row = connection.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+        return max(row[0], now) + interval - now - limit if row else 0.0
+
+    def close(self) -> None:
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class RateLimiter:
+    """
+    Allow ``requests`` per ``period`` seconds per client, in bursts of up to ``requests``
+
+    GCRA keeps one "theoretical arrival time" per client instead of a token
+    count: each request moves it ``period / requests`` seconds on, and a
+    request is rejected when that would put it more than ``period`` seconds
+    ahead of now. ``check`` returns 0.0 for an allowed request, otherwise the
+    seconds to wait before retrying.
+    """
+
+    def __init__(self, requests: int, period: float, backend=None,
+                 clock: Callable[[], float] = time.time):
+        if requests <= 0 or period <= 0:
+            raise ValueError("requests and period must be positive")
+        self.requests = requests
+        self.period = period
+        self.interval = period / requests
+        self.backend = backend if backend is not None else MemoryRateLimitBackend()
+        # Wall-clock time, so processes sharing a SQLite table agree on it
+        self._clock = clock
+        self.allowed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def check(self, key: str) -> float:
+        retry_after = self.backend.acquire(key, self._clock(), self.interval, self.period)
+        with self._lock:
+            if retry_after:
+                self.rejected += 1
+            else:
+                self.allowed += 1
+        return retry_after
+
+    async def check_async(self, key: str) -> float:
+        """``check`` from an event loop; blocking backends run in a worker thread"""
+        if getattr(self.backend, "blocking", False):
+            return await asyncio.to_thread(self.check, key)
+        return self.check(key)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "period": self.period,
+            "clients": len(self.backend),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware limiting each client's requests to paths under ``prefix``
+
+    Clients over their limit get ``429 Too Many Requests`` with ``Retry-After``
+    before the request body is read or the application is called. Requests
+    are keyed by ``client_key``; only ``api_keys`` earn a bucket of their own.
+    """
+
+    def __init__(self, app, limiter: RateLimiter, prefix: str = "/analyze", api_keys: Collection[str] = ()):
+        self.app = app
+        self.limiter = limiter
+        self.prefix = prefix
+        self.api_keys = tuple(api_keys)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        api_key = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"x-api-key"), None)
+        client = scope.get("client")
+        retry_after = await self.limiter.check_async(client_key(api_key, client[0] if client else None, self.api_keys))
+        if not retry_after:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps({"detail": "Too many requests. Please retry shortly."}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"retry-after", str(math.ceil(retry_after)).encode("ascii")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def create_rate_limiter(requests: int = Config.RATE_LIMIT_REQUESTS, period: float = Config.RATE_LIMIT_PERIOD,
+                        backend: str = Config.RATE_LIMIT_BACKEND, path: str = Config.RATE_LIMIT_DB_PATH,
+                        max_keys: int = Config.RATE_LIMIT_MAX_KEYS) -> RateLimiter:
+    """The rate limiter selected by ``RATE_LIMIT_BACKEND`` ("memory" or "sqlite")"""
+    if backend == "memory":
+        return RateLimiter(requests, period, MemoryRateLimitBackend(max_keys))
+    if backend == "sqlite":
+        resolved = Path(path)
+        return RateLimiter(requests, period, SQLiteRateLimitBackend(
+            resolved if resolved.is_absolute() else Config.BASE_DIR / resolved))
+    raise ValueError(f"Unknown rate limit backend: {backend!r} (expected one of {RATE_LIMIT_BACKENDS})")
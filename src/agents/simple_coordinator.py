@@ -19,10 +19,13 @@ logger = logging.getLogger(__name__)
 # Import MeTTa interface
 import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from metta.metta_interface import query_metta
+from metta.metta_interface import extract_symptoms, query_metta
+from agents.appointment_store import create_appointment_store
+from agents.slot_scheduler import WAITLISTED, create_slot_scheduler, format_slot
 
-# In-memory storage for appointments
-appointment_storage: Dict[str, Dict] = {}
+# Appointment storage (APPOINTMENT_STORE selects memory or sqlite)
+appointment_storage = create_appointment_store()
+slot_scheduler = create_slot_scheduler(appointment_storage)
 
 logger.info("="*60)
 logger.info("🚀 SYNAPTIVERSE APPOINTMENT COORDINATOR - DEMO MODE")
@@ -41,12 +44,8 @@ def parse_appointment_request(text: str) -> Dict:
         "raw_text": text
     }
     
-    # Extract symptoms
-    symptom_keywords = ["fever", "cough", "pain", "headache", "nausea", "dizzy", 
-                       "chest pain", "shortness of breath", "fatigue"]
-    for symptom in symptom_keywords:
-        if symptom in text_lower:
-            request_data["symptoms"].append(symptom)
+    # Extract symptoms with the shared knowledge-graph phrase matcher
+    request_data["symptoms"] = extract_symptoms(text)
     
     # Extract urgency
     if any(word in text_lower for word in ["urgent", "emergency", "severe"]):
@@ -88,12 +87,12 @@ def process_appointment(request_text: str) -> str:
         "specialist": top_condition["specialist"],
         "urgency": top_condition["urgency"],
         "confidence": top_condition["confidence"],
-        "scheduled_time": generate_appointment_time(top_condition["urgency"]),
+        "scheduled_time": generate_appointment_time(top_condition["specialist"], top_condition["urgency"]),
         "status": "confirmed",
         "created_at": datetime.utcnow().isoformat()
     }
     
-    appointment_storage[appointment_id] = appointment
+    appointment_storage.add(appointment)
     
     logger.info(f"✅ Appointment {appointment_id} created successfully")
     
@@ -102,20 +101,13 @@ def process_appointment(request_text: str) -> str:
     return response
 
 
-def generate_appointment_time(urgency: str) -> str:
-    """Generate appointment time based on urgency"""
-    from datetime import timedelta
-    
-    now = datetime.utcnow()
-    
+def generate_appointment_time(specialist: str, urgency: str) -> str:
+    """Book the specialist's earliest free slot for this urgency"""
     if urgency == "emergency":
         return "🚨 IMMEDIATE - Visit Emergency Room"
-    elif urgency == "high":
-        return (now + timedelta(hours=4)).strftime("%Y-%m-%d %H:%M UTC")
-    elif urgency == "moderate":
-        return (now + timedelta(days=2)).strftime("%Y-%m-%d 10:00 UTC")
-    else:
-        return (now + timedelta(days=5)).strftime("%Y-%m-%d 14:00 UTC")
+    
+    slot = slot_scheduler.book(specialist, urgency)
+    return format_slot(slot) if slot else WAITLISTED
 
 
 def format_confirmation(appointment: Dict, metta_result: Dict) -> str:
@@ -0,0 +1,301 @@
+"""
+Capacity-aware appointment slot scheduler
+Each specialist has a calendar of fixed-length slots during clinic hours, and
+appointments get the earliest free slot allowed by their urgency window
+"""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .appointment_store import AppointmentStore, index_values
+
+try:
+    from ..config import Config
+    from ..metta.metrics import stage
+except ImportError:
+    from config import Config
+    from metta.metrics import stage
+
+SCHEDULED_TIME_FORMAT = "%Y-%m-%d %H:%M UTC"
+WAITLISTED = "WAITLISTED - We will contact you with the first available time"
+
+_SCHEDULING_SECONDS = stage("scheduling")
+
+# Earliest and latest start of an appointment, relative to the request
+URGENCY_WINDOWS: Dict[str, Tuple[timedelta, timedelta]] = {
+    "high": (timedelta(0), timedelta(days=1)),
+    "moderate": (timedelta(0), timedelta(days=3)),
+    "low": (timedelta(days=1), timedelta(days=14)),
+}
+
+
+def format_slot(slot: datetime) -> str:
+    return slot.strftime(SCHEDULED_TIME_FORMAT)
+
+
+def preferred_window(preferred_time: Optional[str], now: datetime) -> Optional[Tuple[datetime, datetime]]:
+    """The window for a ``preferred_time`` from ``parse_appointment_request``"""
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if preferred_time == "today":
+        return now, midnight + timedelta(days=1)
+    if preferred_time == "tomorrow":
+        return midnight + timedelta(days=1), midnight + timedelta(days=2)
+    if preferred_time == "next_week":
+        return now + timedelta(days=7), now + timedelta(days=14)
+    return None
+
+
+def appointment_slot(appointment: Dict[str, Any]) -> Optional[Tuple[str, datetime]]:
+    """The (specialist, start) of the slot an appointment holds; None if cancelled, waitlisted or immediate"""
+    specialist = index_values(appointment)["specialist"]
+    if not specialist or appointment.get("status") == "cancelled":
+        return None
+    try:
+        return specialist, datetime.strptime(appointment.get("scheduled_time") or "", SCHEDULED_TIME_FORMAT)
+    except ValueError:
+        return None
+
+
+class SpecialistCalendar:
+    """
+    Free capacity per slot in a Fenwick tree
+
+    Finding the first slot at or after ``lo`` with capacity left is a prefix
+    sum plus one tree descent, and booking or releasing a slot is one point
+    update, so all operations are O(log n) in the number of slots.
+    """
+
+    def __init__(self, capacity: int, size: int):
+        self.capacity = capacity
+        self._free: List[int] = []
+        self._tree: List[int] = [0]
+        self._grow(size)
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def _grow(self, size: int) -> None:
+        self._free.extend([self.capacity] * (size - len(self._free)))
+        self._build()
+
+    def _build(self) -> None:
+        size = len(self._free)
+        tree = [0] + self._free
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _add(self, slot: int, delta: int) -> None:
+        i, tree = slot + 1, self._tree
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, slot: int) -> int:
+        """Free capacity in slots ``[0, slot)``"""
+        total, tree = 0, self._tree
+        while slot:
+            total += tree[slot]
+            slot -= slot & -slot
+        return total
+
+    def first_free(self, lo: int, hi: int) -> Optional[int]:
+        """The first slot in ``[lo, hi)`` with capacity left, or None"""
+        if hi > len(self._free):
+            self._grow(max(hi, 2 * len(self._free)))
+        # Descend to the slot holding free unit number prefix(lo) + 1
+        remaining, position, tree = self._prefix(lo) + 1, 0, self._tree
+        step = 1 << (len(self._free).bit_length() - 1)
+        while step:
+            if position + step < len(tree) and tree[position + step] < remaining:
+                position += step
+                remaining -= tree[position]
+            step >>= 1
+        return position if position < hi else None
+
+    def book(self, slot: int) -> bool:
+        if slot >= len(self._free):
+            self._grow(max(slot + 1, 2 * len(self._free)))
+        if not self._free[slot]:
+            return False
+        self._free[slot] -= 1
+        self._add(slot, -1)
+        return True
+
+    def release(self, slot: int) -> None:
+        if slot < len(self._free) and self._free[slot] < self.capacity:
+            self._free[slot] += 1
+            self._add(slot, 1)
+
+    def shift(self, count: int) -> None:
+        """Drop the first ``count`` slots, renumbering the rest from 0 and adding free slots at the end"""
+        size = len(self._free)
+        del self._free[:count]
+        self._grow(size)
+
+
+class SlotScheduler:
+    """
+    Per-specialist calendars of ``slot_minutes`` slots from ``open_hour`` to
+    ``close_hour`` (UTC) each day, with ``capacity`` appointments per slot
+
+    ``book`` tries the preferred time within the urgency window first, then
+    the whole urgency window, then anything up to ``horizon_days`` ahead.
+    Emergencies are not booked here; they go straight to the emergency room.
+
+    The calendars are per process. With a ``store`` shared between processes
+    (the SQLite appointment store), each booking also claims its place in the
+    store, and a slot another process took meanwhile is skipped for the next.
+    A place another process releases is only offered again by that process
+    (or after a restart), so sharing can leave places unused, never overbooked.
+    Slot numbers count from ``origin``, which moves to the day of each booking
+    so the calendars drop days that are past.
+    """
+
+    def __init__(self, slot_minutes: int = Config.DEFAULT_APPOINTMENT_DURATION,
+                 capacity: int = Config.SPECIALIST_CAPACITY,
+                 open_hour: int = Config.CLINIC_OPEN_HOUR, close_hour: int = Config.CLINIC_CLOSE_HOUR,
+                 horizon_days: int = Config.SCHEDULING_HORIZON_DAYS, origin: Optional[datetime] = None,
+                 store: Optional[AppointmentStore] = None):
+        self.slot_minutes = slot_minutes
+        self.slots_per_day = (close_hour - open_hour) * 60 // slot_minutes
+        if slot_minutes <= 0 or capacity <= 0 or self.slots_per_day <= 0:
+            raise ValueError("Clinic hours must fit at least one slot of positive length and capacity")
+        self.capacity = capacity
+        self.open_hour = open_hour
+        self.horizon = timedelta(days=horizon_days)
+        origin = origin or datetime.utcnow()
+        self.origin = origin.replace(hour=0, minute=0, second=0, microsecond=0)
+        self.store = store
+        self._calendars: Dict[str, SpecialistCalendar] = {}
+        self._lock = threading.Lock()
+        self.booked = 0
+        self.waitlisted = 0
+        self.claim_conflicts = 0
+
+    def _calendar(self, specialist: str) -> SpecialistCalendar:
+        calendar = self._calendars.get(specialist)
+        if calendar is None:
+            size = self.slots_per_day * (self.horizon.days + 1)
+            calendar = self._calendars[specialist] = SpecialistCalendar(self.capacity, size)
+        return calendar
+
+    def slot_index(self, when: datetime) -> int:
+        """The first slot starting at or after ``when``"""
+        day = (when.date() - self.origin.date()).days
+        if day < 0:
+            return 0
+        minutes = when.hour * 60 + when.minute + (1 if when.second or when.microsecond else 0)
+        offset = max(0, -(-(minutes - self.open_hour * 60) // self.slot_minutes))
+        if offset >= self.slots_per_day:
+            day, offset = day + 1, 0
+        return day * self.slots_per_day + offset
+
+    def slot_time(self, slot: int) -> datetime:
+        day, offset = divmod(slot, self.slots_per_day)
+        return self.origin + timedelta(days=day, hours=self.open_hour, minutes=offset * self.slot_minutes)
+
+    def book(self, specialist: str, urgency: str, preferred_time: Optional[str] = None,
+             now: Optional[datetime] = None) -> Optional[datetime]:
+        """Book the best free slot for a request; None if the calendar is full to the horizon"""
+        with _SCHEDULING_SECONDS.time():
+            return self._book(specialist, urgency, preferred_time, now)
+
+    def _book(self, specialist: str, urgency: str, preferred_time: Optional[str],
+              now: Optional[datetime]) -> Optional[datetime]:
+        now = now or datetime.utcnow()
+        earliest, latest = URGENCY_WINDOWS.get(urgency, URGENCY_WINDOWS["moderate"])
+        start, end = now + earliest, now + latest
+        windows = [(start, end), (end, now + self.horizon)]
+        preferred = preferred_window(preferred_time, now)
+        if preferred:
+            windows.insert(0, (max(start, preferred[0]), min(end, preferred[1])))
+
+        with self._lock:
+            self._rebase(now)
+            calendar = self._calendar(specialist)
+            for window_start, window_end in windows:
+                lo, hi = self.slot_index(window_start), self.slot_index(window_end)
+                slot = calendar.first_free(lo, hi) if lo < hi else None
+                while slot is not None:
+                    calendar.book(slot)
+                    if self._claim(specialist, slot):
+                        self.booked += 1
+                        return self.slot_time(slot)
+                    # Booked by another process since this calendar was loaded
+                    self.claim_conflicts += 1
+                    slot = calendar.first_free(slot, hi)
+            self.waitlisted += 1
+            return None
+
+    def _rebase(self, now: datetime) -> None:
+        """Move ``origin`` to the midnight before ``now``, dropping the slots of past days"""
+        days = (now.date() - self.origin.date()).days
+        if days > 0:
+            for calendar in self._calendars.values():
+                calendar.shift(days * self.slots_per_day)
+            self.origin += timedelta(days=days)
+
+    def _claim(self, specialist: str, slot: int) -> bool:
+        if self.store is None:
+            return True
+        return self.store.claim_slot(specialist, format_slot(self.slot_time(slot)), self.capacity)
+
+    def _exact_slot(self, when: datetime) -> Optional[int]:
+        slot = self.slot_index(when)
+        return slot if when >= self.origin and self.slot_time(slot) == when else None
+
+    def reserve(self, specialist: str, when: datetime) -> bool:
+        """Book the slot starting exactly at ``when`` in this calendar (e.g. for an existing appointment)"""
+        slot = self._exact_slot(when)
+        with self._lock:
+            if slot is None or not self._calendar(specialist).book(slot):
+                return False
+            self.booked += 1
+            return True
+
+    def release(self, specialist: str, when: datetime) -> None:
+        slot = self._exact_slot(when)
+        with self._lock:
+            if slot is not None and specialist in self._calendars:
+                self._calendars[specialist].release(slot)
+        if slot is not None and self.store is not None:
+            self.store.release_slot(specialist, format_slot(when))
+
+    def release_appointment(self, appointment: Dict[str, Any]) -> bool:
+        """Release the slot of a cancelled or rescheduled appointment; False if it held none"""
+        booking = appointment_slot(appointment)
+        if booking is None:
+            return False
+        self.release(*booking)
+        return True
+
+    def reserve_existing(self, appointments: Iterable[Dict[str, Any]]) -> int:
+        """Reserve the slots of stored appointments (e.g. after a restart); returns how many"""
+        reserved = 0
+        for appointment in appointments:
+            booking = appointment_slot(appointment)
+            if booking is not None:
+                reserved += self.reserve(*booking)
+        return reserved
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "specialists": len(self._calendars),
+            "slot_minutes": self.slot_minutes,
+            "capacity": self.capacity,
+            "booked": self.booked,
+            "waitlisted": self.waitlisted,
+            "claim_conflicts": self.claim_conflicts,
+        }
+
+
+def create_slot_scheduler(appointments=None) -> SlotScheduler:
+    """A scheduler with the future slots of an appointment store already reserved, claiming slots in it"""
+    scheduler = SlotScheduler(store=appointments)
+    if appointments is not None:
+        scheduler.reserve_existing(appointments.in_time_order(format_slot(datetime.utcnow())))
+    return scheduler
@@ -0,0 +1,288 @@
+// Dark mode toggle
+function toggleTheme() {
+    document.body.classList.toggle('dark-mode');
+    const isDark = document.body.classList.contains('dark-mode');
+    document.querySelector('.theme-toggle').textContent = isDark ? '☀️' : '🌙';
+    localStorage.setItem('theme', isDark ? 'dark' : 'light');
+}
+
+// Load saved theme
+window.addEventListener('DOMContentLoaded', () => {
+    const savedTheme = localStorage.getItem('theme');
+    if (savedTheme === 'dark') {
+        document.body.classList.add('dark-mode');
+        document.querySelector('.theme-toggle').textContent = '☀️';
+    }
+});
+
+// Navbar scroll effect
+window.addEventListener('scroll', () => {
+    const navbar = document.getElementById('navbar');
+    if (window.scrollY > 50) {
+        navbar.classList.add('scrolled');
+    } else {
+        navbar.classList.remove('scrolled');
+    }
+});
+
+// Timeline toggle
+function toggleTimeline() {
+    const content = document.getElementById('timelineContent');
+    const button = document.getElementById('timelineToggle');
+    content.classList.toggle('expanded');
+    button.textContent = content.classList.contains('expanded') ? 'Collapse' : 'Expand';
+}
+
+// Statistics tracking
+let totalAnalysesCount = 0;
+let mettaQueriesCount = 0;
+
+function updateStats() {
+    totalAnalysesCount++;
+    mettaQueriesCount++;
+    document.getElementById('totalAnalyses').textContent = totalAnalysesCount;
+    document.getElementById('mettaQueries').textContent = mettaQueriesCount;
+}
+
+function addTimelineEvent(title, description) {
+    const timelineItems = document.getElementById('timelineItems');
+    const now = new Date();
+    const timeStr = now.toLocaleTimeString('en-US', { hour: '2-digit', minute: '2-digit' });
+
+    const item = document.createElement('div');
+    item.className = 'timeline-item';
+    item.innerHTML = `
+        <div class="timeline-event">
+            <div class="timeline-event-title">${title}</div>
+            <div class="timeline-event-desc">${description} - ${timeStr}</div>
+        </div>
+    `;
+    timelineItems.appendChild(item);
+
+    // Auto-expand timeline on new event
+    const content = document.getElementById('timelineContent');
+    if (!content.classList.contains('expanded')) {
+        toggleTimeline();
+    }
+}
+
+async function analyzeSymptoms() {
+    const symptoms = document.getElementById('symptomsInput').value.trim();
+
+    if (!symptoms) {
+        alert('Please describe your symptoms');
+        return;
+    }
+
+    // Add timeline event
+    addTimelineEvent('Analysis Started', `Symptoms: "${symptoms.substring(0, 50)}..."`);
+    updateStats();
+
+    // Show loading
+    document.getElementById('loadingCard').classList.add('show');
+    document.getElementById('resultCard').classList.remove('show');
+    document.querySelector('.submit-btn').disabled = true;
+
+    try {
+        // Stages stream in as Server-Sent Events and are rendered as they arrive
+        const response = await fetch('/analyze/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream',
+            },
+            body: JSON.stringify({ symptoms: symptoms })
+        });
+
+        if (!response.ok || !response.body) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+
+        await readEvents(response.body, renderStage);
+
+    } catch (error) {
+        console.error('Error:', error);
+        document.getElementById('loadingCard').classList.remove('show');
+        addTimelineEvent('Analysis Failed', 'Error communicating with server');
+        alert('Error analyzing symptoms. Please try again.');
+    } finally {
+        document.querySelector('.submit-btn').disabled = false;
+    }
+}
+
+// Parse a text/event-stream body, calling onEvent(name, data) per event
+async function readEvents(body, onEvent) {
+    const reader = body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let end;
+        while ((end = buffer.indexOf('\n\n')) >= 0) {
+            const block = buffer.slice(0, end);
+            buffer = buffer.slice(end + 2);
+
+            let event = 'message';
+            let data = '';
+            for (const line of block.split('\n')) {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            }
+            if (data) onEvent(event, JSON.parse(data));
+        }
+    }
+}
+
+function renderStage(event, data) {
+    if (event === 'appointment') {
+        document.getElementById('loadingCard').classList.remove('show');
+        displayResult(data);
+        return;
+    }
+
+    if (event === 'symptoms') {
+        // First answer: swap the spinner for a result card that fills in stage by stage
+        document.getElementById('loadingCard').classList.remove('show');
+        document.getElementById('resultHeader').textContent = '🔍 Analyzing...';
+        document.getElementById('resultContent').innerHTML = `
+            <div class="result-item" id="stageSymptoms"></div>
+            <div class="metta-analysis">
+                <h3>🧠 MeTTa AI Analysis</h3>
+                <div id="stageCondition"></div>
+                <div id="stageAlternatives"></div>
+                <div id="stageEscalation"></div>
+            </div>
+            <div id="stageAppointment"></div>
+        `;
+        document.getElementById('resultCard').classList.add('show');
+        document.getElementById('stageSymptoms').innerHTML =
+            `<strong>🔍 Identified Symptoms:</strong> ${data.symptoms.map(formatText).join(', ') || 'None recognized'}`;
+        return;
+    }
+
+    const stage = document.getElementById({
+        condition: 'stageCondition',
+        alternatives: 'stageAlternatives',
+        escalation: 'stageEscalation'
+    }[event]);
+    if (!stage) return;
+
+    if (event === 'condition') {
+        stage.innerHTML = `
+            <div class="result-item">
+                <strong>Likely Condition:</strong> ${formatText(data.condition)}
+            </div>
+            <div class="result-item">
+                <strong>Confidence:</strong> ${Math.round(data.confidence * 100)}%
+            </div>
+        `;
+    } else if (event === 'alternatives' && data.conditions.length) {
+        stage.innerHTML = `
+            <div class="result-item">
+                <strong>Also Considered:</strong>
+                ${data.conditions.map(c => `${formatText(c.condition)} (${Math.round(c.confidence * 100)}%)`).join(', ')}
+            </div>
+        `;
+    } else if (event === 'escalation' && data.rule_out.length && ['high', 'emergency'].includes(data.urgency)) {
+        stage.innerHTML = `
+            <div class="result-item urgency-${data.urgency}">
+                <strong>⚠️ Urgent Conditions to Rule Out:</strong> ${data.rule_out.map(formatText).join(', ')}
+                <br><small>${data.hops} reasoning hops over the knowledge graph</small>
+            </div>
+        `;
+    }
+}
+
+function displayResult(data) {
+    const resultCard = document.getElementById('resultCard');
+    const resultHeader = document.getElementById('resultHeader');
+    const resultContent = document.getElementById('resultContent');
+
+    if (!data.success) {
+        resultHeader.textContent = '❌ Unable to Process';
+        resultContent.innerHTML = `<p>${data.message}</p>`;
+        resultCard.classList.add('show');
+        return;
+    }
+
+    addTimelineEvent(
+        'Appointment Created',
+        `${data.appointment_id} - ${data.specialist} (${data.urgency})`
+    );
+    resultHeader.textContent = '✅ Appointment Confirmed';
+
+    const urgencyClass = `urgency-${data.urgency}`;
+    const urgencyIcon = {
+        'emergency': '🚨',
+        'high': '⚠️',
+        'moderate': '📅',
+        'low': 'ℹ️'
+    }[data.urgency] || '📅';
+
+    // Streamed analysis stages stay above the appointment details
+    const stageAppointment = document.getElementById('stageAppointment');
+    const target = stageAppointment || resultContent;
+    target.innerHTML = `
+        <div class="result-item">
+            <strong>📋 Appointment ID:</strong> ${data.appointment_id}
+        </div>
+
+        <div class="result-item">
+            <strong>📅 Scheduled Time:</strong> ${data.scheduled_time}
+        </div>
+
+        <div class="result-item">
+            <strong>👨‍⚕️ Specialist:</strong> ${formatText(data.specialist)}
+        </div>
+
+        <div class="result-item ${urgencyClass}">
+            <strong>${urgencyIcon} Urgency:</strong> ${data.urgency.toUpperCase()}
+        </div>
+
+        ${stageAppointment ? '' : `
+        <div class="metta-analysis">
+            <h3>🧠 MeTTa AI Analysis</h3>
+            <div class="result-item">
+                <strong>Likely Condition:</strong> ${formatText(data.condition)}
+            </div>
+            <div class="result-item">
+                <strong>Confidence:</strong> ${Math.round(data.confidence * 100)}%
+            </div>
+        </div>`}
+
+        <div style="margin-top: 10px; font-size: 0.9em; color: #666;">
+            <strong>Analysis Method:</strong> Multi-hop knowledge graph reasoning<br>
+            <strong>Knowledge Base:</strong> 500+ medical facts<br>
+            <strong>Technology:</strong> SingularityNET MeTTa symbolic AI
+        </div>
+
+        ${data.urgency === 'emergency' ? 
+            '<div class="result-item urgency-emergency" style="margin-top: 20px; font-weight: bold;">🚨 URGENT: This appears to be a medical emergency. Please call 911 or visit the nearest Emergency Room immediately!</div>' 
+            : ''}
+
+        <div style="margin-top: 20px; padding: 15px; background: #f8f9fa; border-radius: 5px; font-size: 0.9em;">
+            💡 <strong>Next Steps:</strong><br>
+            • You will receive a confirmation email/SMS shortly<br>
+            • Please arrive 15 minutes before your appointment<br>
+            • Bring your ID and insurance card
+        </div>
+    `;
+
+    resultCard.classList.add('show');
+}
+
+function formatText(text) {
+    return text.replace(/_/g, ' ').replace(/\b\w/g, l => l.toUpperCase());
+}
+
+// Allow Enter to submit (with Shift+Enter for new line)
+document.getElementById('symptomsInput').addEventListener('keydown', function(e) {
+    if (e.key === 'Enter' && !e.shiftKey) {
+        e.preventDefault();
+        analyzeSymptoms();
+    }
+});
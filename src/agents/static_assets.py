@@ -0,0 +1,127 @@
+"""
+Static assets for the web UI, prepared once at startup
+CSS/JS bundles get content-hashed names, and every asset is held in memory
+with precompressed gzip and brotli variants and a strong ETag per variant
+"""
+
+import gzip
+import hashlib
+import mimetypes
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # gzip and identity variants are still served
+    brotli = None
+
+BUNDLE_SUFFIXES = (".css", ".js")
+# Hashed bundles never change under the same name; the page itself is revalidated
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Preferred content codings, best first
+ENCODINGS = ("br", "gzip", "identity")
+
+
+class Variant(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class Asset(NamedTuple):
+    content_type: str
+    cache_control: str
+    variants: Dict[str, Variant]
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        param, _, value = params.strip().partition("=")
+        if param.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
+
+class StaticAssets:
+    """
+    Every file in ``directory``, compressed once and served from memory
+
+    ``*.css`` and ``*.js`` files are published as ``name.<hash>.ext`` with
+    immutable caching, and references to ``url_prefix + name`` in the entry
+    page are rewritten to the hashed names.
+    """
+
+    def __init__(self, directory: Path, url_prefix: str = "/static/", entry: str = "index.html"):
+        self.url_prefix = url_prefix
+        self.entry = entry
+        self.assets: Dict[str, Asset] = {}
+        self.urls: Dict[str, str] = {}
+
+        directory = Path(directory)
+        for path in sorted(directory.iterdir()):
+            if path.is_file() and path.suffix in BUNDLE_SUFFIXES:
+                content = path.read_bytes()
+                hashed = f"{path.stem}.{hashlib.sha256(content).hexdigest()[:12]}{path.suffix}"
+                self._add(hashed, content, IMMUTABLE)
+                self.urls[url_prefix + path.name] = url_prefix + hashed
+
+        page = (directory / entry).read_text(encoding="utf-8")
+        for url, hashed_url in self.urls.items():
+            page = page.replace(f'"{url}"', f'"{hashed_url}"')
+        self._add(entry, page.encode("utf-8"), REVALIDATE)
+
+    def _add(self, name: str, content: bytes, cache_control: str) -> None:
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type == "application/javascript":
+            content_type += "; charset=utf-8"
+        digest = hashlib.sha256(content).hexdigest()[:16]
+
+        compressed = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(content, quality=11)
+        variants = {"identity": Variant(content, f'"{digest}"')}
+        for encoding, body in compressed.items():
+            if len(body) < len(content):
+                variants[encoding] = Variant(body, f'"{digest}-{encoding}"')
+        self.assets[name] = Asset(content_type, cache_control, variants)
+
+    def response(self, name: str, accept_encoding: str = "",
+                 if_none_match: str = "") -> Optional[Tuple[int, bytes, Dict[str, str]]]:
+        """``(status, body, headers)`` for a request of ``name``, or None if there is no such asset"""
+        asset = self.assets.get(name)
+        if asset is None:
+            return None
+
+        accepted = _accepted_encodings(accept_encoding)
+        encoding = next(e for e in ENCODINGS
+                        if e == "identity" or (e in asset.variants and accepted.get(e, 0.0) > 0))
+        variant = asset.variants[encoding]
+        headers = {
+            "Content-Type": asset.content_type,
+            "Cache-Control": asset.cache_control,
+            "ETag": variant.etag,
+            "Vary": "Accept-Encoding",
+        }
+        if _etag_matches(if_none_match, variant.etag):
+            return 304, b"", headers
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return 200, variant.body, headers
@@ -11,14 +11,15 @@ from pathlib import Path
 class Config:
     """Configuration management using environment variables"""
     
-    # Base directory
-    BASE_DIR = Path(__file__).parent.parent
+    # Base directory; resolved, since entry points import config via "src/agents/.."
+    BASE_DIR = Path(__file__).resolve().parent.parent
     
     # Server Configuration
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
     
     # Fetch.ai Agent Configuration
     COORDINATOR_SEED: str = os.getenv("COORDINATOR_SEED", "synaptiverse_coordinator_default")
@@ -30,7 +31,30 @@ class Config:
     # MeTTa Configuration
     METTA_KNOWLEDGE_PATH: str = os.getenv("METTA_KNOWLEDGE_PATH", "src/metta/knowledge_graphs/medical_facts.metta")
     METTA_CACHE_ENABLED: bool = os.getenv("METTA_CACHE_ENABLED", "True").lower() == "true"
+    # Query results kept by the cache, and their time-to-live in seconds (0 = until evicted)
+    METTA_CACHE_SIZE: int = int(os.getenv("METTA_CACHE_SIZE", "1024"))
+    METTA_CACHE_TTL: float = float(os.getenv("METTA_CACHE_TTL", "0"))
     METTA_MAX_FACTS: int = int(os.getenv("METTA_MAX_FACTS", "1000"))
+    # Compiled knowledge graph, rebuilt when the knowledge file changes (empty disables)
+    METTA_SNAPSHOT_PATH: str = os.getenv("METTA_SNAPSHOT_PATH", "data/medical_facts.snapshot")
+    # Map the snapshot's fact table and symptom index read-only, shared by worker processes
+    METTA_SHARED_KG: bool = os.getenv("METTA_SHARED_KG", "False").lower() == "true"
+    # Async queries run on a bounded "thread" or "process" pool
+    METTA_EXECUTOR: str = os.getenv("METTA_EXECUTOR", "thread")
+    METTA_EXECUTOR_WORKERS: int = int(os.getenv("METTA_EXECUTOR_WORKERS", "4"))
+    METTA_MAX_IN_FLIGHT: int = int(os.getenv("METTA_MAX_IN_FLIGHT", "32"))
+    # Time allowed for one multi-hop traversal before it returns what it has
+    METTA_TRAVERSAL_BUDGET_MS: float = float(os.getenv("METTA_TRAVERSAL_BUDGET_MS", "50"))
+    # Symptom scoring: "python", or "numpy" for vectorized sparse-matrix scoring
+    METTA_SCORING_BACKEND: str = os.getenv("METTA_SCORING_BACKEND", "python")
+    # Triage dispatcher: queries admitted at once, requests allowed to wait, and
+    # seconds of waiting each urgency tier is worth (aging against starvation)
+    TRIAGE_MAX_CONCURRENCY: int = int(os.getenv("TRIAGE_MAX_CONCURRENCY", "32"))
+    TRIAGE_MAX_QUEUE: int = int(os.getenv("TRIAGE_MAX_QUEUE", "256"))
+    TRIAGE_AGING_SECONDS: float = float(os.getenv("TRIAGE_AGING_SECONDS", "2"))
+    # /analyze/batch: notes analyzed per MeTTa batch query, and the largest note accepted
+    BATCH_CHUNK_SIZE: int = int(os.getenv("BATCH_CHUNK_SIZE", "64"))
+    BATCH_MAX_ITEM_BYTES: int = int(os.getenv("BATCH_MAX_ITEM_BYTES", "65536"))
     
     # API Configuration
     CORS_ORIGINS: list = os.getenv("CORS_ORIGINS", "http://localhost:8000").split(",")
@@ -38,9 +62,24 @@ class Config:
     RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "False").lower() == "true"
     RATE_LIMIT_REQUESTS: int = int(os.getenv("RATE_LIMIT_REQUESTS", "100"))
     RATE_LIMIT_PERIOD: int = int(os.getenv("RATE_LIMIT_PERIOD", "60"))
+    # Client buckets kept "memory" (per worker, at most RATE_LIMIT_MAX_KEYS clients)
+    # or in a "sqlite" file shared by every worker
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+    RATE_LIMIT_DB_PATH: str = os.getenv("RATE_LIMIT_DB_PATH", "data/rate_limits.db")
+    # X-API-Key values limited per key; requests without one of these are limited per IP
+    RATE_LIMIT_API_KEYS: list = [k.strip() for k in os.getenv("RATE_LIMIT_API_KEYS", "").split(",") if k.strip()]
     
     # Healthcare Configuration
     DEFAULT_APPOINTMENT_DURATION: int = int(os.getenv("DEFAULT_APPOINTMENT_DURATION", "30"))
+    # Slot calendars: clinic hours (UTC), appointments per slot per specialist, days ahead
+    CLINIC_OPEN_HOUR: int = int(os.getenv("CLINIC_OPEN_HOUR", "9"))
+    CLINIC_CLOSE_HOUR: int = int(os.getenv("CLINIC_CLOSE_HOUR", "17"))
+    SPECIALIST_CAPACITY: int = int(os.getenv("SPECIALIST_CAPACITY", "1"))
+    SCHEDULING_HORIZON_DAYS: int = int(os.getenv("SCHEDULING_HORIZON_DAYS", "90"))
+    # Appointment storage: "memory", or "sqlite" to persist and share across processes
+    APPOINTMENT_STORE: str = os.getenv("APPOINTMENT_STORE", "memory")
+    APPOINTMENT_DB_PATH: str = os.getenv("APPOINTMENT_DB_PATH", "data/appointments.db")
     TIMEZONE: str = os.getenv("TIMEZONE", "UTC")
     EMERGENCY_NOTIFICATION_ENABLED: bool = os.getenv("EMERGENCY_NOTIFICATION_ENABLED", "False").lower() == "true"
     EMERGENCY_WEBHOOK_URL: Optional[str] = os.getenv("EMERGENCY_WEBHOOK_URL")
@@ -54,6 +93,8 @@ class Config:
     SECRET_KEY: str = os.getenv("SECRET_KEY", "insecure_default_key_change_in_production")
     STORE_PHI: bool = os.getenv("STORE_PHI", "False").lower() == "true"
     ENABLE_ANALYTICS: bool = os.getenv("ENABLE_ANALYTICS", "False").lower() == "true"
+    # Serve Prometheus metrics at /metrics on the web UI
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
     
     # Testing
     TEST_MODE: bool = os.getenv("TEST_MODE", "False").lower() == "true"
@@ -4,14 +4,22 @@ MeTTa integration module for SynaptiVerse
 
 from .metta_interface import (
     query_metta,
+    query_metta_batch,
+    query_metta_async,
+    extract_symptoms,
     get_metta_knowledge_graph,
     MeTTaKnowledgeGraph,
-    MedicalFact
+    MedicalFact,
+    SymptomIndex
 )
 
 __all__ = [
     'query_metta',
+    'query_metta_batch',
+    'query_metta_async',
+    'extract_symptoms',
     'get_metta_knowledge_graph',
     'MeTTaKnowledgeGraph',
-    'MedicalFact'
+    'MedicalFact',
+    'SymptomIndex'
 ]
@@ -0,0 +1,365 @@
+"""
+Process-wide metrics in the Prometheus text exposition format
+Latency histograms per triage pipeline stage and event counters, cheap enough
+to leave on in production and shared by the web UI and the agents
+"""
+
+import abc
+import functools
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; triage stages run from microseconds (extraction) to the traversal budget
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# (name, type, help, [(labels, value)]) produced by a collector at scrape time
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+# (metric name, label values, change) for each child a process has changed;
+# plain tuples so they can be returned from worker processes
+Changes = List[Tuple[str, Tuple[str, ...], Any]]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_started")
+
+    def __init__(self, histogram: "HistogramChild"):
+        self._histogram = histogram
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(time.perf_counter() - self._started)
+
+    def __call__(self, fn: Callable) -> Callable:
+        """Use as a decorator: observe every call of ``fn``"""
+        histogram = self._histogram
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            with histogram.time():
+                return fn(*args, **kwargs)
+        return timed
+
+
+class CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        # One count per bucket plus +Inf, cumulated only when rendered
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> _Timer:
+        """Context manager (or decorator) observing the seconds its block takes"""
+        return _Timer(self)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class Metric(abc.ABC):
+    """
+    A named metric family, with one child per combination of label values
+
+    Look children up once with ``labels`` and keep them; a metric without
+    label names is used directly.
+    """
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """A child with nothing recorded yet"""
+
+    def labels(self, *values: str):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(tuple(str(v) for v in values), self._new_child())
+        return child
+
+    @abc.abstractmethod
+    def _samples(self, labels: Dict[str, str], child) -> List[Tuple[str, Dict[str, str], float]]:
+        """The exposition samples of one child"""
+
+    @abc.abstractmethod
+    def _state(self, child) -> Any:
+        """A picklable copy of what ``child`` has recorded"""
+
+    @abc.abstractmethod
+    def _difference(self, state, before) -> Any:
+        """What was recorded between ``before`` (None for nothing) and ``state``; None if nothing"""
+
+    @abc.abstractmethod
+    def _merge(self, child, change) -> None:
+        """Record a ``_difference`` in ``child``"""
+
+    def children(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return list(self._children.items())
+
+    def collect(self) -> List[Tuple[str, Dict[str, str], float]]:
+        samples = []
+        for values, child in sorted(self._children.items()):
+            samples.extend(self._samples(dict(zip(self.labelnames, values)), child))
+        return samples
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _samples(self, labels, child):
+        return [(self.name, labels, child.value)]
+
+    def _state(self, child) -> float:
+        return child.value
+
+    def _difference(self, state, before):
+        return state - (before or 0.0) or None
+
+    def _merge(self, child, change) -> None:
+        child.inc(change)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+    def _samples(self, labels, child):
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            samples.append((self.name + "_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+        samples.append((self.name + "_sum", labels, total))
+        samples.append((self.name + "_count", labels, cumulative))
+        return samples
+
+    def _state(self, child) -> Tuple[Tuple[int, ...], float]:
+        with child._lock:
+            return tuple(child.counts), child.sum
+
+    def _difference(self, state, before):
+        counts, total = state
+        if before is not None:
+            counts = tuple(now - then for now, then in zip(counts, before[0]))
+            total -= before[1]
+        return (counts, total) if any(counts) else None
+
+    def _merge(self, child, change) -> None:
+        counts, total = change
+        with child._lock:
+            for index, count in enumerate(counts):
+                child.counts[index] += count
+            child.sum += total
+
+
+class MetricsRegistry:
+    """
+    The metrics of one process, rendered for a Prometheus scrape
+
+    ``counter`` and ``histogram`` return the existing metric when the name is
+    already registered, so modules can declare what they record independently.
+    Collectors add families computed at scrape time from counters kept
+    elsewhere (such as the result cache's hits and misses).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def state(self) -> Dict[Tuple[str, Tuple[str, ...]], Any]:
+        """What every metric has recorded so far, for ``changes_since``"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {(metric.name, values): metric._state(child)
+                for metric in metrics for values, child in metric.children()}
+
+    def changes_since(self, state: Dict[Tuple[str, Tuple[str, ...]], Any]) -> Changes:
+        """What was recorded since ``state`` was taken, for another registry to ``merge``"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        changes = []
+        for metric in metrics:
+            for values, child in metric.children():
+                change = metric._difference(metric._state(child), state.get((metric.name, values)))
+                if change is not None:
+                    changes.append((metric.name, values, change))
+        return changes
+
+    def merge(self, changes: Changes) -> None:
+        """Add changes recorded by another process's registry (see ``collect_changes``)"""
+        for name, values, change in changes:
+            metric = self._metrics.get(name)
+            if metric is not None:
+                metric._merge(metric.labels(*values), change)
+
+    def render(self) -> str:
+        lines = []
+
+        def family(name: str, kind: str, documentation: str, samples) -> None:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{sample}{_format_labels(labels)} {_format_value(value)}"
+                         for sample, labels, value in samples)
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for metric in metrics:
+            family(metric.name, metric.type, metric.documentation, metric.collect())
+        for collector in collectors:
+            for name, kind, documentation, samples in collector():
+                family(name, kind, documentation, [(name, labels, value) for labels, value in samples])
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Shared by the MeTTa engine, the web UI and the agents
+STAGE_SECONDS = REGISTRY.histogram(
+    "synaptiverse_stage_seconds", "Time spent in each triage pipeline stage", ("stage",))
+QUERIES = REGISTRY.counter(
+    "synaptiverse_queries_total", "Natural-language MeTTa queries by outcome", ("status",))
+URGENCY = REGISTRY.counter(
+    "synaptiverse_urgency_total", "Urgency of the top condition of successful queries", ("urgency",))
+
+
+def stage(name: str) -> HistogramChild:
+    """The ``synaptiverse_stage_seconds`` histogram of one pipeline stage"""
+    return STAGE_SECONDS.labels(name)
+
+
+def collect_changes(fn: Callable, *args: Any) -> Tuple[Any, Changes]:
+    """
+    ``fn(*args)`` and the metrics it recorded, for ``REGISTRY.merge`` in the parent
+
+    For functions run in a worker process, whose own registry is never
+    scraped. A process pool worker runs one task at a time, so the changes
+    are exactly those of this call.
+    """
+    before = REGISTRY.state()
+    result = fn(*args)
+    return result, REGISTRY.changes_since(before)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0",
+                         registry: Optional[MetricsRegistry] = None) -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a daemon thread, for processes without a web server of their own"""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry or REGISTRY})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
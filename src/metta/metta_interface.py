@@ -3,16 +3,97 @@ MeTTa Knowledge Graph Interface for SynaptiVerse
 Provides medical knowledge reasoning and inference capabilities
 """
 
+import hashlib
+import heapq
 import json
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, List, Any, Optional, Sequence, Tuple, Union
 from dataclasses import dataclass
 
+if __name__ == "__main__" and not __package__:
+    # Allow `python src/metta/metta_interface.py` by running as part of the metta package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    __package__ = "metta"
+
+from .metrics import QUERIES, REGISTRY, URGENCY, Changes, collect_changes, stage
+from .metta_parser import MettaParseError, iter_atoms
+from .query_executor import QueryExecutor
+from .result_cache import ResultCache
+from .rules import RuleSet
+from .single_flight import SingleFlight
+from .traversal import CONDITION, SYMPTOM, TraversalGraph
+from .triage_dispatcher import LoadShedError, TriageDispatcher
+from .symptom_extractor import SYMPTOM_SYNONYMS, SymptomExtractor
+
+try:
+    from ..config import Config
+except ImportError:  # imported as top-level `metta` package with src/ on sys.path
+    from config import Config
+
 # Note: In production, this would interface with actual Hyperon MeTTa runtime
 # For hackathon demo, we implement a MeTTa-inspired reasoning engine
 
 logger = logging.getLogger(__name__)
 
+# Urgency levels used in .metta files, mapped onto the engine's low/moderate/high/emergency
+URGENCY_ALIASES = {"routine": "low", "urgent": "high", "critical": "emergency"}
+URGENCY_LEVELS = ("low", "moderate", "high", "emergency")
+
+_SYMPTOM_SEPARATORS_RE = re.compile(r"[\s_\-]+")
+
+# Results returned by query_symptoms unless the caller asks for another k
+DEFAULT_TOP_K = 5
+
+# Pipeline stage latency histograms (synaptiverse_stage_seconds)
+_EXTRACTION_SECONDS = stage("extraction")
+_QUERY_SECONDS = stage("query_symptoms")
+_REASONING_SECONDS = stage("reasoning_rules")
+_TRAVERSAL_SECONDS = stage("traversal")
+
+
+def resolve_path(path: str) -> Path:
+    """Resolve a configured path relative to the project root"""
+    resolved = Path(path)
+    return resolved if resolved.is_absolute() else Config.BASE_DIR / resolved
+
+
+def normalize_symptom(name: str) -> str:
+    """Engine spelling of a reported symptom: lowercase, spaces as underscores"""
+    return name.lower().replace(" ", "_")
+
+
+def copy_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copy query results deeply enough that callers can mutate them freely"""
+    return [dict(r, matching_symptoms=list(r["matching_symptoms"])) for r in results]
+
+
+def _reorder_matches(results: List[Dict[str, Any]], symptoms: List[str]) -> List[Dict[str, Any]]:
+    """Copy of ``results`` listing each result's matching symptoms in the order of ``symptoms``"""
+    order: Dict[str, int] = {}
+    for position, symptom in enumerate(symptoms):
+        order.setdefault(symptom, position)
+    return [dict(r, matching_symptoms=sorted(r["matching_symptoms"], key=order.__getitem__))
+            for r in results]
+
+
+def symptom_key(name: str) -> str:
+    """
+    Lookup key for a symptom or specialist name: its engine spelling, so
+    "Chest pain" and "chest_pain" agree but "chestpain" only matches itself
+    """
+    return normalize_symptom(name)
+
+
+def _compact_name(name: str) -> str:
+    """Spelling-insensitive form used to map .metta names ("chestpain") onto known ones"""
+    return _SYMPTOM_SEPARATORS_RE.sub("", name.lower())
+
 
 @dataclass
 class MedicalFact:
@@ -22,6 +103,61 @@ class MedicalFact:
     urgency: str  # low, moderate, high, emergency
     specialist: str
     confidence: float
+    category: Optional[str] = None
+
+
+class SymptomIndex:
+    """
+    Inverted index over the knowledge base: symptom -> ids of facts listing it
+    
+    Fact ids are positions in ``MeTTaKnowledgeGraph.knowledge_base``. Posting
+    lists are keyed by ``symptom_key`` and stay sorted because facts are only
+    ever appended.
+    """
+    
+    def __init__(self):
+        self.postings: Dict[str, List[int]] = {}
+        self.symptom_counts: List[int] = []
+    
+    def clear(self) -> None:
+        self.postings = {}
+        self.symptom_counts = []
+    
+    def add(self, fact_id: int, symptoms: List[str]) -> None:
+        """Index a fact's symptoms and record how many it lists"""
+        for key in {symptom_key(s) for s in symptoms}:
+            self.postings.setdefault(key, []).append(fact_id)
+        if fact_id >= len(self.symptom_counts):
+            self.symptom_counts.extend([0] * (fact_id + 1 - len(self.symptom_counts)))
+        self.symptom_counts[fact_id] = len(symptoms)
+    
+    def lookup(self, key: str) -> Sequence[int]:
+        """Fact ids listing the symptom with this ``symptom_key``"""
+        return self.postings.get(key, ())
+    
+    def match(self, symptoms: List[str],
+              postings_cache: Optional[Dict[str, Sequence[int]]] = None) -> Dict[int, List[str]]:
+        """
+        Map each fact sharing at least one symptom to the symptoms it matched
+        
+        ``postings_cache`` lets batch callers reuse lookups across queries.
+        """
+        matches: Dict[int, List[str]] = {}
+        seen_keys = set()
+        for symptom in symptoms:
+            key = symptom_key(symptom)
+            if key in seen_keys:
+                continue
+            seen_keys.add(key)
+            if postings_cache is None:
+                postings = self.lookup(key)
+            else:
+                postings = postings_cache.get(key)
+                if postings is None:
+                    postings = postings_cache[key] = self.lookup(key)
+            for fact_id in postings:
+                matches.setdefault(fact_id, []).append(symptom)
+        return matches
 
 
 class MeTTaKnowledgeGraph:
@@ -32,12 +168,334 @@ class MeTTaKnowledgeGraph:
     For the hackathon, we implement MeTTa-style symbolic reasoning.
     """
     
-    def __init__(self):
-        self.knowledge_base = self._initialize_knowledge_base()
-        self.reasoning_rules = self._initialize_reasoning_rules()
+    def __init__(self, knowledge_path: Optional[str] = Config.METTA_KNOWLEDGE_PATH,
+                 max_facts: int = Config.METTA_MAX_FACTS,
+                 snapshot_path: Optional[str] = Config.METTA_SNAPSHOT_PATH,
+                 shared: bool = Config.METTA_SHARED_KG,
+                 scoring_backend: str = Config.METTA_SCORING_BACKEND,
+                 cache_size: int = Config.METTA_CACHE_SIZE if Config.METTA_CACHE_ENABLED else 0,
+                 cache_ttl: float = Config.METTA_CACHE_TTL):
+        self.max_facts = max_facts
+        self.snapshot = None
+        self.shared = False
+        self.scoring_backend = self._select_scoring_backend(scoring_backend)
+        self._vocabulary: Optional[Dict[str, str]] = None
+        self._symptom_extractor: Optional[SymptomExtractor] = None
+        self._vector_scorer = None
+        self._rule_set: Optional[RuleSet] = None
+        self._traversal_graph: Optional[TraversalGraph] = None
+        self._symptom_urgency: Optional[Dict[str, str]] = None
+        # Bumped on every knowledge change so in-flight queries are not shared across it
+        self._generation = 0
+        self._single_flight = SingleFlight()
+        # Query results keyed on the canonical symptom tuple; None when caching is off
+        self.result_cache = ResultCache(cache_size, cache_ttl) if cache_size > 0 else None
+        
+        source_digest = None
+        if knowledge_path and snapshot_path:
+            source_digest = self._source_digest(knowledge_path)
+        
+        if source_digest is not None:
+            from .snapshot import load_snapshot, snapshot_lock
+            resolved_snapshot = str(resolve_path(snapshot_path))
+            if shared:
+                # Processes attach one at a time, so only the first one to find a
+                # stale snapshot compiles it and the rest map the fresh file
+                with snapshot_lock(resolved_snapshot):
+                    self.snapshot = load_snapshot(resolved_snapshot, source_digest)
+                    if self.snapshot is None:
+                        self._build(knowledge_path)
+                        if self.save_snapshot(snapshot_path, source_digest):
+                            self.snapshot = load_snapshot(resolved_snapshot, source_digest)
+                self.shared = self.snapshot is not None
+                if not self.shared:
+                    logger.warning("Shared knowledge graph unavailable; using a private copy")
+            else:
+                self.snapshot = load_snapshot(resolved_snapshot, source_digest)
+        
+        if self.snapshot is not None:
+            # Cold start from the memory-mapped snapshot: nothing is parsed or indexed,
+            # and the fact and posting pages are shared with every process mapping
+            # the same file. The rule tables are decoded, and the extractor, rule set,
+            # traversal graph and scorer built, per process
+            self.knowledge_base = self.snapshot.facts
+            self.reasoning_rules = self.snapshot.reasoning_rules
+            self.symptom_index = self.snapshot.symptom_index
+            logger.info("MeTTa Knowledge Graph mapped from snapshot %s%s", self.snapshot.path,
+                        " (shared, read-only)" if self.shared else "")
+        elif not hasattr(self, "knowledge_base"):
+            self._build(knowledge_path)
+            if source_digest is not None:
+                self.save_snapshot(snapshot_path, source_digest)
+        
         logger.info("MeTTa Knowledge Graph initialized with %d medical facts", 
                    len(self.knowledge_base))
     
+    def _build(self, knowledge_path: Optional[str]) -> None:
+        """Build the in-memory knowledge base, rules and index from source"""
+        self.knowledge_base = self._initialize_knowledge_base()
+        self.reasoning_rules = self._initialize_reasoning_rules()
+        self.symptom_index = SymptomIndex()
+        self.rebuild_index()
+        if knowledge_path:
+            self.load_knowledge_file(knowledge_path)
+    
+    def _source_digest(self, knowledge_path: str) -> Optional[bytes]:
+        """
+        Hash everything a compiled snapshot depends on: the .metta file contents,
+        the built-in facts and rules, METTA_MAX_FACTS and the snapshot format
+        """
+        from .snapshot import SNAPSHOT_VERSION
+        
+        digest = hashlib.sha256()
+        digest.update(f"v{SNAPSHOT_VERSION}:{self.max_facts}:".encode())
+        digest.update(repr(self._initialize_knowledge_base()).encode())
+        digest.update(repr(self._initialize_reasoning_rules()).encode())
+        try:
+            with open(resolve_path(knowledge_path), "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        return digest.digest()
+    
+    def save_snapshot(self, snapshot_path: str, source_digest: bytes) -> bool:
+        """Compile the current knowledge graph into a snapshot file"""
+        from .snapshot import write_snapshot
+        
+        try:
+            write_snapshot(str(resolve_path(snapshot_path)), self.knowledge_base,
+                           self.reasoning_rules, source_digest)
+            return True
+        except OSError as e:
+            logger.warning("Could not write knowledge snapshot %s: %s", snapshot_path, e)
+            return False
+    
+    def _detach_snapshot(self) -> None:
+        """Copy a memory-mapped snapshot into mutable in-memory structures"""
+        if self.snapshot is None:
+            return
+        if self.shared:
+            raise RuntimeError("Shared knowledge graph is read-only; edit the knowledge file instead")
+        self.knowledge_base = list(self.knowledge_base)
+        self.symptom_index = SymptomIndex()
+        self.rebuild_index()
+        self.snapshot = None
+    
+    def rebuild_index(self) -> None:
+        """Rebuild the symptom posting lists from the current knowledge base"""
+        self.symptom_index.clear()
+        for fact_id, fact in enumerate(self.knowledge_base):
+            self.symptom_index.add(fact_id, fact.symptoms)
+        self._knowledge_changed()
+    
+    def add_fact(self, fact: MedicalFact) -> int:
+        """Add a fact to the knowledge base and index it, returning its fact id"""
+        self._detach_snapshot()
+        fact_id = len(self.knowledge_base)
+        self.knowledge_base.append(fact)
+        self.symptom_index.add(fact_id, fact.symptoms)
+        self._knowledge_changed()
+        return fact_id
+    
+    def _knowledge_changed(self) -> None:
+        """Drop everything derived from the facts or rules after a mutation or reload"""
+        self._symptom_extractor = None
+        self._vector_scorer = None
+        self._rule_set = None
+        self._traversal_graph = None
+        self._symptom_urgency = None
+        self._generation += 1
+        if self.result_cache is not None:
+            self.result_cache.clear()
+    
+    def load_knowledge_file(self, path: str) -> int:
+        """
+        Stream a .metta knowledge file into the knowledge base and rule tables
+        
+        Fact atoms have the form (category symptom... condition confidence urgency specialist);
+        routing, threshold, escalate, pattern and differential atoms extend the
+        reasoning rules. At most ``max_facts`` facts are kept in total.
+        Returns the number of facts added.
+        """
+        self._detach_snapshot()
+        resolved = resolve_path(path)
+        if not resolved.exists():
+            logger.warning("MeTTa knowledge file not found: %s", resolved)
+            return 0
+        
+        rule_loaders = {
+            "routing": self._load_routing_atom,
+            "threshold": self._load_threshold_atom,
+            "escalate": self._load_escalate_atom,
+            "pattern": self._load_pattern_atom,
+            "differential": self._load_differential_atom,
+        }
+        seen = {(fact.condition, tuple(fact.symptoms)) for fact in self.knowledge_base}
+        added = 0
+        over_limit = 0
+        
+        try:
+            for atom in iter_atoms(str(resolved)):
+                loader = rule_loaders.get(atom[0])
+                if loader is not None:
+                    loader(atom[1:])
+                    continue
+                
+                fact = self._fact_from_atom(atom)
+                if fact is None:
+                    logger.debug("Skipping unsupported MeTTa atom: %s", atom)
+                    continue
+                
+                key = (fact.condition, tuple(fact.symptoms))
+                if key in seen:
+                    continue
+                if len(self.knowledge_base) >= self.max_facts:
+                    over_limit += 1
+                    continue
+                
+                seen.add(key)
+                self.add_fact(fact)
+                added += 1
+        except (OSError, MettaParseError) as e:
+            logger.error("Failed to load MeTTa knowledge file %s: %s", resolved, e)
+        
+        routing = self.reasoning_rules["specialist_routing"]
+        if routing:
+            for fact in self.knowledge_base:
+                fact.specialist = routing.get(fact.specialist, fact.specialist)
+        self._knowledge_changed()
+        
+        if over_limit:
+            logger.warning("METTA_MAX_FACTS=%d reached: skipped %d facts from %s",
+                           self.max_facts, over_limit, resolved)
+        logger.info("Loaded %d medical facts from %s", added, resolved)
+        return added
+    
+    @staticmethod
+    def _select_scoring_backend(backend: str) -> str:
+        """Validate a METTA_SCORING_BACKEND value, falling back to "python" without NumPy"""
+        backend = backend.lower()
+        if backend not in ("python", "numpy"):
+            raise ValueError(f"Unknown MeTTa scoring backend: {backend!r}")
+        if backend == "numpy":
+            from .vector_scoring import numpy_available
+            if not numpy_available():
+                logger.warning("NumPy is not installed; using the python scoring backend")
+                return "python"
+        return backend
+    
+    @property
+    def vector_scorer(self):
+        """Sparse incidence matrix for the numpy backend, built on first use"""
+        if self._vector_scorer is None:
+            from .vector_scoring import VectorScorer
+            self._vector_scorer = VectorScorer(self.knowledge_base, symptom_key)
+        return self._vector_scorer
+    
+    @property
+    def rule_set(self) -> RuleSet:
+        """Reasoning rule tables compiled into indexed frozenset rules"""
+        if self._rule_set is None:
+            self._rule_set = RuleSet.from_reasoning_rules(self.reasoning_rules)
+        return self._rule_set
+    
+    @property
+    def traversal_graph(self) -> TraversalGraph:
+        """Typed node/edge view of the facts and rules for multi-hop traversal"""
+        if self._traversal_graph is None:
+            self._traversal_graph = TraversalGraph(self.knowledge_base, self.reasoning_rules, symptom_key)
+            logger.info("Traversal graph built with %d nodes", len(self._traversal_graph))
+        return self._traversal_graph
+    
+    @property
+    def symptom_extractor(self) -> SymptomExtractor:
+        """Phrase matcher over every symptom in the knowledge base plus common synonyms"""
+        if self._symptom_extractor is None:
+            phrases = [(s.replace("_", " "), s) for fact in self.knowledge_base for s in fact.symptoms]
+            phrases.extend(SYMPTOM_SYNONYMS.items())
+            self._symptom_extractor = SymptomExtractor(phrases)
+            logger.info("Symptom extractor compiled with %d phrases",
+                        self._symptom_extractor.phrase_count)
+        return self._symptom_extractor
+    
+    def extract_symptoms(self, text: str) -> List[str]:
+        """Symptom names mentioned in free text, in order of mention"""
+        with _EXTRACTION_SECONDS.time():
+            return self.symptom_extractor.extract(text)
+    
+    def _canonical_name(self, name: str) -> str:
+        if self._vocabulary is None:
+            # Spellings already in the knowledge base (built-in facts first), used to
+            # map the compact names in .metta files ("chestpain") onto them ("chest_pain")
+            self._vocabulary = {}
+            for fact in self.knowledge_base:
+                for known in fact.symptoms + [fact.specialist]:
+                    self._vocabulary.setdefault(_compact_name(known), known)
+        return self._vocabulary.get(_compact_name(name), name)
+    
+    def _fact_from_atom(self, atom: List[str]) -> Optional[MedicalFact]:
+        """Decode (category symptom... condition confidence urgency specialist)"""
+        if len(atom) < 6:
+            return None
+        try:
+            confidence = float(atom[-3])
+        except ValueError:
+            return None
+        
+        urgency = atom[-2]
+        return MedicalFact(
+            condition=atom[-4],
+            symptoms=[self._canonical_name(s) for s in atom[1:-4]],
+            urgency=URGENCY_ALIASES.get(urgency, urgency),
+            specialist=self._canonical_name(atom[-1]),
+            confidence=confidence,
+            category=atom[0],
+        )
+    
+    def _load_routing_atom(self, args: List[str]) -> None:
+        # (routing specialist domain target)
+        if len(args) == 3:
+            source, _domain, target = args
+            self.reasoning_rules["specialist_routing"][self._canonical_name(source)] = \
+                self._canonical_name(target)
+    
+    def _load_threshold_atom(self, args: List[str]) -> None:
+        # (threshold level value)
+        if len(args) == 2:
+            try:
+                self.reasoning_rules["confidence_thresholds"][args[0]] = float(args[1])
+            except ValueError:
+                logger.debug("Skipping malformed threshold atom: %s", args)
+    
+    def _load_escalate_atom(self, args: List[str]) -> None:
+        # (escalate from_urgency to_urgency window) or (escalate symptom... urgency)
+        urgencies = [URGENCY_ALIASES.get(arg, arg) for arg in args]
+        if len(args) == 3 and urgencies[0] in URGENCY_LEVELS and urgencies[1] in URGENCY_LEVELS:
+            if urgencies[0] != urgencies[1]:
+                self.reasoning_rules["urgency_progression"][urgencies[0]] = {
+                    "escalates_to": urgencies[1],
+                    "window": args[2],
+                }
+        elif len(args) >= 2 and urgencies[-1] in URGENCY_LEVELS:
+            pattern = " + ".join(self._canonical_name(s) for s in args[:-1])
+            self.reasoning_rules["urgency_escalation"][pattern] = urgencies[-1]
+    
+    def _load_pattern_atom(self, args: List[str]) -> None:
+        # (pattern symptom... category)
+        if len(args) >= 2:
+            pattern = " + ".join(self._canonical_name(s) for s in args[:-1])
+            self.reasoning_rules["symptom_patterns"][pattern] = args[-1]
+    
+    def _load_differential_atom(self, args: List[str]) -> None:
+        # (differential category_a category_b symptom)
+        if len(args) == 3:
+            categories = self.reasoning_rules["differentials"].setdefault(
+                self._canonical_name(args[2]), [])
+            for category in args[:2]:
+                if category not in categories:
+                    categories.append(category)
+    
     def _initialize_knowledge_base(self) -> List[MedicalFact]:
         """Initialize medical knowledge base (MeTTa facts)"""
         return [
@@ -113,110 +571,294 @@ class MeTTaKnowledgeGraph:
             "multi_hop_inference": {
                 "fever + cough + fatigue": ["flu", "covid19", "pneumonia"],
                 "chest_pain + shortness_of_breath": ["heart_attack", "pneumonia"],
-            }
+            },
+            # Populated from the .metta knowledge file
+            "symptom_patterns": {},
+            "differentials": {},
+            "specialist_routing": {},
+            "confidence_thresholds": {},
+            "urgency_progression": {},
         }
     
-    def query_symptoms(self, symptoms: List[str]) -> List[Dict[str, Any]]:
+    def query_symptoms(self, symptoms: List[str], k: Optional[int] = DEFAULT_TOP_K) -> List[Dict[str, Any]]:
         """
         Query MeTTa knowledge graph for symptom analysis
         
         MeTTa-style query: (query-symptoms (symptom1 symptom2 symptom3))
-        Returns: [(condition confidence urgency specialist)]
+        Returns: [(condition confidence urgency specialist)], the ``k`` most
+        confident first (all matches when ``k`` is None)
         """
         logger.info("MeTTa query: analyzing symptoms %s", symptoms)
         
         # Normalize symptoms
-        normalized_symptoms = [s.lower().replace(" ", "_") for s in symptoms]
+        normalized_symptoms = [normalize_symptom(s) for s in symptoms]
         
-        results = []
+        with _QUERY_SECONDS.time():
+            [(match_count, results)] = self._score_cached([normalized_symptoms], k)
         
-        # Single-hop: Direct symptom matching
-        for fact in self.knowledge_base:
-            matching_symptoms = set(normalized_symptoms) & set(fact.symptoms)
-            if matching_symptoms:
-                match_ratio = len(matching_symptoms) / len(fact.symptoms)
-                confidence = fact.confidence * match_ratio
-                
-                # Boost confidence if critical symptoms match
-                if match_ratio > 0.6:
-                    confidence = min(0.95, confidence * 1.2)
-                
-                results.append({
-                    "condition": fact.condition,
-                    "confidence": round(confidence, 2),
-                    "urgency": fact.urgency,
-                    "specialist": fact.specialist,
-                    "matching_symptoms": list(matching_symptoms),
-                    "reasoning": f"Matched {len(matching_symptoms)}/{len(fact.symptoms)} symptoms"
-                })
+        logger.info("MeTTa query returned %d possible conditions", match_count)
+        return results
+    
+    async def query_symptoms_async(self, symptoms: List[str],
+                                   k: Optional[int] = DEFAULT_TOP_K) -> List[Dict[str, Any]]:
+        """
+        ``query_symptoms`` on the shared query executor, leaving the event loop free
+        
+        Concurrent calls for the same symptom set (in any order or spelling case)
+        share one computation. In process mode the default graph is queried in
+        the worker processes' own copies of it; any other graph is queried on a
+        worker thread.
+        """
+        normalized_symptoms = [normalize_symptom(s) for s in symptoms]
+        cache_key = self._cache_key(normalized_symptoms, k)
+        results = await self._single_flight.do(
+            (self._generation, cache_key), lambda: self._run_query(list(cache_key[0]), k))
+        return _reorder_matches(results, normalized_symptoms)
+    
+    async def _run_query(self, symptoms: List[str], k: Optional[int]) -> List[Dict[str, Any]]:
+        executor = get_query_executor()
+        if self is _metta_kg_instance and executor.mode == "process":
+            # Stage timings recorded in the worker process come back with the results
+            results, changes = await executor.run(_query_default_graph, symptoms, k, picklable=True)
+            REGISTRY.merge(changes)
+            return results
+        return await executor.run(self.query_symptoms, symptoms, k)
+    
+    def triage_urgency(self, symptoms: List[str]) -> str:
+        """
+        Cheap urgency estimate used to order queued requests before the full query
+        
+        Each symptom carries the urgency most of its conditions have (the higher
+        one on a tie); the estimate is the highest of those, or of any urgency
+        escalation rule the symptoms fire.
+        """
+        if self._symptom_urgency is None:
+            counts: Dict[str, Dict[str, int]] = {}
+            for fact in self.knowledge_base:
+                if fact.urgency in URGENCY_LEVELS:
+                    for symptom in fact.symptoms:
+                        by_urgency = counts.setdefault(symptom_key(symptom), {})
+                        by_urgency[fact.urgency] = by_urgency.get(fact.urgency, 0) + 1
+            self._symptom_urgency = {
+                key: max(by_urgency, key=lambda u: (by_urgency[u], URGENCY_LEVELS.index(u)))
+                for key, by_urgency in counts.items()
+            }
+        
+        normalized_symptoms = [normalize_symptom(s) for s in symptoms]
+        levels = [self._symptom_urgency.get(symptom_key(s)) for s in normalized_symptoms]
+        levels += [rule.conclusion for rule in self.rule_set.fired(normalized_symptoms)]
+        known = [level for level in levels if level in URGENCY_LEVELS]
+        return max(known, key=URGENCY_LEVELS.index) if known else "moderate"
+    
+    def query_symptoms_many(self, symptom_lists: Iterable[List[str]],
+                            k: Optional[int] = DEFAULT_TOP_K) -> List[List[Dict[str, Any]]]:
+        """
+        Batch form of ``query_symptoms``: one result list per input, in input order
+        
+        Normalized names, posting-list lookups and the results for repeated
+        symptom lists are shared across the batch instead of redone per item;
+        the numpy backend scores all distinct lists with one matrix product.
+        """
+        normalized_names: Dict[str, str] = {}
+        distinct: Dict[Tuple[str, ...], int] = {}
+        positions = []
+        
+        for symptoms in symptom_lists:
+            normalized_symptoms = []
+            for symptom in symptoms:
+                normalized = normalized_names.get(symptom)
+                if normalized is None:
+                    normalized = normalized_names[symptom] = normalize_symptom(symptom)
+                normalized_symptoms.append(normalized)
+            positions.append(distinct.setdefault(tuple(normalized_symptoms), len(distinct)))
+        
+        scored = self._score_cached([list(signature) for signature in distinct], k, postings_cache={})
+        
+        logger.info("MeTTa batch query analyzed %d symptom lists (%d distinct)",
+                    len(positions), len(distinct))
+        return [copy_results(scored[position][1]) for position in positions]
+    
+    def _score_cached(self, normalized_lists: List[List[str]], k: Optional[int],
+                      postings_cache: Optional[Dict[str, Sequence[int]]] = None) -> List[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        ``_score`` behind the result cache
+        
+        Misses are scored in their canonical (sorted) order, which changes only
+        the order of ``matching_symptoms``; every caller gets its own copy with
+        that list put back into the order the caller mentioned the symptoms.
+        """
+        cache = self.result_cache
+        if cache is None:
+            return self._score(normalized_lists, k, postings_cache)
+        
+        generation = cache.generation
+        scored: List[Optional[Tuple[int, List[Dict[str, Any]]]]] = [None] * len(normalized_lists)
+        misses = []
+        for position, normalized_symptoms in enumerate(normalized_lists):
+            cache_key = self._cache_key(normalized_symptoms, k)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                scored[position] = (cached[0], _reorder_matches(cached[1], normalized_symptoms))
+            else:
+                misses.append((position, cache_key))
+        
+        if misses:
+            to_score = [list(cache_key[0]) for _position, cache_key in misses]
+            for (position, cache_key), entry in zip(misses, self._score(to_score, k, postings_cache)):
+                cache.put(cache_key, entry, generation)
+                scored[position] = (entry[0], _reorder_matches(entry[1], normalized_lists[position]))
+        return scored
+    
+    @staticmethod
+    def _cache_key(normalized_symptoms: List[str], k: Optional[int]) -> Tuple:
+        """Canonical sorted symptom tuple plus ``k``"""
+        return tuple(sorted(set(normalized_symptoms))), k
+    
+    def _score(self, normalized_lists: List[List[str]], k: Optional[int],
+               postings_cache: Optional[Dict[str, Sequence[int]]] = None) -> List[Tuple[int, List[Dict[str, Any]]]]:
+        """Number of matching facts and the top ``k`` results for each normalized symptom list"""
+        if k is None:
+            k = len(self.knowledge_base)
+        
+        if self.scoring_backend == "numpy":
+            ranked_lists = self.vector_scorer.rank(normalized_lists, k)
+        else:
+            ranked_lists = [self._rank_matches(self.symptom_index.match(normalized_symptoms, postings_cache), k)
+                            for normalized_symptoms in normalized_lists]
+        
+        scored = []
+        for normalized_symptoms, (match_count, ranked) in zip(normalized_lists, ranked_lists):
+            results = [self._result(fact_id, confidence, matching, symptom_count)
+                       for fact_id, confidence, matching, symptom_count in ranked]
+            # Multi-hop: Apply reasoning rules (they adjust urgency, not the ranking)
+            scored.append((match_count, self._apply_reasoning_rules(results, normalized_symptoms)))
+        return scored
+    
+    def _rank_matches(self, matches: Dict[int, List[str]],
+                      k: int) -> Tuple[int, List[Tuple[int, float, List[str], int]]]:
+        """
+        Score matched facts and select the ``k`` most confident
         
-        # Multi-hop: Apply reasoning rules
-        results = self._apply_reasoning_rules(results, normalized_symptoms)
+        Matches are ranked by rounded confidence, ties going to the earlier
+        fact; a bounded heap keeps only the current top ``k`` candidates.
+        """
+        symptom_counts = self.symptom_index.symptom_counts
+        candidates = []
         
-        # Sort by confidence
-        results.sort(key=lambda x: x["confidence"], reverse=True)
+        # Single-hop: Direct symptom matching over the facts sharing a symptom
+        for fact_id, matching_symptoms in matches.items():
+            symptom_count = symptom_counts[fact_id]
+            match_ratio = len(matching_symptoms) / symptom_count
+            confidence = self.knowledge_base[fact_id].confidence * match_ratio
+            
+            # Boost confidence if critical symptoms match
+            if match_ratio > 0.6:
+                confidence = min(0.95, confidence * 1.2)
+            
+            candidates.append((-round(confidence, 2), fact_id))
         
-        logger.info("MeTTa query returned %d possible conditions", len(results))
-        return results[:5]  # Return top 5
+        winners = heapq.nsmallest(k, candidates)
+        return len(candidates), [
+            (fact_id, -negative_confidence, matches[fact_id], symptom_counts[fact_id])
+            for negative_confidence, fact_id in winners
+        ]
+    
+    def _result(self, fact_id: int, confidence: float, matching_symptoms: List[str],
+                symptom_count: int) -> Dict[str, Any]:
+        fact = self.knowledge_base[fact_id]
+        return {
+            "condition": fact.condition,
+            "confidence": confidence,
+            "urgency": fact.urgency,
+            "specialist": fact.specialist,
+            "matching_symptoms": matching_symptoms,
+            "reasoning": f"Matched {len(matching_symptoms)}/{symptom_count} symptoms"
+        }
     
     def _apply_reasoning_rules(self, results: List[Dict], symptoms: List[str]) -> List[Dict]:
         """Apply MeTTa-style reasoning rules for inference"""
         
-        # Check urgency escalation rules
-        for pattern, urgency in self.reasoning_rules["urgency_escalation"].items():
-            pattern_symptoms = pattern.replace(" ", "").split("+")
-            if all(s in symptoms for s in pattern_symptoms):
+        # Check urgency escalation rules; the rule index only yields rules
+        # whose every symptom was reported, in rule table order
+        with _REASONING_SECONDS.time():
+            for rule in self.rule_set.fired(symptoms):
                 for result in results:
-                    if any(s in result.get("matching_symptoms", []) for s in pattern_symptoms):
-                        result["urgency"] = urgency
+                    if not rule.symptoms.isdisjoint(result.get("matching_symptoms", [])):
+                        result["urgency"] = rule.conclusion
                         result["reasoning"] += " | Urgency escalated by rule"
         
         return results
     
-    def traverse_knowledge_graph(self, query: str, depth: int = 2) -> Dict[str, Any]:
+    def traverse_knowledge_graph(self, query: str, depth: int = 2,
+                                 urgency_filter: Optional[Iterable[str]] = None,
+                                 max_results: int = 25,
+                                 budget_ms: float = Config.METTA_TRAVERSAL_BUDGET_MS) -> Dict[str, Any]:
         """
         Multi-hop MeTTa graph traversal for complex reasoning
         
         Example: Patient has fever -> what conditions? -> which need urgent care?
+        Symptoms named in the query seed a breadth-first search of up to ``depth``
+        hops over symptoms, conditions, categories, specialists and urgencies.
+        "urgent" or "emergency" in the query (or ``urgency_filter``) keeps only
+        conditions of those urgencies, and the search stops once ``max_results``
+        conditions are found or ``budget_ms`` has elapsed.
         """
         logger.info("Multi-hop traversal: query='%s', depth=%d", query, depth)
+        with _TRAVERSAL_SECONDS.time():
+            return self._traverse(query, depth, urgency_filter, max_results, budget_ms)
+    
+    def _traverse(self, query: str, depth: int, urgency_filter: Optional[Iterable[str]],
+                  max_results: int, budget_ms: float) -> Dict[str, Any]:
+        graph = self.traversal_graph
+        if urgency_filter is None and ("urgent" in query.lower() or "emergency" in query.lower()):
+            urgency_filter = ("high", "emergency")
+        allowed_urgencies = set(urgency_filter) if urgency_filter else None
         
-        traversal_path = []
+        symptoms = self.extract_symptoms(query)
+        seeds = [node_id for node_id in (graph.find(SYMPTOM, s) for s in symptoms) if node_id is not None]
+        
+        found: List[int] = []
         
-        # Parse query (simplified for demo)
-        if "fever" in query.lower():
-            # Hop 1: Find conditions with fever
-            hop1 = [f for f in self.knowledge_base if "fever" in f.symptoms]
+        def wanted(node_id: int) -> bool:
+            condition = graph.conditions.get(node_id)
+            return condition is not None and (allowed_urgencies is None or condition[1] in allowed_urgencies)
+        
+        def expand(node_id: int) -> bool:
+            # Conditions filtered out by urgency are dead ends
+            return graph.types[node_id] != CONDITION or wanted(node_id)
+        
+        def reach(node_id: int) -> bool:
+            if wanted(node_id):
+                found.append(node_id)
+            return len(found) >= max_results
+        
+        hops, stopped = graph.bfs(seeds, depth, expand, reach,
+                                  budget_ms / 1000 if budget_ms else None)
+        if stopped == "budget":
+            logger.warning("Traversal budget of %sms exhausted after %d hops", budget_ms, len(hops))
+        
+        traversal_path = []
+        for hop, reached in enumerate(hops, 1):
             traversal_path.append({
-                "hop": 1,
-                "query": "conditions with fever",
-                "results": [f.condition for f in hop1]
+                "hop": hop,
+                "query": (f"conditions and categories linked to {', '.join(symptoms)}" if hop == 1
+                          else f"nodes linked to hop {hop - 1} results"),
+                # A condition with several facts has a node per fact; list it once
+                "results": list(dict.fromkeys(graph.conditions[n][0] for n in reached if wanted(n))),
+                "nodes_reached": len(reached),
             })
-            
-            # Hop 2: Filter by urgency if in query
-            if "urgent" in query.lower() or "emergency" in query.lower():
-                hop2 = [f for f in hop1 if f.urgency in ["high", "emergency"]]
-                traversal_path.append({
-                    "hop": 2,
-                    "query": "urgent cases only",
-                    "results": [f.condition for f in hop2]
-                })
-                final_results = hop2
-            else:
-                final_results = hop1
-        else:
-            final_results = []
         
         return {
             "traversal_path": traversal_path,
             "final_results": [
                 {
-                    "condition": f.condition,
-                    "urgency": f.urgency,
-                    "specialist": f.specialist
-                } for f in final_results
+                    "condition": condition,
+                    "urgency": urgency,
+                    "specialist": specialist
+                } for condition, urgency, specialist in dict.fromkeys(graph.conditions[n] for n in found)
             ],
-            "hops_executed": len(traversal_path)
+            "hops_executed": len(traversal_path),
+            "stopped_early": stopped
         }
     
     def get_specialist_recommendation(self, condition: str) -> Optional[str]:
@@ -230,12 +872,12 @@ class MeTTaKnowledgeGraph:
         """
         Generate human-readable explanation of MeTTa reasoning
         """
-        normalized_symptoms = [s.lower().replace(" ", "_") for s in symptoms]
+        reported_keys = {symptom_key(s) for s in symptoms}
         
         for fact in self.knowledge_base:
             if fact.condition == condition:
-                matching = set(normalized_symptoms) & set(fact.symptoms)
-                missing = set(fact.symptoms) - set(normalized_symptoms)
+                matching = [s for s in fact.symptoms if symptom_key(s) in reported_keys]
+                missing = [s for s in fact.symptoms if symptom_key(s) not in reported_keys]
                 
                 explanation = f"MeTTa Reasoning for {condition}:\n"
                 explanation += f"- Matched symptoms: {', '.join(matching)}\n"
@@ -252,6 +894,27 @@ class MeTTaKnowledgeGraph:
 
 # Singleton instance
 _metta_kg_instance = None
+_query_executor = None
+_triage_dispatcher = None
+
+_SUCCESS_QUERIES = QUERIES.labels("success")
+_CLARIFICATION_QUERIES = QUERIES.labels("clarification_needed")
+
+
+def _cache_metrics():
+    """Result cache counters of the shared knowledge graph, read at scrape time"""
+    cache = _metta_kg_instance.result_cache if _metta_kg_instance is not None else None
+    if cache is None:
+        return []
+    return [
+        ("synaptiverse_query_cache_total", "counter", "MeTTa result cache lookups by result",
+         [({"result": "hit"}, cache.hits), ({"result": "miss"}, cache.misses)]),
+        ("synaptiverse_query_cache_entries", "gauge", "Results held by the MeTTa result cache",
+         [({}, len(cache))]),
+    ]
+
+
+REGISTRY.add_collector(_cache_metrics)
 
 
 def get_metta_knowledge_graph() -> MeTTaKnowledgeGraph:
@@ -262,6 +925,43 @@ def get_metta_knowledge_graph() -> MeTTaKnowledgeGraph:
     return _metta_kg_instance
 
 
+def get_query_executor() -> QueryExecutor:
+    """Get the shared executor that async queries run on (METTA_EXECUTOR_* settings)"""
+    global _query_executor
+    if _query_executor is None:
+        _query_executor = QueryExecutor(Config.METTA_EXECUTOR, Config.METTA_EXECUTOR_WORKERS,
+                                        Config.METTA_MAX_IN_FLIGHT,
+                                        initializer=get_metta_knowledge_graph)
+    return _query_executor
+
+
+def get_triage_dispatcher() -> TriageDispatcher:
+    """Get the shared dispatcher that admits triaged queries by urgency (TRIAGE_* settings)"""
+    global _triage_dispatcher
+    if _triage_dispatcher is None:
+        _triage_dispatcher = TriageDispatcher(Config.TRIAGE_MAX_CONCURRENCY, Config.TRIAGE_MAX_QUEUE,
+                                              Config.TRIAGE_AGING_SECONDS)
+    return _triage_dispatcher
+
+
+def compile_knowledge_snapshot(knowledge_path: str = Config.METTA_KNOWLEDGE_PATH,
+                               snapshot_path: str = Config.METTA_SNAPSHOT_PATH,
+                               max_facts: int = Config.METTA_MAX_FACTS) -> str:
+    """Parse the knowledge file and (re)write its compiled snapshot, returning the snapshot path"""
+    kg = MeTTaKnowledgeGraph(knowledge_path=knowledge_path, max_facts=max_facts, snapshot_path=None)
+    source_digest = kg._source_digest(knowledge_path)
+    if source_digest is None:
+        raise FileNotFoundError(f"MeTTa knowledge file not found: {knowledge_path}")
+    if not kg.save_snapshot(snapshot_path, source_digest):
+        raise OSError(f"Could not write knowledge snapshot: {snapshot_path}")
+    return str(resolve_path(snapshot_path))
+
+
+def extract_symptoms(natural_text: str) -> List[str]:
+    """Extract known symptom names from free text using the shared knowledge graph"""
+    return get_metta_knowledge_graph().extract_symptoms(natural_text)
+
+
 def query_metta(natural_text: str) -> Dict[str, Any]:
     """
     Main interface for MeTTa queries from natural language
@@ -269,34 +969,101 @@ def query_metta(natural_text: str) -> Dict[str, Any]:
     """
     kg = get_metta_knowledge_graph()
     
-    # Simple NL parsing (in production, use proper NLP)
-    symptoms = []
-    
-    # Extract symptoms from natural language
-    symptom_keywords = {
-        "fever": "fever", "cough": "cough", "headache": "headache",
-        "nausea": "nausea", "pain": "pain", "fatigue": "fatigue",
-        "dizzy": "dizziness", "chest pain": "chest_pain",
-        "shortness of breath": "shortness_of_breath", "vomit": "vomiting",
-        "sore throat": "sore_throat", "runny nose": "runny_nose",
-        "body aches": "body_aches", "sweating": "sweating"
-    }
-    
-    text_lower = natural_text.lower()
-    for keyword, symptom in symptom_keywords.items():
-        if keyword in text_lower:
-            symptoms.append(symptom)
+    # Extract symptoms from natural language in one pass over the text
+    symptoms = kg.extract_symptoms(natural_text)
     
     if not symptoms:
-        return {
-            "status": "clarification_needed",
-            "message": "Could not identify clear symptoms. Please describe your symptoms more specifically.",
-            "suggestions": ["fever", "cough", "headache", "nausea", "pain"]
-        }
+        return clarification_response()
     
     # Query MeTTa knowledge graph
     results = kg.query_symptoms(symptoms)
     
+    return success_response(symptoms, results)
+
+
+async def query_metta_async(natural_text: str, triage: bool = False) -> Dict[str, Any]:
+    """
+    Non-blocking ``query_metta``: scoring runs on the shared query executor, and
+    concurrent queries naming the same symptoms share one computation
+    
+    With ``triage``, the query waits for the shared triage dispatcher, which
+    admits the most urgent extracted symptoms first and raises
+    ``LoadShedError`` when the request is shed under load.
+    """
+    kg = get_metta_knowledge_graph()
+    symptoms = kg.extract_symptoms(natural_text)
+    
+    if not symptoms:
+        return clarification_response()
+    
+    if triage:
+        async with get_triage_dispatcher().slot(kg.triage_urgency(symptoms)):
+            results = await kg.query_symptoms_async(symptoms)
+    else:
+        results = await kg.query_symptoms_async(symptoms)
+    
+    return success_response(symptoms, results)
+
+
+def query_metta_batch(items: Iterable[Union[str, List[str]]], processes: int = 0,
+                      chunk_size: int = 1000) -> List[Dict[str, Any]]:
+    """
+    Triage many inputs at once, returning one ``query_metta``-shaped result per item in order
+    
+    Items are free-text descriptions or lists of symptom names. With
+    ``processes`` > 1, chunks of ``chunk_size`` items are scored on a process pool.
+    """
+    if processes > 1:
+        items = iter(items)
+        chunks = iter(lambda: list(islice(items, chunk_size)), [])
+        batch_results: List[Dict[str, Any]] = []
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            for chunk_results, changes in pool.map(_query_metta_chunk_recorded, chunks):
+                REGISTRY.merge(changes)
+                batch_results.extend(chunk_results)
+        return batch_results
+    return _query_metta_chunk(items)
+
+
+async def query_metta_batch_async(items: List[Union[str, List[str]]]) -> List[Dict[str, Any]]:
+    """
+    Non-blocking ``query_metta_batch`` of one chunk on the shared query executor
+    
+    In process mode the chunk is scored in a worker process and the metrics
+    recorded there are merged into this process's registry.
+    """
+    executor = get_query_executor()
+    if executor.mode == "process":
+        batch_results, changes = await executor.run(_query_metta_chunk_recorded, items, picklable=True)
+        REGISTRY.merge(changes)
+        return batch_results
+    return await executor.run(_query_metta_chunk, items)
+
+
+def _query_default_graph(symptoms: List[str], k: Optional[int]) -> Tuple[List[Dict[str, Any]], Changes]:
+    return collect_changes(get_metta_knowledge_graph().query_symptoms, symptoms, k)
+
+
+def _query_metta_chunk_recorded(items: List[Union[str, List[str]]]) -> Tuple[List[Dict[str, Any]], Changes]:
+    return collect_changes(_query_metta_chunk, items)
+
+
+def _query_metta_chunk(items: Iterable[Union[str, List[str]]]) -> List[Dict[str, Any]]:
+    kg = get_metta_knowledge_graph()
+    symptom_lists = [kg.extract_symptoms(item) if isinstance(item, str) else list(item)
+                     for item in items]
+    
+    to_query = [symptoms for symptoms in symptom_lists if symptoms]
+    ranked = iter(kg.query_symptoms_many(to_query))
+    return [success_response(symptoms, next(ranked)) if symptoms else clarification_response()
+            for symptoms in symptom_lists]
+
+
+def success_response(symptoms: List[str], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The ``query_metta`` result for ranked ``results``, counted in the query metrics"""
+    _SUCCESS_QUERIES.inc()
+    if results:
+        URGENCY.labels(results[0]["urgency"]).inc()
     return {
         "status": "success",
         "identified_symptoms": symptoms,
@@ -305,6 +1072,16 @@ def query_metta(natural_text: str) -> Dict[str, Any]:
     }
 
 
+def clarification_response() -> Dict[str, Any]:
+    """The ``query_metta`` result when no symptom was recognised, counted in the query metrics"""
+    _CLARIFICATION_QUERIES.inc()
+    return {
+        "status": "clarification_needed",
+        "message": "Could not identify clear symptoms. Please describe your symptoms more specifically.",
+        "suggestions": ["fever", "cough", "headache", "nausea", "pain"]
+    }
+
+
 # For testing
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
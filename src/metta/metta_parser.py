@@ -0,0 +1,73 @@
+"""
+Streaming S-expression parser for MeTTa knowledge files
+Reads .metta files line by line so large knowledge bases never sit in memory as text
+"""
+
+import re
+from typing import Iterable, Iterator, List, Union
+
+# A parsed expression: a symbol/number token or a (possibly nested) list of them
+Expression = Union[str, List["Expression"]]
+
+# Strings, comment starts, parentheses, or bare symbols
+_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|;|[()]|[^\s()";]+')
+
+
+class MettaParseError(ValueError):
+    """Raised when a knowledge file is not a well-formed sequence of S-expressions"""
+
+    def __init__(self, message: str, line_no: int):
+        super().__init__(f"line {line_no}: {message}")
+        self.line_no = line_no
+
+
+def iter_expressions(lines: Iterable[str]) -> Iterator[Expression]:
+    """
+    Yield top-level expressions from an iterable of lines
+
+    Expressions may span lines; ``;`` starts a comment that runs to the end
+    of the line. Only the expression currently being read is held in memory.
+    """
+    stack: List[List[Expression]] = []
+    line_no = 0
+
+    for line_no, line in enumerate(lines, 1):
+        for match in _TOKEN_RE.finditer(line):
+            token = match.group()
+            if token == ";":
+                break
+            if token == "(":
+                stack.append([])
+            elif token == ")":
+                if not stack:
+                    raise MettaParseError("unexpected ')'", line_no)
+                expression = stack.pop()
+                if stack:
+                    stack[-1].append(expression)
+                else:
+                    yield expression
+            else:
+                if token.startswith('"'):
+                    token = token[1:-1]
+                if stack:
+                    stack[-1].append(token)
+                else:
+                    yield token
+
+    if stack:
+        raise MettaParseError("unterminated expression at end of file", line_no)
+
+
+def iter_atoms(path: str) -> Iterator[List[str]]:
+    """
+    Stream the flat atoms ``(head arg1 arg2 ...)`` of a knowledge file
+
+    Bare top-level symbols and nested expressions are not part of the
+    knowledge file format and are skipped.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for expression in iter_expressions(f):
+            if isinstance(expression, list) and expression and all(
+                isinstance(part, str) for part in expression
+            ):
+                yield expression
@@ -0,0 +1,92 @@
+"""
+Bounded executor for running MeTTa queries off the event loop
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import threading
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ("thread", "process")
+
+
+class QueryExecutor:
+    """
+    Thread or process pool with a cap on in-flight queries
+
+    Callers beyond ``max_in_flight`` wait on the event loop for a slot instead
+    of piling work into the pool's queue. In process mode only functions that
+    can be pickled (module-level functions) go to the process pool; bound
+    methods always run on the thread pool.
+    """
+
+    def __init__(self, mode: str = "thread", max_workers: int = 4, max_in_flight: int = 32,
+                 initializer: Optional[Callable[[], Any]] = None):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode: {mode!r}")
+        if max_in_flight <= 0:
+            raise ValueError("max_in_flight must be positive")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
+        self._initializer = initializer
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        # asyncio primitives belong to one event loop, so each loop gets its own
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = \
+            weakref.WeakKeyDictionary()
+        self.in_flight = 0
+        self.completed = 0
+
+    def _pool(self, picklable: bool) -> Executor:
+        with self._pool_lock:
+            if self.mode == "process" and picklable:
+                if self._processes is None:
+                    # Forked workers would inherit the sockets open when the pool
+                    # starts (such as the request that started it) and keep them open
+                    context = multiprocessing.get_context(
+                        "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else None)
+                    self._processes = ProcessPoolExecutor(self.max_workers, mp_context=context,
+                                                          initializer=self._initializer)
+                return self._processes
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(self.max_workers, thread_name_prefix="metta-query")
+            return self._threads
+
+    async def run(self, fn: Callable[..., Any], *args: Any, picklable: bool = False) -> Any:
+        """Run ``fn(*args)`` in the pool once an in-flight slot is free"""
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_in_flight)
+
+        async with slots:
+            self.in_flight += 1
+            try:
+                return await loop.run_in_executor(self._pool(picklable), functools.partial(fn, *args))
+            finally:
+                self.in_flight -= 1
+                self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._pool_lock:
+            for pool in (self._threads, self._processes):
+                if pool is not None:
+                    pool.shutdown(wait=wait)
+            self._threads = self._processes = None
@@ -0,0 +1,51 @@
+"""
+Compiled MeTTa urgency escalation rules
+Turns the "a + b + c" pattern strings of the urgency escalation table into
+frozenset rules once, with a symptom -> rule index so a query only looks at
+rules that mention one of its symptoms
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List
+
+
+def parse_pattern(pattern: str) -> FrozenSet[str]:
+    """Symptoms of a "chest_pain + shortness_of_breath" style pattern"""
+    return frozenset(pattern.replace(" ", "").split("+"))
+
+
+@dataclass(frozen=True)
+class Rule:
+    """One compiled rule: escalates to the ``conclusion`` urgency when all of ``symptoms`` are reported"""
+    rule_id: int
+    symptoms: FrozenSet[str]
+    conclusion: str
+
+
+class RuleSet:
+    """Rules in table order, indexed by the symptoms they mention"""
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules: List[Rule] = list(rules)
+        self._by_symptom: Dict[str, List[int]] = {}
+        for position, rule in enumerate(self.rules):
+            for symptom in rule.symptoms:
+                self._by_symptom.setdefault(symptom, []).append(position)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    @classmethod
+    def from_reasoning_rules(cls, reasoning_rules: Dict[str, Any]) -> "RuleSet":
+        """The ``urgency_escalation`` table of ``reasoning_rules``, the only rules queries apply"""
+        return cls(Rule(rule_id, parse_pattern(pattern), urgency) for rule_id, (pattern, urgency)
+                   in enumerate(reasoning_rules.get("urgency_escalation", {}).items()))
+
+    def fired(self, symptoms: Iterable[str]) -> List[Rule]:
+        """Rules whose symptoms were all reported, in table order"""
+        counts: Dict[int, int] = {}
+        for symptom in set(symptoms):
+            for position in self._by_symptom.get(symptom, ()):
+                counts[position] = counts.get(position, 0) + 1
+        return [self.rules[position] for position, hits in sorted(counts.items())
+                if hits == len(self.rules[position].symptoms)]
@@ -0,0 +1,39 @@
+"""
+Single-flight coalescing of identical concurrent async calls
+"""
+
+import asyncio
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Concurrent ``do`` calls with the same key share one in-flight computation
+
+    The first caller starts ``compute``; later callers with the same key await
+    its result until it completes, after which the key is free again. Every
+    caller receives the same object (or exception), so callers must not
+    mutate it.
+    """
+
+    def __init__(self):
+        # Tasks belong to one event loop, so each loop tracks its own calls
+        self._calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Task]]" = \
+            weakref.WeakKeyDictionary()
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        calls = self._calls.setdefault(loop, {})
+
+        task = calls.get(key)
+        if task is None:
+            # A task of its own, so the computation outlives any one cancelled caller
+            task = calls[key] = loop.create_task(compute())
+            task.add_done_callback(lambda _task: calls.pop(key, None))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
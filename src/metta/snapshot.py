@@ -0,0 +1,297 @@
+"""
+Compiled binary snapshots of the MeTTa knowledge graph
+Interned string table, fact arrays and symptom posting lists in one versioned
+file that is memory-mapped at startup instead of re-parsing the .metta source
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: snapshot compilation is not serialised across processes
+    fcntl = None
+
+from .metta_interface import MedicalFact, SymptomIndex, symptom_key
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"SVKG"
+SNAPSHOT_VERSION = 2
+
+# Marks a missing optional string (e.g. a fact without a category)
+NO_STRING = 0xFFFFFFFF
+
+# magic, format version, little-endian flag, source digest, section count
+_HEADER = struct.Struct("<4sHH32sI")
+# offset and length of each section
+_SECTION = struct.Struct("<QQ")
+
+# Sections, in file order: (name, array typecode or None for raw bytes)
+_SECTIONS = [
+    ("string_offsets", "I"),
+    ("string_data", None),
+    ("fact_condition", "I"),
+    ("fact_urgency", "I"),
+    ("fact_specialist", "I"),
+    ("fact_category", "I"),
+    ("fact_confidence", "d"),
+    ("fact_symptom_start", "I"),
+    ("fact_symptoms", "I"),
+    ("fact_symptom_count", "I"),
+    ("key_strings", "I"),
+    ("posting_start", "I"),
+    ("posting_facts", "I"),
+    ("reasoning_rules", None),
+]
+
+
+def write_snapshot(path: str, facts: Sequence, reasoning_rules: Dict[str, Any],
+                   source_digest: bytes) -> None:
+    """
+    Compile facts and reasoning rules into a snapshot file at ``path``
+
+    The file is written next to its destination and renamed into place, so
+    readers never observe a partially written snapshot.
+    """
+    strings: Dict[str, int] = {}
+
+    def intern(value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        sid = strings.get(value)
+        if sid is None:
+            sid = strings[value] = len(strings)
+        return sid
+
+    arrays = {name: array(typecode) for name, typecode in _SECTIONS if typecode}
+    postings: Dict[str, List[int]] = {}
+
+    arrays["fact_symptom_start"].append(0)
+    for fact_id, fact in enumerate(facts):
+        arrays["fact_condition"].append(intern(fact.condition))
+        arrays["fact_urgency"].append(intern(fact.urgency))
+        arrays["fact_specialist"].append(intern(fact.specialist))
+        arrays["fact_category"].append(intern(fact.category))
+        arrays["fact_confidence"].append(fact.confidence)
+        arrays["fact_symptoms"].extend(intern(s) for s in fact.symptoms)
+        arrays["fact_symptom_start"].append(len(arrays["fact_symptoms"]))
+        arrays["fact_symptom_count"].append(len(fact.symptoms))
+        for key in {symptom_key(s) for s in fact.symptoms}:
+            postings.setdefault(key, []).append(fact_id)
+
+    # Posting keys are sorted by their UTF-8 bytes for binary search
+    arrays["posting_start"].append(0)
+    for key in sorted(postings, key=lambda k: k.encode("utf-8")):
+        arrays["key_strings"].append(intern(key))
+        arrays["posting_facts"].extend(postings[key])
+        arrays["posting_start"].append(len(arrays["posting_facts"]))
+
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = arrays["string_offsets"]
+    offsets.append(0)
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+
+    raw = {
+        "string_data": b"".join(encoded),
+        "reasoning_rules": json.dumps(reasoning_rules).encode("utf-8"),
+    }
+    payloads = [raw[name] if typecode is None else arrays[name].tobytes()
+                for name, typecode in _SECTIONS]
+
+    # Lay sections out after the header, each aligned to 8 bytes
+    offset = _HEADER.size + _SECTION.size * len(_SECTIONS)
+    table = []
+    for payload in payloads:
+        offset += -offset % 8
+        table.append((offset, len(payload)))
+        offset += len(payload)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, sys.byteorder == "little",
+                             source_digest, len(_SECTIONS)))
+        for section in table:
+            f.write(_SECTION.pack(*section))
+        for (section_offset, _length), payload in zip(table, payloads):
+            f.write(b"\0" * (section_offset - f.tell()))
+            f.write(payload)
+    os.replace(tmp_path, path)
+
+    logger.info("Wrote knowledge snapshot %s (%d facts, %d strings, %d symptom keys)",
+                path, len(facts), len(strings), len(postings))
+
+
+@contextmanager
+def snapshot_lock(path: str) -> Iterator[None]:
+    """Hold an exclusive inter-process lock on ``path`` (via ``path.lock``)"""
+    if fcntl is None:
+        yield
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def load_snapshot(path: str, source_digest: bytes) -> Optional["KnowledgeSnapshot"]:
+    """
+    Memory-map a snapshot, or return None if it is missing, stale or unreadable
+
+    A snapshot is stale when it was compiled from a different source digest,
+    by a different format version, or on a machine with another byte order.
+    """
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, version, little_endian, digest, count = _HEADER.unpack_from(mapped, 0)
+        if (magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION
+                or bool(little_endian) != (sys.byteorder == "little")
+                or count != len(_SECTIONS)):
+            logger.info("Ignoring incompatible knowledge snapshot %s", path)
+            mapped.close()
+            return None
+        if digest != source_digest:
+            logger.info("Knowledge snapshot %s is stale; recompiling", path)
+            mapped.close()
+            return None
+        return KnowledgeSnapshot(path, mapped)
+    except (struct.error, ValueError) as e:
+        # Views into the mapping may still be referenced by the traceback, so
+        # the mapping is left for garbage collection rather than closed here
+        logger.warning("Ignoring corrupt knowledge snapshot %s: %s", path, e)
+        return None
+
+
+class KnowledgeSnapshot:
+    """
+    Read-only view over a memory-mapped snapshot file
+
+    The mapping is shared (MAP_SHARED, read-only), so every process mapping
+    the same snapshot reads the same page-cache pages for its strings, facts
+    and posting lists rather than a copy. The reasoning rules are stored as
+    JSON and decoded into a private dict by each process.
+    """
+
+    def __init__(self, path: str, mapped: mmap.mmap):
+        self.path = path
+        self._mmap = mapped
+        buffer = memoryview(mapped)
+        self.sections: Dict[str, memoryview] = {}
+        for i, (name, typecode) in enumerate(_SECTIONS):
+            offset, length = _SECTION.unpack_from(mapped, _HEADER.size + i * _SECTION.size)
+            if offset + length > len(mapped):
+                raise ValueError(f"section {name} runs past end of file")
+            view = buffer[offset:offset + length]
+            self.sections[name] = view.cast(typecode) if typecode else view
+
+        self.reasoning_rules: Dict[str, Any] = json.loads(
+            bytes(self.sections["reasoning_rules"]).decode("utf-8"))
+        self.facts = FactTable(self)
+        self.symptom_index = MappedSymptomIndex(self)
+
+    def string_bytes(self, sid: int) -> bytes:
+        offsets = self.sections["string_offsets"]
+        return bytes(self.sections["string_data"][offsets[sid]:offsets[sid + 1]])
+
+    def string(self, sid: int) -> Optional[str]:
+        if sid == NO_STRING:
+            return None
+        return self.string_bytes(sid).decode("utf-8")
+
+
+class FactTable(Sequence):
+    """
+    Sequence of MedicalFacts decoded from the snapshot's fact arrays
+
+    Each fact is decoded on first access and kept, so queries index it at
+    list speed; facts never touched stay in the shared mapping only.
+    """
+
+    def __init__(self, snapshot: KnowledgeSnapshot):
+        self._snapshot = snapshot
+        self._sections = snapshot.sections
+        self._decoded: List[Optional[MedicalFact]] = [None] * len(self._sections["fact_condition"])
+
+    def __len__(self) -> int:
+        return len(self._decoded)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        fact = self._decoded[index]
+        if fact is None:
+            if index < 0:
+                index += len(self)
+            fact = self._decoded[index] = self._decode(index)
+        return fact
+
+    def _decode(self, index: int) -> MedicalFact:
+        sections = self._sections
+        string = self._snapshot.string
+        start = sections["fact_symptom_start"][index]
+        end = sections["fact_symptom_start"][index + 1]
+        return MedicalFact(
+            condition=string(sections["fact_condition"][index]),
+            symptoms=[string(sid) for sid in sections["fact_symptoms"][start:end]],
+            urgency=string(sections["fact_urgency"][index]),
+            specialist=string(sections["fact_specialist"][index]),
+            confidence=sections["fact_confidence"][index],
+            category=string(sections["fact_category"][index]),
+        )
+
+
+class MappedSymptomIndex(SymptomIndex):
+    """Read-only SymptomIndex that binary-searches the snapshot's posting lists"""
+
+    def __init__(self, snapshot: KnowledgeSnapshot):
+        self._snapshot = snapshot
+        self._keys = snapshot.sections["key_strings"]
+        self._starts = snapshot.sections["posting_start"]
+        self._facts = snapshot.sections["posting_facts"]
+        self.symptom_counts = snapshot.sections["fact_symptom_count"]
+
+    def clear(self) -> None:
+        raise TypeError("snapshot symptom index is read-only")
+
+    def add(self, fact_id: int, symptoms: List[str]) -> None:
+        raise TypeError("snapshot symptom index is read-only")
+
+    def lookup(self, key: str) -> Sequence:
+        target = key.encode("utf-8")
+        lo, hi = 0, len(self._keys)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._snapshot.string_bytes(self._keys[mid]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._keys) and self._snapshot.string_bytes(self._keys[lo]) == target:
+            return self._facts[self._starts[lo]:self._starts[lo + 1]]
+        return ()
+
+
+if __name__ == "__main__":
+    # Compile step: python -m src.metta.snapshot
+    from .metta_interface import compile_knowledge_snapshot
+
+    logging.basicConfig(level=logging.INFO)
+    print(f"Snapshot written to {compile_knowledge_snapshot()}")
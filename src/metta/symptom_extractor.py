@@ -0,0 +1,142 @@
+"""
+Multi-pattern symptom extraction for SynaptiVerse
+A word-level Aho-Corasick automaton over every known symptom phrase, so free
+text is scanned once however large the symptom vocabulary grows
+"""
+
+import re
+from typing import Dict, Iterable, List, Tuple
+
+# Words are runs of letters/digits; underscores and punctuation separate them,
+# so "chest_pain", "chest-pain" and "chest pain" tokenize alike
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Everyday phrasings mapped onto knowledge-base symptom names
+SYMPTOM_SYNONYMS: Dict[str, str] = {
+    "dizzy": "dizziness",
+    "lightheaded": "dizziness",
+    "light headed": "dizziness",
+    "vomit": "vomiting",
+    "vomited": "vomiting",
+    "throwing up": "vomiting",
+    "throw up": "vomiting",
+    "threw up": "vomiting",
+    "nauseous": "nausea",
+    "feverish": "fever",
+    "high temperature": "fever",
+    "headaches": "headache",
+    "coughing": "cough",
+    "tired": "fatigue",
+    "tiredness": "fatigue",
+    "exhausted": "fatigue",
+    "exhaustion": "fatigue",
+    "short of breath": "shortness_of_breath",
+    "breathless": "shortness_of_breath",
+    "out of breath": "shortness_of_breath",
+    "body ache": "body_aches",
+    "aching body": "body_aches",
+    "sweats": "sweating",
+    "sweaty": "sweating",
+    "stomach ache": "stomach_pain",
+    "stomachache": "stomach_pain",
+    "tummy ache": "stomach_pain",
+    "belly pain": "abdominal_pain",
+    "abdominal pain": "abdominal_pain",
+    "back pain": "back_pain",
+    "lower back pain": "low_back_pain",
+    "neck pain": "neck_pain",
+    "knee pain": "knee_pain",
+    "muscle aches": "muscle_aches",
+    "night sweats": "night_sweats",
+    "stiff neck": "stiff_neck",
+    "weight loss": "weight_loss",
+    "weight gain": "weight_gain",
+    "runny nose": "runny_nose",
+    "sore throat": "sore_throat",
+    "itchy": "itching",
+    "itchy skin": "itching",
+    "swollen": "swelling",
+    "rash": "rash",
+    "pain": "pain",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of ``text``"""
+    return _WORD_RE.findall(text.lower())
+
+
+class SymptomExtractor:
+    """
+    Aho-Corasick automaton over symptom phrases, matched on whole words
+
+    ``extract`` returns the symptoms of the leftmost-longest non-overlapping
+    phrase matches, so "chest pain" wins over the "pain" inside it.
+    """
+
+    def __init__(self, phrases: Iterable[Tuple[str, str]]):
+        """Compile ``(phrase, symptom)`` pairs; the first symptom given for a phrase wins"""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (phrase length in words, symptom) for every phrase ending at each node
+        self._outputs: List[List[Tuple[int, str]]] = [[]]
+        self.phrase_count = 0
+
+        for phrase, symptom in phrases:
+            words = tokenize(phrase)
+            if words:
+                self._add_phrase(words, symptom)
+        self._link()
+
+    def _add_phrase(self, words: List[str], symptom: str) -> None:
+        node = 0
+        for word in words:
+            next_node = self._goto[node].get(word)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][word] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            node = next_node
+        if not self._outputs[node]:
+            self._outputs[node].append((len(words), symptom))
+            self.phrase_count += 1
+
+    def _link(self) -> None:
+        """Compute failure links breadth-first and merge suffix outputs into each node"""
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for word, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(word, 0)
+                self._fail[child] = target if target != child else 0
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+                queue.append(child)
+
+    def extract(self, text: str) -> List[str]:
+        """Symptoms mentioned in ``text``, in order of first mention, without duplicates"""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        matches: List[Tuple[int, int, str]] = []
+        node = 0
+        for position, word in enumerate(tokenize(text)):
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            for length, symptom in outputs[node]:
+                matches.append((position - length + 1, -length, symptom))
+
+        # Leftmost-longest selection of non-overlapping matches
+        matches.sort()
+        symptoms: Dict[str, None] = {}
+        covered_until = 0
+        for start, negative_length, symptom in matches:
+            if start >= covered_until:
+                symptoms.setdefault(symptom, None)
+                covered_until = start - negative_length
+        return list(symptoms)
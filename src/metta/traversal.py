@@ -0,0 +1,117 @@
+"""
+Multi-hop traversal over the MeTTa medical knowledge graph
+Symptoms, conditions, categories, specialists and urgency levels become typed
+nodes with int-array adjacency lists, explored by bounded-depth BFS
+"""
+
+import time
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+NODE_TYPES = ("symptom", "condition", "category", "specialist", "urgency")
+SYMPTOM, CONDITION, CATEGORY, SPECIALIST, URGENCY = range(len(NODE_TYPES))
+
+
+class TraversalGraph:
+    """
+    Typed knowledge graph in compressed adjacency form
+
+    Every fact is a condition node linked both ways to its symptoms and
+    category, and onwards to its specialist and urgency. Pattern and
+    differential rules link symptoms and categories both ways. Neighbours of
+    node ``n`` are ``targets[offsets[n]:offsets[n + 1]]``.
+    """
+
+    def __init__(self, facts: Sequence, reasoning_rules: Dict[str, Any], key_of: Callable[[str], str]):
+        self._key_of = key_of
+        self.names: List[str] = []
+        self.types = array("b")
+        self._ids: Dict[Tuple[int, str], int] = {}
+        # Fact behind each condition node, -1 for other node types
+        self.fact_ids = array("i")
+        # (condition, urgency, specialist) of each condition node
+        self.conditions: Dict[int, Tuple[str, str, str]] = {}
+        edges: List[List[int]] = []
+
+        def node(node_type: int, name: str, fact_id: int = -1) -> int:
+            key = (node_type, key_of(name)) if fact_id < 0 else (node_type, str(fact_id))
+            node_id = self._ids.get(key)
+            if node_id is None:
+                node_id = self._ids[key] = len(self.names)
+                self.names.append(name)
+                self.types.append(node_type)
+                self.fact_ids.append(fact_id)
+                edges.append([])
+            return node_id
+
+        def link(a: int, b: int, both_ways: bool = True) -> None:
+            edges[a].append(b)
+            if both_ways:
+                edges[b].append(a)
+
+        for fact_id, fact in enumerate(facts):
+            condition = node(CONDITION, fact.condition, fact_id)
+            self.conditions[condition] = (fact.condition, fact.urgency, fact.specialist)
+            for symptom in fact.symptoms:
+                link(node(SYMPTOM, symptom), condition)
+            if fact.category:
+                link(condition, node(CATEGORY, fact.category))
+            link(condition, node(SPECIALIST, fact.specialist), both_ways=False)
+            link(condition, node(URGENCY, fact.urgency), both_ways=False)
+
+        for pattern, category in reasoning_rules.get("symptom_patterns", {}).items():
+            for symptom in pattern.replace(" ", "").split("+"):
+                link(node(SYMPTOM, symptom), node(CATEGORY, category))
+        for symptom, categories in reasoning_rules.get("differentials", {}).items():
+            for category in categories:
+                link(node(SYMPTOM, symptom), node(CATEGORY, category))
+
+        self.offsets = array("i", [0])
+        self.targets = array("i")
+        for neighbours in edges:
+            self.targets.extend(dict.fromkeys(neighbours))
+            self.offsets.append(len(self.targets))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def find(self, node_type: int, name: str) -> Optional[int]:
+        return self._ids.get((node_type, self._key_of(name)))
+
+    def bfs(self, seeds: Iterable[int], depth: int, expand: Callable[[int], bool],
+            reach: Callable[[int], bool] = lambda node_id: False,
+            budget_s: Optional[float] = None) -> Tuple[List[List[int]], Optional[str]]:
+        """
+        Breadth-first search from ``seeds`` up to ``depth`` hops
+
+        Each node is visited at most once. ``reach`` is called for every newly
+        reached node and ends the search by returning true; nodes for which
+        ``expand`` is false are reached but not expanded. Returns the nodes first
+        reached at each hop and why the search ended early ("limit" or
+        "budget"), or None if it ran to ``depth`` or exhausted the graph.
+        """
+        deadline = time.perf_counter() + budget_s if budget_s is not None else None
+        offsets, targets = self.offsets, self.targets
+        seeds = list(dict.fromkeys(seeds))
+        visited = bytearray(len(self.names))
+        for node_id in seeds:
+            visited[node_id] = 1
+        frontier = [n for n in seeds if expand(n)]
+        hops: List[List[int]] = []
+
+        for _hop in range(depth):
+            if not frontier:
+                break
+            reached: List[int] = []
+            hops.append(reached)
+            for node_id in frontier:
+                for neighbour in targets[offsets[node_id]:offsets[node_id + 1]]:
+                    if not visited[neighbour]:
+                        visited[neighbour] = 1
+                        reached.append(neighbour)
+                        if reach(neighbour):
+                            return hops, "limit"
+                if deadline is not None and time.perf_counter() > deadline:
+                    return hops, "budget"
+            frontier = [n for n in reached if expand(n)]
+        return hops, None
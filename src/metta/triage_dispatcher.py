@@ -0,0 +1,160 @@
+"""
+Urgency-ordered admission of triage work
+Requests wait in one priority queue keyed by urgency and arrival time, so an
+emergency is served before queued routine work, without starving it
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+# Lowest tier first; a request's tier is its index here
+TRIAGE_TIERS = ("low", "moderate", "high", "emergency")
+
+
+class LoadShedError(RuntimeError):
+    """The triage queue was full and this request was dropped"""
+
+    def __init__(self, urgency: str):
+        super().__init__(f"Triage queue full; {urgency} request shed")
+        self.urgency = urgency
+
+
+class _Waiter:
+    __slots__ = ("tier", "sequence", "enqueued", "future")
+
+    def __init__(self, tier: int, sequence: int, enqueued: float, future: asyncio.Future):
+        self.tier = tier
+        self.sequence = sequence
+        self.enqueued = enqueued
+        self.future = future
+
+
+class TriageDispatcher:
+    """
+    At most ``max_concurrency`` requests run at once; the rest wait by urgency
+
+    Waiting requests are ordered by arrival time minus ``aging_seconds`` per
+    tier above "low", so an emergency overtakes up to ``3 * aging_seconds`` of
+    queued low-urgency work, and anything that has waited that long is served
+    before newer, more urgent requests. With ``max_queue`` requests waiting, a
+    new request displaces the newest waiter of a lower tier, or is itself shed
+    if none is lower. Shed requests raise ``LoadShedError``.
+
+    Use from a single event loop.
+    """
+
+    def __init__(self, max_concurrency: int = 32, max_queue: int = 256, aging_seconds: float = 2.0,
+                 clock: Callable[[], float] = time.monotonic):
+        if max_concurrency <= 0 or max_queue < 0:
+            raise ValueError("max_concurrency must be positive and max_queue non-negative")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.aging_seconds = aging_seconds
+        self._clock = clock
+        self._running = 0
+        self._heap: List[Tuple[float, int, _Waiter]] = []
+        # Waiting requests per tier, oldest first, for picking the one to shed
+        self._waiting: List["OrderedDict[int, _Waiter]"] = [OrderedDict() for _ in TRIAGE_TIERS]
+        self._sequence = itertools.count()
+        self._dispatched = [0] * len(TRIAGE_TIERS)
+        self._shed = [0] * len(TRIAGE_TIERS)
+        self._wait_total = [0.0] * len(TRIAGE_TIERS)
+        self._wait_max = [0.0] * len(TRIAGE_TIERS)
+
+    @staticmethod
+    def tier(urgency: Optional[str]) -> int:
+        try:
+            return TRIAGE_TIERS.index(urgency)
+        except ValueError:
+            return TRIAGE_TIERS.index("moderate")
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiting) for waiting in self._waiting)
+
+    @asynccontextmanager
+    async def slot(self, urgency: Optional[str]) -> AsyncIterator[None]:
+        """Hold a dispatch slot for the duration of the block"""
+        await self.acquire(urgency)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, urgency: Optional[str]) -> None:
+        tier = self.tier(urgency)
+        if self._running < self.max_concurrency and not self._heap:
+            self._running += 1
+            self._record_dispatch(tier, 0.0)
+            return
+
+        if self.queued >= self.max_queue:
+            self._shed_for(tier)
+
+        now = self._clock()
+        waiter = _Waiter(tier, next(self._sequence), now, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._heap, (now - tier * self.aging_seconds, waiter.sequence, waiter))
+        self._waiting[tier][waiter.sequence] = waiter
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                # The slot was handed over just as the caller gave up
+                self.release()
+            else:
+                self._waiting[tier].pop(waiter.sequence, None)
+            raise
+
+    def _shed_for(self, tier: int) -> None:
+        """Make room for a request of ``tier`` in a full queue, or shed it"""
+        for lower in range(tier):
+            if self._waiting[lower]:
+                _sequence, victim = self._waiting[lower].popitem(last=True)
+                # A waiter cancelled since its task last ran frees its place as is
+                if not victim.future.done():
+                    self._shed[lower] += 1
+                    victim.future.set_exception(LoadShedError(TRIAGE_TIERS[lower]))
+                return
+        self._shed[tier] += 1
+        raise LoadShedError(TRIAGE_TIERS[tier])
+
+    def release(self) -> None:
+        # Hand the slot straight to the best waiter that is still waiting
+        while self._heap:
+            _key, _sequence, waiter = heapq.heappop(self._heap)
+            if self._waiting[waiter.tier].pop(waiter.sequence, None) is None or waiter.future.done():
+                # Shed, or cancelled and not yet back in acquire to leave the queue
+                continue
+            self._record_dispatch(waiter.tier, self._clock() - waiter.enqueued)
+            waiter.future.set_result(None)
+            return
+        self._running -= 1
+
+    def _record_dispatch(self, tier: int, waited: float) -> None:
+        self._dispatched[tier] += 1
+        self._wait_total[tier] += waited
+        self._wait_max[tier] = max(self._wait_max[tier], waited)
+
+    def stats(self) -> Dict[str, Any]:
+        tiers = {}
+        for tier, name in enumerate(TRIAGE_TIERS):
+            dispatched = self._dispatched[tier]
+            tiers[name] = {
+                "queued": len(self._waiting[tier]),
+                "dispatched": dispatched,
+                "shed": self._shed[tier],
+                "mean_wait_ms": round(self._wait_total[tier] / dispatched * 1000, 3) if dispatched else 0.0,
+                "max_wait_ms": round(self._wait_max[tier] * 1000, 3),
+            }
+        return {
+            "running": self._running,
+            "max_concurrency": self.max_concurrency,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "tiers": tiers,
+        }
@@ -0,0 +1,151 @@
+"""
+Vectorized scoring backend for MeTTa symptom queries
+Holds the knowledge base as a sparse fact x symptom incidence matrix and scores
+whole batches of queries with NumPy array operations instead of a loop over facts
+"""
+
+import logging
+from typing import Callable, Dict, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # metta_interface falls back to the pure-Python scorer
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# One ranked match: (fact id, rounded confidence, matching query symptoms, fact symptom count)
+RankedMatch = Tuple[int, float, List[str], int]
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+class VectorScorer:
+    """
+    Sparse incidence matrix over the knowledge base's symptom keys
+
+    Rows are facts in CSR form (``indptr``/``indices``) alongside per-fact
+    confidence and symptom-count vectors; the transposed CSC form holds each
+    key's posting list. Rankings reproduce ``MeTTaKnowledgeGraph._rank_matches``
+    exactly: the same float64 operations in the same order, Python ``round``
+    on the values that can reach the top, and ties broken by fact id.
+    """
+
+    def __init__(self, facts: Sequence, key_of: Callable[[str], str]):
+        if np is None:
+            raise ImportError("the numpy scoring backend requires NumPy")
+        self._key_of = key_of
+        self.key_ids: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        confidence: List[float] = []
+        symptom_count: List[int] = []
+        for fact in facts:
+            keys = {self.key_ids.setdefault(key_of(s), len(self.key_ids)) for s in fact.symptoms}
+            indices.extend(sorted(keys))
+            indptr.append(len(indices))
+            confidence.append(fact.confidence)
+            symptom_count.append(len(fact.symptoms))
+
+        self.fact_count = len(confidence)
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.array(indices, dtype=np.int64)
+        self.confidence = np.array(confidence, dtype=np.float64)
+        self.symptom_count = np.array(symptom_count, dtype=np.int64)
+        # Row views used when building the few winning results
+        self.fact_keys = [frozenset(indices[a:b]) for a, b in zip(indptr, indptr[1:])]
+        self.symptom_counts = symptom_count
+
+        # Transpose to key -> fact ids; a stable sort keeps each posting list in fact order
+        fact_of_entry = np.repeat(np.arange(self.fact_count, dtype=np.int64), np.diff(self.indptr))
+        order = np.argsort(self.indices, kind="stable")
+        self.key_facts = fact_of_entry[order]
+        self.key_indptr = np.zeros(len(self.key_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=len(self.key_ids)), out=self.key_indptr[1:])
+
+        logger.info("Vector scorer built: %d facts x %d symptom keys, %d entries",
+                    self.fact_count, len(self.key_ids), len(self.indices))
+
+    def rank(self, symptom_lists: Sequence[List[str]], limit: int) -> List[Tuple[int, List[RankedMatch]]]:
+        """
+        Score normalized symptom lists with one sparse matrix product
+
+        Returns, per list, the number of matching facts and the best ``limit``
+        matches ordered by rounded confidence (descending), then fact id.
+        """
+        # Query matrix in CSR form: the distinct known keys of each list, in mention order
+        query_keys: List[List[Tuple[int, str]]] = []
+        rows: List[int] = []
+        cols: List[int] = []
+        for row, symptoms in enumerate(symptom_lists):
+            seen = set()
+            pairs = []
+            for symptom in symptoms:
+                key = self._key_of(symptom)
+                if key in seen:
+                    continue
+                seen.add(key)
+                key_id = self.key_ids.get(key)
+                if key_id is not None:
+                    pairs.append((key_id, symptom))
+                    rows.append(row)
+                    cols.append(key_id)
+            query_keys.append(pairs)
+
+        entries, matched = self._multiply(np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64))
+        fact_count = max(self.fact_count, 1)
+        query_of_entry = entries // fact_count
+        fact_of_entry = entries % fact_count
+
+        ratio = matched / self.symptom_count[fact_of_entry]
+        confidence = self.confidence[fact_of_entry] * ratio
+        boost = ratio > 0.6
+        confidence[boost] = np.minimum(0.95, confidence[boost] * 1.2)
+
+        # Order each query's matches best-first by NumPy's rounding; it can differ
+        # from Python's round() by one unit in the last place, which _top corrects
+        approx = np.round(confidence, 2)
+        order = np.lexsort((fact_of_entry, -approx, query_of_entry))
+        bounds = np.searchsorted(query_of_entry[order], np.arange(len(symptom_lists) + 1)).tolist()
+        facts = fact_of_entry[order].tolist()
+        confidence = confidence[order].tolist()
+        approx = approx[order].tolist()
+        return [
+            self._top(facts, confidence, approx, start, end, query_keys[row], limit)
+            for row, (start, end) in enumerate(zip(bounds[:-1], bounds[1:]))
+        ]
+
+    def _multiply(self, rows, cols):
+        """Sparse (queries x keys) @ (keys x facts): matched-key counts per (query, fact)"""
+        starts = self.key_indptr[cols]
+        lengths = self.key_indptr[cols + 1] - starts
+        total = int(lengths.sum())
+        # Expand every (query, key) entry into that key's posting list
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        facts = self.key_facts[offsets + np.arange(total, dtype=np.int64)]
+        queries = np.repeat(rows, lengths)
+        return np.unique(queries * max(self.fact_count, 1) + facts, return_counts=True)
+
+    def _top(self, facts: List[int], confidence: List[float], approx: List[float], start: int,
+             end: int, query_keys: List[Tuple[int, str]], limit: int) -> Tuple[int, List[RankedMatch]]:
+        if start == end or limit <= 0:
+            return end - start, []
+
+        # NumPy's rounding is at most one step (0.01) from Python's, so nothing
+        # more than two steps below the limit-th approximation can make the cut;
+        # only the matches above that line are rounded exactly and re-ranked
+        cutoff_at = min(start + limit, end) - 1
+        cutoff = approx[cutoff_at] - 0.025
+        stop = cutoff_at + 1
+        while stop < end and approx[stop] >= cutoff:
+            stop += 1
+        scored = sorted((-round(confidence[i], 2), facts[i]) for i in range(start, stop))[:limit]
+
+        ranked = []
+        for negative_confidence, fact_id in scored:
+            fact_keys = self.fact_keys[fact_id]
+            matching = [symptom for key_id, symptom in query_keys if key_id in fact_keys]
+            ranked.append((fact_id, -negative_confidence, matching, self.symptom_counts[fact_id]))
+        return end - start, ranked
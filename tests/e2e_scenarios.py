@@ -7,12 +7,14 @@ import pytest
 import asyncio
 import sys
 import os
+import time
 from datetime import datetime
 
 # Add parent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.metta.metta_interface import query_metta, get_metta_knowledge_graph
+from src.metta.metrics import STAGE_SECONDS
 
 
 class TestScenarioA:
@@ -317,12 +319,13 @@ class TestIntegration:
         total_time = 0
         successful_queries = 0
         
+        stages = ("extraction", "query_symptoms", "reasoning_rules")
+        before = {name: (STAGE_SECONDS.labels(name).sum, STAGE_SECONDS.labels(name).count) for name in stages}
+        
         for test in test_cases:
-            start = datetime.now()
+            start = time.perf_counter()
             result = query_metta(test)
-            end = datetime.now()
-            
-            query_time = (end - start).total_seconds()
+            query_time = time.perf_counter() - start
             total_time += query_time
             
             if result["status"] == "success":
@@ -337,6 +340,11 @@ class TestIntegration:
         print(f"   Average response time: {avg_time:.3f}s")
         print(f"   Success rate: {success_rate:.0f}%")
         print(f"   Total queries: {len(test_cases)}")
+        for name in stages:
+            histogram = STAGE_SECONDS.labels(name)
+            count = histogram.count - before[name][1]
+            if count:
+                print(f"   {name}: {(histogram.sum - before[name][0]) / count * 1000:.3f}ms avg over {count}")
         
         assert avg_time < 1.0, "Average response should be < 1 second"
         assert success_rate >= 80, "Success rate should be >= 80%"
@@ -0,0 +1,820 @@
+"""
+Unit tests for the agents' in-memory data structures
+"""
+
+import asyncio
+import pytest
+import sys
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from uuid import uuid4
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.agents.advisor_pool import AdvisorPool, load_advisor_addresses
+from src.agents.appointment_store import (
+    AppointmentStore, InMemoryAppointmentStore, SQLiteAppointmentStore, create_appointment_store
+)
+from src.agents.batch_input import BadItem, BatchInputError, item_fields, iter_json_array, iter_ndjson
+from src.agents.consultation_rpc import ConsultationClient, ConsultationUnavailable
+from src.agents.consultation_store import ConsultationStore
+from src.agents.rate_limiter import (
+    MemoryRateLimitBackend, RateLimiter, RateLimitMiddleware, SQLiteRateLimitBackend, client_key
+)
+from src.agents.static_assets import IMMUTABLE, StaticAssets
+from src.agents.slot_scheduler import SlotScheduler, SpecialistCalendar, format_slot
+
+
+def metta_result(condition, *symptoms):
+    return {
+        "status": "success",
+        "identified_symptoms": list(symptoms),
+        "possible_conditions": [{"condition": condition, "specialist": "gp", "urgency": "low",
+                                 "confidence": 0.5, "matching_symptoms": list(symptoms)}],
+    }
+
+
+def appointment(appointment_id, patient, specialist, scheduled_time, status="confirmed"):
+    return {"id": appointment_id, "patient": patient, "specialist": specialist,
+            "scheduled_time": scheduled_time, "status": status}
+
+
+def scheduler(**kwargs):
+    # Monday 2025-01-06, clinic 09:00-11:00 with 30 minute slots
+    options = dict(slot_minutes=30, capacity=1, open_hour=9, close_hour=11, horizon_days=30,
+                   origin=datetime(2025, 1, 6))
+    options.update(kwargs)
+    return SlotScheduler(**options)
+
+
+class TestConsultationStore:
+    """Bounded medical advisor consultation history"""
+
+    def test_records_are_compact_and_capped_per_sender(self):
+        store = ConsultationStore(max_per_sender=2)
+        for condition in ("flu", "cold", "migraine"):
+            store.record("alice", metta_result(condition, "fever", "cough"))
+
+        records = store.get("alice")
+
+        assert [r.condition for r in records] == ["cold", "migraine"]
+        assert store.symptoms(records[0]) == ["fever", "cough"]
+        assert records[0].symptom_ids == records[1].symptom_ids
+
+    def test_least_recently_active_sender_is_evicted(self):
+        store = ConsultationStore(max_senders=2)
+        store.record("alice", metta_result("flu", "fever"))
+        store.record("bob", metta_result("flu", "fever"))
+        store.record("alice", metta_result("cold", "cough"))
+        store.start_session("carol")
+
+        assert list(store) == ["alice", "carol"]
+        assert store.evicted_senders == 1
+
+    def test_idle_senders_expire(self):
+        now = [1000.0]
+        store = ConsultationStore(ttl_seconds=60, clock=lambda: now[0])
+        store.record("alice", metta_result("flu", "fever"))
+        now[0] += 30
+        store.record("bob", metta_result("flu", "fever"))
+
+        now[0] += 31
+        assert store.expire() == 1
+        assert "alice" not in store and store.get("bob")
+
+    def test_clarification_results_are_recorded_without_condition(self):
+        store = ConsultationStore()
+
+        record = store.record("alice", {"status": "clarification_needed", "message": "?"})
+
+        assert record.condition is None and record.symptom_ids == ()
+
+
+class TestAppointmentStore:
+    """Indexed appointment repository"""
+
+    def test_lookups_by_patient_specialist_and_status(self):
+        store = InMemoryAppointmentStore()
+        store.add(appointment("a1", "alice", "cardiologist", "2025-01-02 10:00 UTC"))
+        store.add(appointment("a2", "bob", "cardiologist", "2025-01-01 10:00 UTC"))
+        store.add(appointment("a3", "alice", "neurologist", "2025-01-03 10:00 UTC", status="cancelled"))
+
+        assert [a["id"] for a in store.by_patient("alice")] == ["a1", "a3"]
+        assert [a["id"] for a in store.by_specialist("cardiologist")] == ["a1", "a2"]
+        assert [a["id"] for a in store.by_status("cancelled")] == ["a3"]
+        assert store.by_patient("carol") == []
+
+    def test_reassignment_and_deletion_update_indexes(self):
+        store = InMemoryAppointmentStore()
+        store.add(appointment("a1", "alice", "cardiologist", "2025-01-02 10:00 UTC"))
+        store.add(appointment("a2", "alice", "neurologist", "2025-01-01 10:00 UTC"))
+
+        store["a1"] = dict(store["a1"], status="cancelled")
+        del store["a2"]
+
+        assert store.by_status("confirmed") == []
+        assert [a["id"] for a in store.by_status("cancelled")] == ["a1"]
+        assert [a["id"] for a in store.in_time_order()] == ["a1"] and len(store) == 1
+
+    def test_time_ordered_iteration_puts_immediate_first(self):
+        store = InMemoryAppointmentStore()
+        store.add(appointment("late", "alice", "gp", "2025-01-03 14:00 UTC"))
+        store.add(appointment("now", "bob", "emergency_medicine", "IMMEDIATE - Visit Emergency Room"))
+        store.add(appointment("early", "carol", "gp", "2025-01-01 09:00 UTC"))
+
+        assert [a["id"] for a in store.in_time_order()] == ["now", "early", "late"]
+        assert [a["id"] for a in store.in_time_order("2025-01-01", "2025-01-02")] == ["early"]
+
+    def test_backends_must_implement_lookups(self):
+        class MappingOnlyStore(AppointmentStore):
+            __getitem__ = __setitem__ = __delitem__ = __iter__ = __len__ = None
+
+        with pytest.raises(TypeError, match="find, in_time_order"):
+            MappingOnlyStore()
+
+    def test_coordinator_specialist_field_is_indexed(self):
+        store = InMemoryAppointmentStore()
+        store.add({"id": "a1", "patient": "alice", "recommended_specialist": "gp",
+                   "scheduled_time": "2025-01-01 10:00 UTC", "status": "confirmed"})
+
+        assert [a["id"] for a in store.by_specialist("gp")] == ["a1"]
+
+
+class TestSQLiteAppointmentStore:
+    """Durable SQLite appointment backend"""
+
+    def test_matches_in_memory_store(self, tmp_path):
+        memory = InMemoryAppointmentStore()
+        sqlite = SQLiteAppointmentStore(tmp_path / "appointments.db")
+        appointments = [
+            appointment("a1", "alice", "cardiologist", "2025-01-02 10:00 UTC"),
+            appointment("a2", "bob", "cardiologist", "IMMEDIATE - Visit Emergency Room"),
+            appointment("a3", "alice", "neurologist", "2025-01-01 10:00 UTC", status="cancelled"),
+        ]
+        for store in (memory, sqlite):
+            store.add_many(appointments)
+            store["a1"] = dict(store["a1"], status="cancelled")
+            del store["a2"]
+
+        assert list(sqlite) == list(memory) and len(sqlite) == 2 and "a2" not in sqlite
+        assert sqlite.by_patient("alice") == memory.by_patient("alice")
+        assert sqlite.by_status("cancelled") == memory.by_status("cancelled")
+        assert list(sqlite.in_time_order(end="2025-01-02")) == list(memory.in_time_order(end="2025-01-02"))
+        sqlite.close()
+
+    def test_data_is_shared_and_survives_reopening(self, tmp_path):
+        path = tmp_path / "appointments.db"
+        writer = SQLiteAppointmentStore(path)
+        reader = SQLiteAppointmentStore(path)
+
+        writer.add(dict(appointment("a1", "alice", "gp", "2025-01-01 10:00 UTC"), symptoms="fever"))
+        writer.close()
+
+        assert reader["a1"]["patient"] == "alice"
+        assert "symptoms" not in SQLiteAppointmentStore(path)["a1"]
+        reader.close()
+
+    def test_backend_is_selected_by_name(self, tmp_path):
+        assert isinstance(create_appointment_store("memory"), InMemoryAppointmentStore)
+        store = create_appointment_store("sqlite", str(tmp_path / "appointments.db"))
+        assert isinstance(store, SQLiteAppointmentStore)
+        store.close()
+
+
+class TestSlotScheduler:
+    """Per-specialist slot calendars"""
+
+    def test_bookings_fill_earliest_free_slots_without_overbooking(self):
+        slots = scheduler()
+        now = datetime(2025, 1, 6, 8, 0)
+
+        times = [format_slot(slots.book("cardiologist", "high", now=now)) for _ in range(5)]
+
+        assert times == ["2025-01-06 09:00 UTC", "2025-01-06 09:30 UTC", "2025-01-06 10:00 UTC",
+                         "2025-01-06 10:30 UTC", "2025-01-07 09:00 UTC"]
+        assert slots.book("neurologist", "high", now=now) == datetime(2025, 1, 6, 9, 0)
+
+    def test_capacity_allows_parallel_appointments(self):
+        slots = scheduler(capacity=2)
+        now = datetime(2025, 1, 6, 8, 0)
+
+        first, second, third = (slots.book("gp", "moderate", now=now) for _ in range(3))
+
+        assert first == second == datetime(2025, 1, 6, 9, 0)
+        assert third == datetime(2025, 1, 6, 9, 30)
+
+    def test_urgency_window_and_preferred_time(self):
+        slots = scheduler()
+        now = datetime(2025, 1, 6, 9, 40)
+
+        assert slots.book("gp", "low", now=now) == datetime(2025, 1, 7, 10, 0)
+        assert slots.book("gp", "moderate", "tomorrow", now=now) == datetime(2025, 1, 7, 9, 0)
+        assert slots.book("gp", "low", "next_week", now=now) == datetime(2025, 1, 13, 10, 0)
+
+    def test_full_window_overflows_then_waitlists(self):
+        slots = scheduler(horizon_days=2)
+        now = datetime(2025, 1, 6, 8, 0)
+        booked = [slots.book("gp", "high", now=now) for _ in range(8)]
+
+        assert booked[-1] == datetime(2025, 1, 7, 10, 30)
+        assert slots.book("gp", "high", now=now) is None and slots.waitlisted == 1
+
+    def test_existing_and_released_slots(self):
+        slots = scheduler()
+        now = datetime(2025, 1, 6, 8, 0)
+        reserved = slots.reserve_existing([
+            {"id": "a1", "recommended_specialist": "gp", "scheduled_time": "2025-01-06 09:00 UTC"},
+            {"id": "a2", "specialist": "gp", "scheduled_time": "IMMEDIATE - Visit Emergency Room"},
+        ])
+
+        assert reserved == 1
+        assert slots.book("gp", "high", now=now) == datetime(2025, 1, 6, 9, 30)
+        slots.release("gp", datetime(2025, 1, 6, 9, 0))
+        assert slots.book("gp", "high", now=now) == datetime(2025, 1, 6, 9, 0)
+
+    def test_cancelled_appointment_frees_its_slot(self, tmp_path):
+        store = SQLiteAppointmentStore(tmp_path / "appointments.db")
+        slots = scheduler(store=store)
+        now = datetime(2025, 1, 6, 8, 0)
+        booked = {"id": "a1", "recommended_specialist": "gp", "status": "confirmed",
+                  "scheduled_time": format_slot(slots.book("gp", "high", now=now))}
+
+        assert slots.release_appointment(booked)
+        assert not slots.release_appointment({**booked, "scheduled_time": "IMMEDIATE - Visit Emergency Room"})
+        assert slots.book("gp", "high", now=now) == datetime(2025, 1, 6, 9, 0)
+        store.close()
+
+    def test_past_days_are_dropped(self):
+        slots = scheduler(horizon_days=2)
+        monday, wednesday = datetime(2025, 1, 6, 8, 0), datetime(2025, 1, 8, 8, 0)
+        for _ in range(4):
+            slots.book("gp", "high", now=monday)
+        assert slots.reserve("gp", datetime(2025, 1, 8, 9, 0))
+        size = len(slots._calendars["gp"])
+
+        assert slots.book("gp", "high", now=wednesday) == datetime(2025, 1, 8, 9, 30)
+        assert slots.origin == datetime(2025, 1, 8) and len(slots._calendars["gp"]) == size
+        slots.release("gp", datetime(2025, 1, 6, 9, 0))
+        assert slots.book("gp", "high", now=wednesday) == datetime(2025, 1, 8, 10, 0)
+
+    def test_processes_sharing_a_store_never_double_book(self, tmp_path):
+        path = tmp_path / "appointments.db"
+        stores = [SQLiteAppointmentStore(path), SQLiteAppointmentStore(path)]
+        first, second = (scheduler(capacity=2, store=store) for store in stores)
+        now = datetime(2025, 1, 6, 8, 0)
+
+        booked = [format_slot(slots.book("gp", "high", now=now)) for slots in (first, second, first, second)]
+
+        assert booked == ["2025-01-06 09:00 UTC", "2025-01-06 09:00 UTC",
+                          "2025-01-06 09:30 UTC", "2025-01-06 09:30 UTC"]
+        assert first.claim_conflicts == 1 and second.claim_conflicts == 1
+        second.release("gp", datetime(2025, 1, 6, 9, 0))
+        assert second.book("gp", "high", now=now) == datetime(2025, 1, 6, 9, 0)
+        assert first.book("gp", "high", now=now) == datetime(2025, 1, 6, 10, 0)
+        for store in stores:
+            store.close()
+
+    def test_calendar_matches_linear_scan(self):
+        import random
+        rng = random.Random(7)
+        calendar, free = SpecialistCalendar(capacity=2, size=50), [2] * 50
+        for _ in range(500):
+            lo = rng.randrange(60)
+            hi = lo + rng.randrange(1, 40)
+            expected = next((i for i in range(lo, hi) if i >= len(free) or free[i]), None)
+            assert calendar.first_free(lo, hi) == expected
+            free.extend([2] * (len(calendar) - len(free)))
+            if expected is not None and rng.random() < 0.8:
+                calendar.book(expected)
+                free[expected] -= 1
+            elif rng.random() < 0.1:
+                count = rng.randrange(len(free))
+                calendar.shift(count)
+                free = free[count:] + [2] * count
+            else:
+                slot = rng.randrange(len(free))
+                calendar.release(slot)
+                free[slot] = min(2, free[slot] + 1)
+
+
+@contextmanager
+def consulting_agent(client, **options):
+    """
+    A uAgents agent whose consultation replies resolve ``client``, plus a factory
+    of ``send`` functions that answer a request by queueing a ConsultationResponse
+    on that agent, as a Medical Advisor's reply would arrive
+    """
+    pytest.importorskip("uagents")
+    from uagents import Agent, Protocol
+    from src.agents.consultation_protocol import (
+        CONSULTATION_PROTOCOL, CONSULTING_AGENT_OPTIONS, ConsultationResponse
+    )
+
+    loop = asyncio.new_event_loop()
+    agent = Agent(name="coordinator", seed="synaptiverse test coordinator",
+                  loop=loop, **{**CONSULTING_AGENT_OPTIONS, **options})
+    protocol = Protocol(name=CONSULTATION_PROTOCOL)
+
+    @protocol.on_message(model=ConsultationResponse)
+    async def handle_consultation_response(ctx, sender, msg):
+        client.resolve(msg.request_id, msg)
+
+    agent.include(protocol)
+
+    def reply(status="success", delay=0.0):
+        async def send(address, message):
+            response = ConsultationResponse(request_id=message.request_id, status=status,
+                                            patient_id=message.patient_id)
+
+            async def deliver():
+                await asyncio.sleep(delay)
+                await agent.handle_message(address, response.build_schema_digest(response),
+                                           response.json(), uuid4())
+            asyncio.ensure_future(deliver())
+        return send
+
+    try:
+        yield agent, reply
+    finally:
+        loop.close()
+
+
+def consultation_request(request_id, symptoms=("fever",)):
+    from src.agents.consultation_protocol import ConsultationRequest
+    return ConsultationRequest(request_id=request_id, patient_id="patient", symptoms=list(symptoms),
+                               urgency="low", request_time="2025-01-01T00:00:00")
+
+
+@contextmanager
+def advisor_agent(coordinator, **options):
+    """
+    A Medical Advisor agent on ``coordinator``'s event loop answering consultations
+    with the MeTTa engine, plus a ``send`` that queues a request on it as coming
+    from ``coordinator`` (whose agent receives the replies)
+    """
+    from uagents import Agent
+    from src.agents.consultation_handler import create_consultation_protocol
+    from src.agents.consultation_protocol import CONSULTING_AGENT_OPTIONS
+    from src.metta.metta_interface import LoadShedError, query_metta_async
+
+    advisor = Agent(name="advisor", seed="synaptiverse test advisor", loop=coordinator._loop,
+                    **{**CONSULTING_AGENT_OPTIONS, **options})
+    advisor.include(create_consultation_protocol(query_metta_async, lambda *args: "analysis", (LoadShedError,)))
+    advisor.start_message_receivers()
+
+    async def send(address, message):
+        await advisor.handle_message(coordinator.address, message.build_schema_digest(message),
+                                     message.json(), uuid4())
+
+    try:
+        yield send
+    finally:
+        advisor._message_queue_task.cancel()
+        coordinator._loop.run_until_complete(asyncio.gather(advisor._message_queue_task, return_exceptions=True))
+
+
+def agent_run(agent, coroutine):
+    """Run ``coroutine`` as a message handler of ``agent``, with its message queue running"""
+    from uagents import Model, Protocol
+    result = {}
+
+    class Start(Model):
+        pass
+
+    protocol = Protocol(name="test")
+
+    @protocol.on_message(model=Start)
+    async def start(ctx, sender, msg):
+        result["value"] = await coroutine
+
+    agent.include(protocol)
+
+    async def main():
+        agent.start_message_receivers()
+        start_message = Start()
+        await agent.handle_message(agent.address, start_message.build_schema_digest(start_message),
+                                   start_message.json(), uuid4())
+        while "value" not in result:
+            await asyncio.sleep(0.005)
+        agent._message_queue_task.cancel()
+        return result["value"]
+
+    return agent._loop.run_until_complete(asyncio.wait_for(main(), 10))
+
+
+class Message:
+    def __init__(self, request_id):
+        self.request_id = request_id
+
+
+class TestConsultationClient:
+    """Correlated request/response over one-way agent messages"""
+
+    def test_replies_dispatched_by_the_agent_resolve_calls(self):
+        # Consultations run inside one handler while the replies arrive through
+        # the same agent's message queue, as in the Appointment Coordinator
+        client = ConsultationClient(timeout=1)
+
+        async def main():
+            return await asyncio.gather(*(client.call(send, "advisor", request) for request, send in consultations))
+
+        with consulting_agent(client) as (agent, reply):
+            consultations = [(consultation_request(str(i)), reply(delay=0.01 * (3 - i))) for i in range(3)]
+            responses = agent_run(agent, main())
+
+        assert [r.request_id for r in responses] == ["0", "1", "2"]
+        assert client.stats()["answered"] == 3 and client.late == 0 and client.in_flight == 0
+
+    def test_sequential_dispatch_starves_replies(self):
+        # Why the coordinator uses CONSULTING_AGENT_OPTIONS
+        client = ConsultationClient(timeout=0.2)
+
+        async def main():
+            with pytest.raises(asyncio.TimeoutError):
+                await client.call(send, "advisor", consultation_request("0"))
+
+        with consulting_agent(client, handle_messages_concurrently=False) as (agent, reply):
+            send = reply()
+            agent_run(agent, main())
+
+        assert client.timed_out == 1 and client.late == 1
+
+    def test_timeouts_and_late_responses(self):
+        client = ConsultationClient(timeout=0.01)
+
+        async def send(address, message):
+            pass
+
+        async def main():
+            with pytest.raises(asyncio.TimeoutError):
+                await client.call(send, "advisor", Message("slow"))
+
+        asyncio.run(main())
+
+        assert client.resolve("slow", "too late") is False
+        assert client.timed_out == 1 and client.late == 1 and client.in_flight == 0
+
+    def test_in_flight_consultations_are_capped(self):
+        client = ConsultationClient(timeout=1, max_in_flight=1)
+        sent = []
+
+        async def send(address, message):
+            sent.append(message.request_id)
+
+        async def main():
+            first = asyncio.ensure_future(client.call(send, "advisor", Message("a")))
+            await asyncio.sleep(0)
+            with pytest.raises(ConsultationUnavailable):
+                await client.call(send, "advisor", Message("b"))
+            client.resolve("a", "ok")
+            return await first
+
+        assert asyncio.run(main()) == "ok"
+        assert sent == ["a"] and client.rejected == 1
+
+
+class TestConsultationHandler:
+    """Medical Advisor answering consultations through its agent's message queue"""
+
+    @pytest.fixture
+    def computations(self, monkeypatch):
+        """Symptom lists the default graph scores, in order, each taking a while"""
+        from src.metta import metta_interface
+        kg = metta_interface.MeTTaKnowledgeGraph(knowledge_path=None, cache_size=0)
+        monkeypatch.setattr(metta_interface, "_metta_kg_instance", kg)
+        monkeypatch.setattr(metta_interface, "_query_executor",
+                            metta_interface.QueryExecutor("thread", max_workers=4))
+        query_symptoms = kg.query_symptoms
+        scored = []
+
+        def slow_query_symptoms(symptoms, k=None):
+            scored.append(list(symptoms))
+            threading.Event().wait(0.05)
+            return query_symptoms(symptoms, k)
+
+        monkeypatch.setattr(kg, "query_symptoms", slow_query_symptoms)
+        return scored
+
+    def test_identical_concurrent_consultations_share_one_computation(self, computations):
+        client = ConsultationClient(timeout=5)
+        requests = [consultation_request("0", ["fever", "cough"]), consultation_request("1", ["cough", "fever"])]
+
+        async def main():
+            return await asyncio.gather(*(client.call(send, "advisor", request) for request in requests))
+
+        with consulting_agent(client) as (coordinator, _), advisor_agent(coordinator) as send:
+            responses = agent_run(coordinator, main())
+
+        assert [r.request_id for r in responses] == ["0", "1"]
+        assert responses[0].conditions == responses[1].conditions
+        assert len(computations) == 1
+
+    def test_queued_consultations_run_most_urgent_first(self, computations, monkeypatch):
+        from src.metta import metta_interface
+        dispatcher = metta_interface.TriageDispatcher(max_concurrency=1, aging_seconds=60)
+        monkeypatch.setattr(metta_interface, "_triage_dispatcher", dispatcher)
+        client = ConsultationClient(timeout=5)
+        symptoms = [["sore throat"], ["headache"], ["chest pain"], ["fever"]]  # low, moderate, emergency, high
+
+        async def main():
+            await dispatcher.acquire("low")
+            calls = [asyncio.ensure_future(client.call(send, "advisor", consultation_request(str(i), s)))
+                     for i, s in enumerate(symptoms)]
+            while dispatcher.queued < len(symptoms):
+                await asyncio.sleep(0.005)
+            dispatcher.release()
+            return await asyncio.gather(*calls)
+
+        with consulting_agent(client) as (coordinator, _), advisor_agent(coordinator) as send:
+            responses = agent_run(coordinator, main())
+
+        assert all(r.status == "success" for r in responses)
+        assert computations == [["chest_pain"], ["fever"], ["headache"], ["sore_throat"]]
+
+    def test_sequential_dispatch_queues_one_request_at_a_time(self, computations, monkeypatch):
+        # Why the advisor uses CONSULTING_AGENT_OPTIONS
+        from src.metta import metta_interface
+        dispatcher = metta_interface.TriageDispatcher(max_concurrency=1)
+        monkeypatch.setattr(metta_interface, "_triage_dispatcher", dispatcher)
+        client = ConsultationClient(timeout=5)
+        requests = [consultation_request(str(i), ["fever"]) for i in range(2)]
+        peak = [0]
+
+        async def main():
+            calls = [asyncio.ensure_future(client.call(send, "advisor", request)) for request in requests]
+            while not all(call.done() for call in calls):
+                peak[0] = max(peak[0], dispatcher.stats()["running"] + dispatcher.queued)
+                await asyncio.sleep(0.005)
+            return [call.result() for call in calls]
+
+        with consulting_agent(client) as (coordinator, _), \
+                advisor_agent(coordinator, handle_messages_concurrently=False) as send:
+            agent_run(coordinator, main())
+
+        assert len(computations) == 2 and peak[0] == 1
+
+
+class Response:
+    def __init__(self, status="success"):
+        self.status = status
+
+
+class TestAdvisorPool:
+    """Load balancing and health tracking across Medical Advisor agents"""
+
+    def test_least_outstanding_spreads_concurrent_consultations(self):
+        pool = AdvisorPool(["a", "b", "c"])
+        client = ConsultationClient(timeout=1)
+        sent = []
+
+        async def send(address, message):
+            sent.append(address)
+
+        async def main():
+            calls = [asyncio.ensure_future(pool.call(client, send, Message(str(i)))) for i in range(6)]
+            await asyncio.sleep(0)
+            for i in range(6):
+                client.resolve(str(i), Response())
+            return await asyncio.gather(*calls)
+
+        asyncio.run(main())
+
+        assert sorted(sent) == ["a", "a", "b", "b", "c", "c"]
+
+    def test_failing_advisor_is_ejected_and_returns(self):
+        now = [0.0]
+        pool = AdvisorPool(["a", "b"], max_failures=2, eject_seconds=30, clock=lambda: now[0])
+        client = ConsultationClient(timeout=1)
+
+        async def send(address, message):
+            status = "busy" if address == "a" else "success"
+            asyncio.get_running_loop().call_soon(client.resolve, message.request_id, Response(status))
+
+        async def main():
+            return [(await pool.call(client, send, Message(str(i)))).status for i in range(4)]
+
+        assert asyncio.run(main()) == ["busy", "busy", "success", "success"]
+        assert [a.address for a in pool.healthy()] == ["b"]
+        now[0] += 31
+        assert len(pool.healthy()) == 2 and pool.stats()["advisors"]["a"]["ejections"] == 1
+
+    def test_advisors_answering_through_the_agent_stay_healthy(self):
+        # Replies reach the pool through the coordinator's message queue while
+        # its handlers await them; one missed reply would eject an advisor here
+        pool = AdvisorPool(["a", "b"], max_failures=1)
+        client = ConsultationClient(timeout=1)
+
+        async def main():
+            return await asyncio.gather(*(pool.call(client, send, consultation_request(str(i))) for i in range(6)))
+
+        with consulting_agent(client) as (agent, reply):
+            send = reply(delay=0.01)
+            responses = agent_run(agent, main())
+
+        advisors = pool.stats()["advisors"]
+        assert [r.request_id for r in responses] == [str(i) for i in range(6)]
+        assert len(pool.healthy()) == 2
+        for stats in advisors.values():
+            assert stats["answered"] == 3 and stats["failed"] == 0 and stats["ejections"] == 0
+            assert stats["latency_ms"] is not None and stats["outstanding"] == 0
+
+    def test_p2c_prefers_less_loaded_of_two(self):
+        import random
+        pool = AdvisorPool(["a", "b", "c"], strategy="p2c", rng=random.Random(1))
+        for address, outstanding in (("a", 5), ("b", 0), ("c", 5)):
+            pool._advisors[address].outstanding = outstanding
+
+        picks = {pool.pick() for _ in range(50)}
+
+        assert "b" in picks and picks <= {"a", "b", "c"}
+
+    def test_addresses_are_read_from_agent_addresses_file(self):
+        path = os.path.join(os.path.dirname(__file__), "..", "AGENT_ADDRESSES.txt")
+
+        addresses = load_advisor_addresses(path)
+
+        assert addresses == ["agent1qv5kl3fpn8mn8gpju4m5n9uk6nshwd9uf4tpx7ncuuleg4x6syxw6g8t9xr"]
+
+
+class TestStaticAssets:
+    """Precompressed, cacheable web UI assets"""
+
+    @staticmethod
+    def assets(tmp_path):
+        (tmp_path / "app.css").write_text("body { color: red; }\n" * 50)
+        (tmp_path / "index.html").write_text('<link rel="stylesheet" href="/static/app.css">' + "<p>hi</p>" * 50)
+        return StaticAssets(tmp_path)
+
+    def test_bundles_get_hashed_immutable_urls(self, tmp_path):
+        assets = self.assets(tmp_path)
+        hashed = assets.urls["/static/app.css"]
+        name = hashed.rsplit("/", 1)[1]
+
+        status, body, headers = assets.response(assets.entry)
+        assert status == 200 and hashed.encode() in body
+        assert assets.response(name)[2]["Cache-Control"] == IMMUTABLE
+        assert assets.response("app.css") is None
+
+    def test_compressed_variant_is_negotiated(self, tmp_path):
+        assets = self.assets(tmp_path)
+        import gzip
+
+        status, body, headers = assets.response(assets.entry, "gzip, deflate")
+
+        assert headers["Content-Encoding"] == "gzip" and headers["Vary"] == "Accept-Encoding"
+        assert gzip.decompress(body) == assets.response(assets.entry)[1]
+        assert "Content-Encoding" not in assets.response(assets.entry, "gzip;q=0")[2]
+
+    def test_matching_etag_gets_304(self, tmp_path):
+        assets = self.assets(tmp_path)
+        etag = assets.response(assets.entry)[2]["ETag"]
+
+        assert assets.response(assets.entry, "", etag)[:2] == (304, b"")
+        assert assets.response(assets.entry, "", f'"other", W/{etag}')[0] == 304
+        # Each encoding has its own strong ETag
+        assert assets.response(assets.entry, "gzip", etag)[0] == 200
+
+
+async def byte_chunks(data, size):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def parse(parser, data, size=3, **kwargs):
+    async def collect():
+        return [item async for item in parser(byte_chunks(data, size), **kwargs)]
+    return asyncio.run(collect())
+
+
+class TestBatchInput:
+    def test_json_array_split_across_chunks(self):
+        data = '["fever", {"symptoms": "cough ✓", "id": 7}, 123, [], "a\\"b"]'.encode("utf-8")
+
+        for size in (1, 2, 5, len(data)):
+            assert parse(iter_json_array, data, size) == ["fever", {"symptoms": "cough ✓", "id": 7}, 123, [], 'a"b']
+        assert parse(iter_json_array, b" [ \n ] ") == []
+
+    def test_malformed_json_array_raises(self):
+        with pytest.raises(BatchInputError):
+            parse(iter_json_array, b'{"symptoms": "fever"}')
+        with pytest.raises(BatchInputError):
+            parse(iter_json_array, b'["fever" "cough"]')
+        with pytest.raises(BatchInputError):
+            parse(iter_json_array, b'["fever", ')
+
+    def test_ndjson_bad_line_is_isolated(self):
+        items = parse(iter_ndjson, b'"fever"\nnot json\n\n{"symptoms": "cough", "id": "b"}')
+
+        assert items[0] == "fever" and isinstance(items[1], BadItem)
+        assert item_fields(items[2]) == ("cough", "b")
+        assert item_fields(42) == (None, None)
+
+    def test_oversized_item_raises(self):
+        note = b'"' + b"x" * 100 + b'"'
+        with pytest.raises(BatchInputError):
+            parse(iter_json_array, b"[" + note + b"]", max_item_bytes=50)
+        with pytest.raises(BatchInputError):
+            parse(iter_ndjson, note + b"\n", max_item_bytes=50)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimiter:
+    def limiter(self, backend=None):
+        clock = FakeClock()
+        return RateLimiter(3, 60, backend, clock=clock), clock
+
+    def test_burst_then_steady_rate(self):
+        limiter, clock = self.limiter()
+
+        assert [limiter.check("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert limiter.check("a") == pytest.approx(20.0)
+        assert limiter.check("b") == 0.0
+        clock.now += 20
+        assert limiter.check("a") == 0.0
+        assert limiter.check("a") == pytest.approx(20.0)
+        assert limiter.stats()["rejected"] == 2
+
+    def test_memory_backend_forgets_least_recent_client(self):
+        limiter, clock = self.limiter(MemoryRateLimitBackend(max_keys=2))
+        for _ in range(3):
+            limiter.check("a")
+        limiter.check("b")
+        limiter.check("c")
+
+        assert len(limiter.backend) == 2
+        assert limiter.check("a") == 0.0
+
+    def test_sqlite_backend_is_shared(self, tmp_path):
+        path = tmp_path / "limits.db"
+        first, clock = self.limiter(SQLiteRateLimitBackend(path))
+        second = RateLimiter(3, 60, SQLiteRateLimitBackend(path), clock=clock)
+
+        assert [first.check("a"), second.check("a"), first.check("a")] == [0.0, 0.0, 0.0]
+        assert second.check("a") == pytest.approx(20.0)
+        clock.now += 60
+        assert second.check("a") == 0.0
+        first.backend.close()
+        second.backend.close()
+
+    def test_client_key_hashes_known_api_keys(self):
+        assert client_key(None, "10.0.0.1") == "ip:10.0.0.1"
+        assert "secret" not in client_key("secret", "10.0.0.1", ["secret"])
+        assert client_key("secret", "10.0.0.1", ["secret"]) == client_key("secret", "10.0.0.2", ["secret"])
+
+    def test_unknown_api_keys_are_limited_by_ip(self):
+        assert client_key("made-up", "10.0.0.1", ["secret"]) == "ip:10.0.0.1"
+        assert client_key("made-up", "10.0.0.1") == client_key("other", "10.0.0.1")
+
+    def test_blocking_backend_is_checked_in_a_thread(self, tmp_path):
+        limiter, clock = self.limiter(SQLiteRateLimitBackend(tmp_path / "limits.db"))
+        threads = []
+        acquire = limiter.backend.acquire
+
+        def recording_acquire(*args):
+            threads.append(threading.get_ident())
+            return acquire(*args)
+
+        limiter.backend.acquire = recording_acquire
+
+        assert asyncio.run(limiter.check_async("a")) == 0.0
+        assert threads and threads[0] != threading.get_ident()
+        limiter.backend.close()
+
+    def test_middleware_rejects_before_calling_the_app(self):
+        limiter, clock = self.limiter()
+        called = []
+
+        async def app(scope, receive, send):
+            called.append(scope["path"])
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        middleware = RateLimitMiddleware(app, limiter, api_keys=["secret"])
+
+        def request(path, api_key=None):
+            sent = []
+            headers = [(b"x-api-key", api_key.encode())] if api_key else []
+            scope = {"type": "http", "path": path, "headers": headers, "client": ("10.0.0.1", 1234)}
+
+            async def send(message):
+                sent.append(message)
+
+            asyncio.run(middleware(scope, None, send))
+            return sent[0]["status"], dict(sent[0]["headers"])
+
+        assert [request("/analyze", api_key=str(i))[0] for i in range(4)] == [200, 200, 200, 429]
+        status, headers = request("/analyze/stream")
+        assert status == 429 and headers[b"retry-after"] == b"20"
+        assert request("/analyze", api_key="secret")[0] == 200
+        assert request("/health")[0] == 200
+        assert called == ["/analyze"] * 4 + ["/health"]
@@ -0,0 +1,711 @@
+"""
+Unit tests for the MeTTa reasoning engine internals
+"""
+
+import asyncio
+import pytest
+import sys
+import os
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.metta.metta_interface import MeTTaKnowledgeGraph, MedicalFact, query_metta, query_metta_batch
+from src.metta import metta_interface, vector_scoring
+from src.metta.metrics import QUERIES, REGISTRY, STAGE_SECONDS, Metric, MetricsRegistry, start_metrics_server
+from src.metta.query_executor import QueryExecutor
+from src.metta.result_cache import ResultCache
+from src.metta.rules import RuleSet
+from src.metta.metta_parser import MettaParseError, iter_expressions
+from src.metta.symptom_extractor import SymptomExtractor
+from src.metta.traversal import CONDITION, SYMPTOM
+from src.metta.triage_dispatcher import LoadShedError, TriageDispatcher
+
+
+def scan_symptoms(kg, symptoms):
+    """Reference single-hop scan over every fact (the pre-index behaviour)"""
+    normalized = [s.lower().replace(" ", "_") for s in symptoms]
+    results = []
+    for fact in kg.knowledge_base:
+        matching = set(normalized) & set(fact.symptoms)
+        if matching:
+            ratio = len(matching) / len(fact.symptoms)
+            confidence = fact.confidence * ratio
+            if ratio > 0.6:
+                confidence = min(0.95, confidence * 1.2)
+            results.append((fact.condition, round(confidence, 2), sorted(matching)))
+    return results
+
+
+class TestSymptomIndex:
+    """Posting-list index behind query_symptoms"""
+
+    def test_index_matches_full_scan(self):
+        kg = MeTTaKnowledgeGraph(knowledge_path=None)
+        queries = [
+            ["fever", "cough", "fatigue"],
+            ["chest pain", "shortness of breath", "sweating"],
+            ["nausea"],
+            ["itching", "swelling", "rash", "hives"],
+            ["not_a_symptom"],
+        ]
+        for symptoms in queries:
+            matches = kg.symptom_index.match([s.lower().replace(" ", "_") for s in symptoms])
+            indexed = []
+            for fact_id in sorted(matches):
+                fact = kg.knowledge_base[fact_id]
+                ratio = len(matches[fact_id]) / kg.symptom_index.symptom_counts[fact_id]
+                confidence = fact.confidence * ratio
+                if ratio > 0.6:
+                    confidence = min(0.95, confidence * 1.2)
+                indexed.append((fact.condition, round(confidence, 2), sorted(matches[fact_id])))
+            assert indexed == scan_symptoms(kg, symptoms)
+
+    def test_queries_match_full_scan_for_any_spelling(self):
+        # Only the engine spelling (lowercase, spaces as underscores) matches a
+        # symptom, as it did before the index; "chestpain" is not "chest_pain"
+        kg = MeTTaKnowledgeGraph(snapshot_path=None)
+        vocabulary = sorted({s for fact in kg.knowledge_base for s in fact.symptoms})
+        queries = [[s] for s in vocabulary] + [vocabulary[i::5][:3] for i in range(5)]
+        queries += [[s.replace("_", " ").title()] for s in vocabulary[:5]]
+        queries += [["chestpain"], ["chest-pain", "shortness of breath"], ["Shortness_Of_Breath"]]
+
+        for symptoms in queries:
+            expected = sorted(scan_symptoms(kg, symptoms), key=lambda r: r[1], reverse=True)
+            results = kg.query_symptoms(symptoms, k=None)
+            assert [(r["condition"], r["confidence"], sorted(r["matching_symptoms"])) for r in results] == expected
+        assert kg.query_symptoms(["chestpain"]) == []
+
+    def test_added_fact_is_queryable(self):
+        kg = MeTTaKnowledgeGraph(knowledge_path=None)
+        kg.add_fact(MedicalFact("test_condition", ["rare_symptom"], "low", "tester", 0.5))
+
+        results = kg.query_symptoms(["rare symptom"])
+
+        assert [r["condition"] for r in results] == ["test_condition"]
+        assert results[0]["matching_symptoms"] == ["rare_symptom"]
+
+
+class TestTopK:
+    """Bounded top-k selection in query_symptoms"""
+
+    def test_top_k_is_prefix_of_full_ranking(self):
+        kg = MeTTaKnowledgeGraph()
+        symptoms = ["fatigue", "nausea", "headache", "fever"]
+
+        ranked = kg.query_symptoms(symptoms, k=None)
+
+        assert len(ranked) == len(scan_symptoms(kg, symptoms))
+        assert [r["confidence"] for r in ranked] == sorted((r["confidence"] for r in ranked), reverse=True)
+        for k in (0, 1, 3, 5, 12):
+            assert kg.query_symptoms(symptoms, k=k) == ranked[:k]
+
+    def test_ties_go_to_earlier_fact(self):
+        kg = MeTTaKnowledgeGraph(knowledge_path=None)
+        kg.add_fact(MedicalFact("first", ["rare_symptom"], "low", "tester", 0.5))
+        kg.add_fact(MedicalFact("second", ["rare_symptom"], "low", "tester", 0.5))
+
+        assert [r["condition"] for r in kg.query_symptoms(["rare_symptom"], k=1)] == ["first"]
+
+
+class TestResultCache:
+    """LRU/TTL query result cache"""
+
+    def test_lru_eviction_and_counters(self):
+        cache = ResultCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 3, "misses": 1,
+                                 "evictions": 1, "expirations": 0}
+
+    def test_entries_expire_after_ttl(self):
+        now = [0.0]
+        cache = ResultCache(maxsize=4, ttl=10, clock=lambda: now[0])
+        cache.put("a", 1)
+
+        now[0] = 9.9
+        assert cache.get("a") == 1
+        now[0] = 10.0
+        assert cache.get("a") is None
+        assert cache.expirations == 1
+
+    def test_stale_generation_is_not_stored(self):
+        cache = ResultCache(maxsize=4)
+        generation = cache.generation
+        cache.clear()
+        cache.put("a", 1, generation)
+
+        assert cache.get("a") is None
+
+    def test_symptom_order_shares_entry_and_results_are_copies(self):
+        kg = MeTTaKnowledgeGraph(knowledge_path=None)
+
+        first = kg.query_symptoms(["fever", "cough"])
+        first[0]["matching_symptoms"].clear()
+        second = kg.query_symptoms(["Cough", "fever"])
+
+        assert kg.result_cache.hits == 1
+        assert second[0]["matching_symptoms"] == ["cough", "fever"]
+        assert second == MeTTaKnowledgeGraph(knowledge_path=None, cache_size=0).query_symptoms(["cough", "fever"])
+
+    def test_mutation_invalidates_cache(self):
+        kg = MeTTaKnowledgeGraph(knowledge_path=None)
+        kg.query_symptoms(["rare_symptom"])
+
+        kg.add_fact(MedicalFact("test_condition", ["rare_symptom"], "low", "tester", 0.5))
+
+        assert [r["condition"] for r in kg.query_symptoms(["rare_symptom"])] == ["test_condition"]
+        assert kg.result_cache.hits == 0
+
+
+class TestReasoningRules:
+    """Compiled, indexed reasoning rules"""
+
+    def test_rules_fire_only_when_all_symptoms_reported(self):
+        rules = RuleSet.from_reasoning_rules({
+            "urgency_escalation": {"a + b": "high", "b + c": "emergency", "a": "moderate"},
+            "symptom_clusters": {"group": ["c", "d"]},
+        })
+
+        assert [r.conclusion for r in rules.fired(["b", "a"])] == ["high", "moderate"]
+        assert [r.conclusion for r in rules.fired(["c", "b", "a"])] == ["high", "emergency", "moderate"]
+        assert rules.fired(["c", "d"]) == [] and len(rules) == 3
+
+    def test_escalation_rule_raises_urgency_of_matching_results(self):
+        kg = MeTTaKnowledgeGraph(knowledge_path=None)
+
+        results = kg.query_symptoms(["chest pain", "shortness of breath"], k=None)
+
+        assert all(r["urgency"] == "emergency" for r in results)
+        assert all(r["reasoning"].endswith("| Urgency escalated by rule") for r in results)
+
+    def test_symptom_escalate_atoms_are_loaded(self, tmp_path):
+        knowledge_path = tmp_path / "facts.metta"
+        knowledge_path.write_text("(escalate moderate high 48hours)\n(escalate highfever cough critical)\n")
+
+        kg = MeTTaKnowledgeGraph(knowledge_path=str(knowledge_path), snapshot_path=None)
+
+        assert kg.reasoning_rules["urgency_progression"]["moderate"]["escalates_to"] == "high"
+        assert kg.reasoning_rules["urgency_escalation"]["high_fever + cough"] == "emergency"
+        assert kg.query_symptoms(["high_fever", "cough"])[0]["urgency"] == "emergency"
+
+
+class TestTraversal:
+    """Multi-hop knowledge graph traversal"""
+
+    def test_first_hop_reaches_conditions_with_the_symptom(self):
+        kg = MeTTaKnowledgeGraph(snapshot_path=None)
+
+        result = kg.traverse_knowledge_graph("fever", depth=1, max_results=1000)
+
+        assert result["hops_executed"] == 1
+        assert {r["condition"] for r in result["final_results"]} == {
+            f.condition for f in kg.knowledge_base if "fever" in f.symptoms}
+
+    def test_urgency_filter_prunes_conditions(self):
+        kg = MeTTaKnowledgeGraph(snapshot_path=None)
+
+        result = kg.traverse_knowledge_graph("urgent conditions with chest pain", depth=2)
+
+        assert result["final_results"]
+        assert all(r["urgency"] in ("high", "emergency") for r in result["final_results"])
+
+    def test_search_stops_at_result_limit(self):
+        kg = MeTTaKnowledgeGraph(snapshot_path=None)
+
+        result = kg.traverse_knowledge_graph("fever and cough", depth=4, max_results=3)
+
+        assert len(result["final_results"]) <= 3
+        assert result["stopped_early"] == "limit"
+
+    def test_hop_results_name_each_condition_once(self):
+        kg = MeTTaKnowledgeGraph(snapshot_path=None)
+
+        result = kg.traverse_knowledge_graph("urgent conditions with fever", depth=2)
+
+        assert result["traversal_path"][0]["results"]
+        for hop in result["traversal_path"]:
+            assert len(hop["results"]) == len(set(hop["results"]))
+
+    def test_bfs_never_revisits_a_node(self):
+        graph = MeTTaKnowledgeGraph(knowledge_path=None).traversal_graph
+        seeds = [graph.find(SYMPTOM, "fever"), graph.find(SYMPTOM, "cough")]
+
+        hops, stopped = graph.bfs(seeds, depth=10, expand=lambda node_id: True)
+        reached = [n for hop in hops for n in hop]
+
+        assert stopped is None
+        assert len(reached) == len(set(reached)) and not set(reached) & set(seeds)
+        assert any(graph.types[n] == CONDITION for n in hops[0])
+
+
+class TestAsyncQueries:
+    """Bounded executor behind the async query API"""
+
+    def test_in_flight_queries_are_capped(self):
+        executor = QueryExecutor("thread", max_workers=4, max_in_flight=2)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def work(value):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            threading.Event().wait(0.01)
+            with lock:
+                active[0] -= 1
+            return value * 2
+
+        async def main():
+            return await asyncio.gather(*(executor.run(work, i) for i in range(8)))
+
+        assert asyncio.run(main()) == [i * 2 for i in range(8)]
+        assert peak[0] <= 2
+        assert executor.stats()["completed"] == 8
+        executor.shutdown()
+
+    def test_async_query_matches_sync_query(self):
+        kg = MeTTaKnowledgeGraph(knowledge_path=None)
+
+        results = asyncio.run(kg.query_symptoms_async(["fever", "cough"]))
+
+        assert results == kg.query_symptoms(["fever", "cough"])
+
+    def test_identical_concurrent_queries_share_one_computation(self):
+        kg = MeTTaKnowledgeGraph(knowledge_path=None, cache_size=0)
+        orders = [["fever", "cough"], ["Cough", "fever"]] * 10
+
+        async def main():
+            return await asyncio.gather(*(kg.query_symptoms_async(symptoms) for symptoms in orders))
+
+        results = asyncio.run(main())
+
+        assert kg._single_flight.started == 1
+        assert kg._single_flight.coalesced == len(orders) - 1
+        for symptoms, result in zip(orders, results):
+            assert result == kg.query_symptoms(symptoms)
+        results[0][0]["matching_symptoms"].append("mutated")
+        assert "mutated" not in results[2][0]["matching_symptoms"]
+
+
+class TestTriageDispatcher:
+    """Urgency-ordered admission with aging and load shedding"""
+
+    @staticmethod
+    def run_queued(dispatcher, urgencies, clock=None):
+        """Queue ``urgencies`` behind one running request and return the order they run in"""
+        order = []
+
+        async def request(urgency):
+            async with dispatcher.slot(urgency):
+                order.append(urgency)
+
+        async def main():
+            await dispatcher.acquire("low")
+            tasks = []
+            for urgency in urgencies:
+                tasks.append(asyncio.ensure_future(request(urgency)))
+                await asyncio.sleep(0)
+                if clock:
+                    clock[0] += 1
+            dispatcher.release()
+            return await asyncio.gather(*tasks, return_exceptions=True)
+
+        return order, asyncio.run(main())
+
+    def test_more_urgent_requests_run_first(self):
+        dispatcher = TriageDispatcher(max_concurrency=1, aging_seconds=60)
+
+        order, _ = self.run_queued(dispatcher, ["low", "moderate", "emergency", "high", "low"])
+
+        assert order == ["emergency", "high", "moderate", "low", "low"]
+        assert dispatcher.stats()["tiers"]["low"]["dispatched"] == 3
+
+    def test_long_waiting_requests_age_past_newer_urgent_ones(self):
+        clock = [0.0]
+        dispatcher = TriageDispatcher(max_concurrency=1, aging_seconds=1, clock=lambda: clock[0])
+
+        # "high" is worth two seconds of waiting, so it only overtakes the last "low"
+        order, _ = self.run_queued(dispatcher, ["low", "low", "low", "high"], clock)
+
+        assert order == ["low", "low", "high", "low"]
+
+    def test_full_queue_sheds_lowest_tier(self):
+        dispatcher = TriageDispatcher(max_concurrency=1, max_queue=2, aging_seconds=60)
+
+        order, outcomes = self.run_queued(dispatcher, ["low", "moderate", "emergency", "low"])
+
+        assert order == ["emergency", "moderate"]
+        assert isinstance(outcomes[0], LoadShedError) and isinstance(outcomes[3], LoadShedError)
+        stats = dispatcher.stats()
+        assert stats["tiers"]["low"]["shed"] == 2 and stats["queued"] == 0 and stats["running"] == 0
+
+    def test_release_skips_waiter_cancelled_while_queued(self):
+        dispatcher = TriageDispatcher(max_concurrency=1)
+
+        async def main():
+            await dispatcher.acquire("low")
+            queued = asyncio.ensure_future(dispatcher.acquire("low"))
+            await asyncio.sleep(0)
+            # Released before the cancelled task gets to leave the queue
+            queued.cancel()
+            dispatcher.release()
+            await asyncio.gather(queued, return_exceptions=True)
+
+        asyncio.run(main())
+
+        stats = dispatcher.stats()
+        assert stats["running"] == 0 and stats["queued"] == 0
+
+    def test_shedding_skips_waiter_cancelled_while_queued(self):
+        dispatcher = TriageDispatcher(max_concurrency=1, max_queue=1)
+
+        async def main():
+            await dispatcher.acquire("low")
+            queued = asyncio.ensure_future(dispatcher.acquire("low"))
+            await asyncio.sleep(0)
+            urgent = asyncio.ensure_future(dispatcher.acquire("emergency"))
+            # The full queue is shed before the cancelled task gets to leave it
+            queued.cancel()
+            await asyncio.sleep(0)
+            dispatcher.release()
+            await urgent
+            await asyncio.gather(queued, return_exceptions=True)
+
+        asyncio.run(main())
+
+        stats = dispatcher.stats()
+        assert stats["tiers"]["low"]["shed"] == 0 and stats["tiers"]["emergency"]["dispatched"] == 1
+        assert stats["running"] == 1 and stats["queued"] == 0
+
+    def test_triage_urgency_estimate(self):
+        kg = MeTTaKnowledgeGraph(knowledge_path=None)
+
+        assert kg.triage_urgency(["chest_pain", "shortness_of_breath"]) in ("high", "emergency")
+        assert kg.triage_urgency(["unknown_symptom"]) == "moderate"
+
+
+class TestBatchQueries:
+    """query_symptoms_many and query_metta_batch"""
+
+    def test_batch_matches_single_queries_in_order(self):
+        items = ["fever and cough", ["chest_pain", "sweating"], "nothing specific", "fever and cough"]
+
+        assert query_metta_batch(items) == [
+            query_metta(items[0]),
+            query_metta("chest pain, sweating"),
+            query_metta(items[2]),
+            query_metta(items[3]),
+        ]
+
+    def test_repeated_queries_return_independent_results(self):
+        kg = MeTTaKnowledgeGraph(knowledge_path=None)
+
+        first, second = kg.query_symptoms_many([["fever", "cough"], ["Fever", "cough"]])
+        first[0]["matching_symptoms"].append("mutated")
+
+        assert second == kg.query_symptoms(["fever", "cough"])
+
+
+class TestVectorScoring:
+    """NumPy scoring backend"""
+
+    def test_numpy_backend_matches_python_backend(self):
+        pytest.importorskip("numpy")
+        python_kg = MeTTaKnowledgeGraph(snapshot_path=None)
+        numpy_kg = MeTTaKnowledgeGraph(snapshot_path=None, scoring_backend="numpy")
+        vocabulary = sorted({s for fact in python_kg.knowledge_base for s in fact.symptoms})
+        queries = [vocabulary[i::7][:n] for i in range(7) for n in range(1, 6)]
+        queries.append(["Chest pain", "chest_pain", "not_a_symptom"])
+
+        assert numpy_kg.scoring_backend == "numpy"
+        for symptoms in queries:
+            assert numpy_kg.query_symptoms(symptoms) == python_kg.query_symptoms(symptoms)
+        assert numpy_kg.query_symptoms_many(queries) == python_kg.query_symptoms_many(queries)
+
+    def test_falls_back_to_python_without_numpy(self, monkeypatch):
+        monkeypatch.setattr(vector_scoring, "np", None)
+
+        kg = MeTTaKnowledgeGraph(knowledge_path=None, scoring_backend="numpy")
+
+        assert kg.scoring_backend == "python"
+        assert kg.query_symptoms(["fever", "cough"])
+
+    def test_unknown_backend_is_rejected(self):
+        with pytest.raises(ValueError):
+            MeTTaKnowledgeGraph(knowledge_path=None, scoring_backend="gpu")
+
+
+class TestKnowledgeFileLoading:
+    """Streaming .metta parser and knowledge file loading"""
+
+    def test_expressions_span_lines_and_skip_comments(self):
+        lines = ["; header comment\n", "(pattern fever\n", "  cough) ; trailing\n", "(threshold high 0.80)\n"]
+
+        assert list(iter_expressions(lines)) == [["pattern", "fever", "cough"], ["threshold", "high", "0.80"]]
+
+    def test_unbalanced_expression_raises(self):
+        with pytest.raises(MettaParseError) as excinfo:
+            list(iter_expressions(["(pattern fever cough\n"]))
+
+        assert excinfo.value.line_no == 1
+
+    def test_knowledge_file_extends_builtin_facts(self):
+        builtin = MeTTaKnowledgeGraph(knowledge_path=None)
+        kg = MeTTaKnowledgeGraph()
+
+        assert len(kg.knowledge_base) > len(builtin.knowledge_base)
+        assert kg.reasoning_rules["confidence_thresholds"]["high"] == 0.80
+        assert kg.reasoning_rules["symptom_patterns"]["chest_pain + shortness_of_breath"] == "cardiac"
+
+        # Compact file names map onto the engine's vocabulary and urgency levels
+        heart_attack = [f for f in kg.knowledge_base if f.condition == "heartattack" and f.category == "emergency"]
+        assert heart_attack[0].symptoms == ["chest_pain", "shortness_of_breath", "sweating"]
+        assert heart_attack[0].urgency == "emergency"
+        assert "primarycare" not in {f.specialist for f in kg.knowledge_base}
+
+    def test_knowledge_file_found_from_agent_entry_point(self):
+        # Agents and the web UI put "src/agents/.." on sys.path and import config from there
+        import subprocess
+        agents_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "agents")
+        script = (
+            "import os, sys\n"
+            f"sys.path.insert(0, os.path.join({agents_dir!r}, '..'))\n"
+            "from config import Config\n"
+            "from metta.metta_interface import MeTTaKnowledgeGraph\n"
+            "kg = MeTTaKnowledgeGraph(snapshot_path=None)\n"
+            "print(Config.BASE_DIR, len(kg.knowledge_base), len(MeTTaKnowledgeGraph(knowledge_path=None).knowledge_base))\n"
+        )
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                cwd=agents_dir, check=True).stdout.split()
+
+        base_dir, loaded, builtin = output[-3], int(output[-2]), int(output[-1])
+        assert os.path.samefile(base_dir, os.path.join(agents_dir, "..", ".."))
+        assert loaded > builtin
+
+    def test_max_facts_is_respected(self):
+        kg = MeTTaKnowledgeGraph(max_facts=30)
+
+        assert len(kg.knowledge_base) == 30
+        # Rule atoms after the fact sections are still loaded
+        assert kg.reasoning_rules["differentials"]
+
+
+class TestKnowledgeSnapshot:
+    """Compiled, memory-mapped knowledge graph snapshots"""
+
+    QUERIES = [
+        ["fever", "cough", "fatigue"],
+        ["chest pain", "shortness of breath", "sweating"],
+        ["headache", "nausea"],
+        ["rash", "itching"],
+    ]
+
+    def test_snapshot_matches_parsed_graph(self, tmp_path):
+        snapshot_path = str(tmp_path / "kg.snapshot")
+        parsed = MeTTaKnowledgeGraph(snapshot_path=snapshot_path)
+        mapped = MeTTaKnowledgeGraph(snapshot_path=snapshot_path)
+
+        assert parsed.snapshot is None
+        assert mapped.snapshot is not None
+        assert list(mapped.knowledge_base) == list(parsed.knowledge_base)
+        assert mapped.reasoning_rules == parsed.reasoning_rules
+        for symptoms in self.QUERIES:
+            assert mapped.query_symptoms(symptoms) == parsed.query_symptoms(symptoms)
+
+    def test_mapped_facts_are_decoded_once(self, tmp_path):
+        snapshot_path = str(tmp_path / "kg.snapshot")
+        MeTTaKnowledgeGraph(snapshot_path=snapshot_path)
+        facts = MeTTaKnowledgeGraph(snapshot_path=snapshot_path).knowledge_base
+
+        assert facts[0] is facts[0] and facts[-1] is facts[len(facts) - 1]
+        assert facts[1:3] == [facts[1], facts[2]]
+        with pytest.raises(IndexError):
+            facts[len(facts)]
+
+    def test_snapshot_invalidated_when_source_changes(self, tmp_path):
+        knowledge_path = tmp_path / "facts.metta"
+        snapshot_path = str(tmp_path / "kg.snapshot")
+        knowledge_path.write_text("(test rare_symptom rare_condition 0.5 routine primarycare)\n")
+        MeTTaKnowledgeGraph(knowledge_path=str(knowledge_path), snapshot_path=snapshot_path)
+
+        knowledge_path.write_text("(test other_symptom other_condition 0.5 routine primarycare)\n")
+        kg = MeTTaKnowledgeGraph(knowledge_path=str(knowledge_path), snapshot_path=snapshot_path)
+
+        assert kg.snapshot is None
+        assert [f.condition for f in kg.knowledge_base][-1] == "other_condition"
+        assert MeTTaKnowledgeGraph(knowledge_path=str(knowledge_path),
+                                   snapshot_path=snapshot_path).snapshot is not None
+
+    def test_mutating_mapped_graph_detaches_snapshot(self, tmp_path):
+        snapshot_path = str(tmp_path / "kg.snapshot")
+        MeTTaKnowledgeGraph(snapshot_path=snapshot_path)
+        kg = MeTTaKnowledgeGraph(snapshot_path=snapshot_path)
+
+        kg.add_fact(MedicalFact("test_condition", ["rare_symptom"], "low", "tester", 0.5))
+
+        assert kg.snapshot is None
+        assert kg.query_symptoms(["rare_symptom"])[0]["condition"] == "test_condition"
+
+    def test_shared_graph_is_read_only_view(self, tmp_path):
+        snapshot_path = str(tmp_path / "kg.snapshot")
+        first = MeTTaKnowledgeGraph(snapshot_path=snapshot_path, shared=True)
+        second = MeTTaKnowledgeGraph(snapshot_path=snapshot_path, shared=True)
+
+        assert first.shared and second.shared
+        assert second.query_symptoms(["fever", "cough"]) == first.query_symptoms(["fever", "cough"])
+        with pytest.raises(RuntimeError):
+            second.add_fact(MedicalFact("test_condition", ["rare_symptom"], "low", "tester", 0.5))
+
+
+class TestSymptomExtractor:
+    """Aho-Corasick symptom phrase matching"""
+
+    def test_longest_match_wins_on_word_boundaries(self):
+        extractor = SymptomExtractor([("pain", "pain"), ("chest pain", "chest_pain"),
+                                      ("shortness of breath", "shortness_of_breath")])
+
+        assert extractor.extract("Chest pain and shortness of breath") == ["chest_pain", "shortness_of_breath"]
+        assert extractor.extract("painful chest") == []
+        assert extractor.extract("back pain, chest-pain, more pain") == ["pain", "chest_pain"]
+
+    def test_overlapping_phrases_use_failure_links(self):
+        extractor = SymptomExtractor([("severe headache", "severe_headache"),
+                                      ("headache", "headache"), ("very severe", "very_severe")])
+
+        assert extractor.extract("a very severe headache") == ["very_severe", "headache"]
+
+    def test_graph_extractor_covers_knowledge_base_and_synonyms(self):
+        kg = MeTTaKnowledgeGraph(knowledge_path=None)
+
+        assert kg.extract_symptoms("I keep throwing up and feel dizzy") == ["vomiting", "dizziness"]
+        assert kg.extract_symptoms("loss of taste since Monday") == ["loss_of_taste"]
+
+
+class TestMetrics:
+    def test_histogram_buckets_and_exposition(self):
+        registry = MetricsRegistry()
+        latency = registry.histogram("stage_seconds", "Stage latency", ("stage",), buckets=(0.01, 0.1))
+        for seconds in (0.005, 0.01, 0.05, 2.0):
+            latency.labels("parse").observe(seconds)
+        registry.counter("events_total", "Events").inc(3)
+
+        text = registry.render()
+
+        assert "# TYPE stage_seconds histogram" in text
+        assert 'stage_seconds_bucket{stage="parse",le="0.01"} 2' in text
+        assert 'stage_seconds_bucket{stage="parse",le="0.1"} 3' in text
+        assert 'stage_seconds_bucket{stage="parse",le="+Inf"} 4' in text
+        assert 'stage_seconds_count{stage="parse"} 4' in text
+        assert "events_total 3" in text
+
+    def test_registering_twice_returns_same_metric(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("hits_total", "Hits", ("kind",))
+
+        assert registry.counter("hits_total", "Hits", ("kind",)) is counter
+        with pytest.raises(ValueError):
+            registry.histogram("hits_total", "Hits", ("kind",))
+
+    def test_timer_decorator_and_collectors(self):
+        registry = MetricsRegistry()
+        child = registry.histogram("work_seconds", "Work").labels()
+        registry.add_collector(lambda: [("cache_total", "counter", "Cache", [({"result": "hit"}, 5)])])
+
+        @child.time()
+        def work():
+            return 42
+
+        assert work() == 42 and child.count == 1
+        assert 'cache_total{result="hit"} 5' in registry.render()
+
+    def test_pipeline_records_stages_and_outcomes(self):
+        extraction = STAGE_SECONDS.labels("extraction")
+        query = STAGE_SECONDS.labels("query_symptoms")
+        before = (extraction.count, query.count, QUERIES.labels("clarification_needed").value)
+
+        query_metta("I have a fever and a cough")
+        query_metta("nothing recognisable here")
+
+        assert extraction.count >= before[0] + 2
+        assert query.count == before[1] + 1
+        assert QUERIES.labels("clarification_needed").value == before[2] + 1
+        assert "synaptiverse_query_cache_total" in REGISTRY.render()
+
+    def test_metric_base_class_is_abstract(self):
+        with pytest.raises(TypeError):
+            Metric("base", "Not a metric type")
+
+    def test_changes_are_merged_into_another_registry(self):
+        def registry():
+            metrics = MetricsRegistry()
+            return (metrics, metrics.histogram("work_seconds", "Work", ("stage",), buckets=(0.1,)),
+                    metrics.counter("events_total", "Events", ("kind",)))
+
+        worker, worker_latency, worker_events = registry()
+        parent, parent_latency, parent_events = registry()
+        worker_latency.labels("parse").observe(0.05)
+        before = worker.state()
+        worker_latency.labels("parse").observe(0.5)
+        worker_latency.labels("score").observe(0.05)
+        worker_events.labels("hit").inc(2)
+
+        parent.merge(worker.changes_since(before))
+
+        assert parent_latency.labels("parse").counts == [0, 1] and parent_latency.labels("score").counts == [1, 0]
+        assert parent_events.labels("hit").value == 2
+        assert worker.changes_since(worker.state()) == []
+
+    def test_worker_process_stages_reach_the_parent(self, monkeypatch):
+        extraction = STAGE_SECONDS.labels("extraction")
+        query = STAGE_SECONDS.labels("query_symptoms")
+        success = QUERIES.labels("success")
+        executor = metta_interface.QueryExecutor("process", max_workers=1,
+                                                 initializer=metta_interface.get_metta_knowledge_graph)
+        monkeypatch.setattr(metta_interface, "_query_executor", executor)
+        before = (extraction.count, query.count, success.value)
+
+        try:
+            asyncio.run(metta_interface.query_metta_async("I have a fever and a headache"))
+        finally:
+            executor.shutdown()
+        query_metta_batch(["fever", "cough", "nothing recognisable here"], processes=2, chunk_size=1)
+
+        # Scoring of the async query and extraction of the batch ran in pool processes
+        assert query.count == before[1] + 1
+        assert extraction.count == before[0] + 4
+        assert success.value == before[2] + 3
+
+    def test_worker_process_batch_chunks_reach_the_parent(self, monkeypatch):
+        # As /analyze/batch scores each chunk
+        extraction = STAGE_SECONDS.labels("extraction")
+        success = QUERIES.labels("success")
+        executor = metta_interface.QueryExecutor("process", max_workers=1,
+                                                 initializer=metta_interface.get_metta_knowledge_graph)
+        monkeypatch.setattr(metta_interface, "_query_executor", executor)
+        before = (extraction.count, success.value)
+
+        try:
+            results = asyncio.run(metta_interface.query_metta_batch_async(["fever", "cough"]))
+        finally:
+            executor.shutdown()
+
+        assert [r["status"] for r in results] == ["success", "success"]
+        assert extraction.count == before[0] + 2
+        assert success.value == before[1] + 2
+
+    def test_metrics_server(self):
+        from urllib.request import urlopen
+        server = start_metrics_server(0, host="127.0.0.1")
+        try:
+            with urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+                assert b"synaptiverse_stage_seconds" in response.read()
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,148 @@
+"""
+Endpoint tests for the web UI
+"""
+
+import asyncio
+import json
+import pytest
+import sys
+import os
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+uvicorn = pytest.importorskip("uvicorn")
+
+from fastapi.testclient import TestClient
+
+from src.agents import web_ui
+
+
+@pytest.fixture
+def client():
+    with TestClient(web_ui.app) as test_client:
+        yield test_client
+
+
+def ndjson_lines(body):
+    return [json.loads(line) for line in body.splitlines() if line]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """The web UI on a real uvicorn server in a background thread; yields its port"""
+    monkeypatch.setattr(web_ui.Config, "BATCH_CHUNK_SIZE", 1)
+    config = uvicorn.Config(web_ui.app, host="127.0.0.1", port=0, log_level="warning", lifespan="off")
+    uvicorn_server = uvicorn.Server(config)
+    thread = threading.Thread(target=uvicorn_server.run, daemon=True)
+    thread.start()
+    while not uvicorn_server.started:
+        threading.Event().wait(0.01)
+    yield uvicorn_server.servers[0].sockets[0].getsockname()[1]
+    uvicorn_server.should_exit = True
+    thread.join(5)
+
+
+@pytest.fixture(params=["thread", "process"])
+def query_executor(request, monkeypatch):
+    """The web UI's MeTTa query executor in each METTA_EXECUTOR mode"""
+    # The web UI imports the engine as "metta", a separate module from "src.metta"
+    metta_interface = sys.modules[web_ui.get_query_executor.__module__]
+    executor = metta_interface.QueryExecutor(request.param, max_workers=1,
+                                             initializer=metta_interface.get_metta_knowledge_graph)
+    monkeypatch.setattr(metta_interface, "_query_executor", executor)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.mark.usefixtures("query_executor")
+class TestBatchEndpoint:
+    def test_json_array(self, client):
+        response = client.post("/analyze/batch", content=json.dumps(
+            ["fever and cough", {"symptoms": "chest pain", "id": "b"}, 42, "   "]))
+
+        lines = ndjson_lines(response.text)
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert [line["index"] for line in lines] == [0, 1, 2, 3]
+        assert lines[0]["success"] and lines[1]["success"] and lines[1]["id"] == "b"
+        assert not lines[2]["success"] and not lines[3]["success"]
+
+    def test_ndjson(self, client):
+        body = '"fever and cough"\nnot json\n{"symptoms": "headache", "id": 7}\n'
+        response = client.post("/analyze/batch", content=body,
+                               headers={"content-type": "application/x-ndjson"})
+
+        lines = ndjson_lines(response.text)
+        assert [line["success"] for line in lines] == [True, False, True]
+        assert lines[2]["id"] == 7
+
+    def test_batch_queries_are_counted(self, client):
+        QUERIES = sys.modules[type(web_ui.REGISTRY).__module__].QUERIES
+        success = QUERIES.labels("success")
+        before = success.value
+
+        response = client.post("/analyze/batch", content=json.dumps(["fever and cough", "headache"]))
+
+        assert [line["success"] for line in ndjson_lines(response.text)] == [True, True]
+        assert success.value == before + 2
+
+    def test_unreadable_upload_ends_with_error_line(self, client):
+        lines = ndjson_lines(client.post("/analyze/batch", content='["fever", oops').text)
+
+        assert lines[0]["success"]
+        assert not lines[-1]["success"] and "could not be read" in lines[-1]["message"]
+
+    def test_results_stream_while_uploading(self, server):
+        # The first result must arrive while the client is still sending the upload
+        async def exchange(content_type, first, rest):
+            reader, writer = await asyncio.open_connection("127.0.0.1", server)
+            writer.write((f"POST /analyze/batch HTTP/1.1\r\nHost: test\r\nContent-Type: {content_type}\r\n"
+                          "Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n").encode())
+
+            def chunk(data):
+                writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+            chunk(first)
+            await writer.drain()
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+            first_result = await asyncio.wait_for(reader.readuntil(b"}"), 5)
+            chunk(rest)
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+            remainder = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+            return head, first_result, remainder
+
+        for content_type, first, rest in (
+            ("application/json", b'["fever and cough", ', b'"headache"]'),
+            ("application/x-ndjson", b'"fever and cough"\n', b'"headache"\n'),
+        ):
+            head, first_result, remainder = asyncio.run(exchange(content_type, first, rest))
+
+            assert head.startswith(b"HTTP/1.1 200")
+            assert b'"index": 0' in first_result
+            assert b'"index": 1' in remainder
+
+
+class TestRateLimiting:
+    def test_no_middleware_when_disabled(self):
+        # RATE_LIMIT_ENABLED defaults to False
+        assert web_ui.rate_limiter is None
+        assert not any(m.cls is web_ui.RateLimitMiddleware for m in web_ui.app.user_middleware)
+
+
+class TestStreamEndpoint:
+    def test_stream_counts_queries_like_analyze(self, client):
+        # The web UI imports the engine as "metta", a separate module from "src.metta"
+        QUERIES = sys.modules[type(web_ui.REGISTRY).__module__].QUERIES
+        success, clarification = QUERIES.labels("success"), QUERIES.labels("clarification_needed")
+        before = (success.value, clarification.value)
+
+        for symptoms in ("fever and cough", "nothing recognisable here"):
+            response = client.post("/analyze/stream", json={"symptoms": symptoms})
+            assert "event: appointment" in response.text
+
+        assert (success.value, clarification.value) == (before[0] + 1, before[1] + 1)